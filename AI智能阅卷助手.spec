@@ -26,7 +26,7 @@ a = Analysis(
     pathex=['.'],  # 项目根路径，帮助 PyInstaller 定位模块和资源
     binaries=[],
     datas=datas,
-    hiddenimports=['PyQt5.sip', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets', 'api_service', 'auto_thread', 'config_manager', 'ui_components.main_window', 'ui_components.question_config_dialog', 'pyautogui', 'PIL', 'PIL.ImageGrab', 'PIL.Image', 'PIL.ImageDraw', 'appdirs', 'requests', 'winsound', 'pandas', 'openpyxl'] + hiddenimports,
+    hiddenimports=['PyQt5.sip', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets', 'api_service', 'auto_thread', 'grading_core', 'config_manager', 'usage_accounting', 'review_queue', 'engine_process', 'score_sinks', 'image_sources', 'record_writer', 'grading_ledger', 'run_journal', 'paper_identity', 'run_analytics', 'image_archive', 'run_spec', 'ui_components.main_window', 'ui_components.question_config_dialog', 'ui_components.review_queue_dialog', 'pyautogui', 'PIL', 'PIL.ImageGrab', 'PIL.Image', 'PIL.ImageDraw', 'appdirs', 'requests', 'winsound', 'pandas', 'openpyxl'] + hiddenimports,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -61,16 +61,23 @@
 #
 # ==============================================================================
 
+import socket
 import requests
 import logging
 import traceback
 from typing import Tuple, Optional, Dict, Any
 import hashlib
 import hmac
+import math
 import time
 import json
+from collections import deque
 from datetime import datetime
-from threading import Lock, local
+from threading import Event, Lock, local
+from weakref import WeakSet
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 # ==============================================================================
 #  UI文本到提供商ID的映射字典 (UI Text to Provider ID Mapping)
@@ -154,6 +161,7 @@ PROVIDER_CONFIGS = {
         "url": "https://hunyuan.tencentcloudapi.com/",
         "auth_method": "tencent_signature_v3", # 使用腾讯云签名方法 v3
         "payload_builder": "_build_tencent_payload",
+        "supports_max_tokens": False,  # ChatCompletions 接口没有输出长度上限参数，不做自适应 max_tokens
         "service_info": {  # 新增服务信息配置，避免硬编码
             "service": "hunyuan",
             "region": "ap-guangzhou",
@@ -199,6 +207,214 @@ def get_ui_text_from_provider_id(provider_id: str) -> Optional[str]:
     config = PROVIDER_CONFIGS.get(provider_id)
     return config["name"] if config else None
 
+# ==============================================================================
+#  输出长度自适应 (Adaptive max_tokens)
+#  模型回复长度决定了生成耗时。按“模型+题目+题型”记录历史回复的 completion tokens，
+#  以分位数+余量作为 max_tokens 上限，避免个别失控回复生成数千token的评分依据。
+# ==============================================================================
+DEFAULT_MAX_TOKENS = 4096
+
+class OutputTokenBudget:
+    """按题目/题型学习模型回复长度，给出 max_tokens 上限（线程安全）。"""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._samples: Dict[tuple, deque] = {}
+        self._lock = Lock()
+
+    def record(self, model_id: str, question_index: int, question_type: str, completion_tokens: int) -> None:
+        """记录一次回复的 completion tokens（同时计入题目级与题型级样本）"""
+        if not completion_tokens or completion_tokens <= 0:
+            return
+        with self._lock:
+            for key in ((model_id, question_index, question_type), (model_id, None, question_type)):
+                bucket = self._samples.get(key)
+                if bucket is None:
+                    bucket = deque(maxlen=self._window)
+                    self._samples[key] = bucket
+                bucket.append(int(completion_tokens))
+
+    def suggest(self, model_id: str, question_index: int, question_type: str,
+                percentile: float = 0.95, headroom: float = 1.3, min_samples: int = 5,
+                floor: int = 512, ceiling: int = DEFAULT_MAX_TOKENS) -> int:
+        """返回建议的 max_tokens：样本不足时返回 ceiling（即不收紧）"""
+        with self._lock:
+            samples = self._samples.get((model_id, question_index, question_type))
+            if not samples or len(samples) < min_samples:
+                samples = self._samples.get((model_id, None, question_type))
+            if not samples or len(samples) < min_samples:
+                return ceiling
+            ordered = sorted(samples)
+        rank = max(0, min(len(ordered) - 1, math.ceil(percentile * len(ordered)) - 1))
+        learned = int(ordered[rank] * headroom)
+        return max(floor, min(ceiling, learned))
+
+# ==============================================================================
+#  请求取消 (Cancellable requests)
+#  双评并发时一方已失败，另一方的结果注定被丢弃：通过取消令牌通知其放弃请求与重试。
+# ==============================================================================
+REQUEST_CANCELLED_MESSAGE = "请求已取消"
+# 建立连接的超时（秒）；读取超时按接口另行指定（模型生成回复需要较长时间）
+REQUEST_CONNECT_TIMEOUT = 10
+
+
+class _AbortableConnectionMixin:
+    """连接建立后检查所属适配器是否已中止：中止期间新建的连接立即关闭"""
+    abort_event: Optional[Event] = None
+
+    def connect(self):
+        super().connect()
+        if self.abort_event is not None and self.abort_event.is_set():
+            self.close()
+            raise ConnectionAbortedError(REQUEST_CANCELLED_MESSAGE)
+
+
+class _AbortableHTTPConnection(_AbortableConnectionMixin, HTTPConnection):
+    pass
+
+
+class _AbortableHTTPSConnection(_AbortableConnectionMixin, HTTPSConnection):
+    pass
+
+
+class AbortableHTTPAdapter(HTTPAdapter):
+    """可从其他线程中止在途请求的适配器
+
+    abort() 关闭正在使用的连接的套接字，阻塞在读取上的请求线程随即以连接错误返回，
+    因此无需为每个请求另起线程等待；中止后该适配器（及其 Session）不再可用。
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._active = WeakSet()
+        self._active_lock = Lock()
+        self._abort_event = Event()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        def _pool_class(base, connection_cls):
+            class _Pool(base):
+                ConnectionCls = connection_cls
+
+                def _get_conn(self, timeout=None):
+                    conn = super()._get_conn(timeout)
+                    adapter._track(conn)
+                    return conn
+
+                def _put_conn(self, conn):
+                    if conn is not None:
+                        adapter._untrack(conn)
+                    super()._put_conn(conn)
+            return _Pool
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _pool_class(HTTPConnectionPool, _AbortableHTTPConnection),
+            "https": _pool_class(HTTPSConnectionPool, _AbortableHTTPSConnection),
+        }
+
+    def _track(self, conn) -> None:
+        conn.abort_event = self._abort_event
+        with self._active_lock:
+            self._active.add(conn)
+        if self._abort_event.is_set():
+            self._shutdown(conn)
+
+    def _untrack(self, conn) -> None:
+        with self._active_lock:
+            self._active.discard(conn)
+
+    @staticmethod
+    def _shutdown(conn) -> None:
+        sock = getattr(conn, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def abort(self) -> None:
+        """中止全部在途请求（可在任意线程调用）"""
+        self._abort_event.set()
+        with self._active_lock:
+            connections = list(self._active)
+        for conn in connections:
+            self._shutdown(conn)
+
+class RequestCancelledError(RuntimeError):
+    """请求被取消令牌中止（不应重试）"""
+
+class CancelToken:
+    """取消令牌（线程安全）
+
+    - 阅卷线程持有一个全局令牌，停止时取消，所有等待与在途请求随之放弃；
+    - 双评并发时每一方持有其子令牌，一方失败只取消另一方。
+    取消时会关闭已登记的 Session；等待中的请求立即返回“已取消”，尚未发出的请求与后续重试直接放弃。
+    """
+
+    def __init__(self, parent: Optional["CancelToken"] = None):
+        self._event = Event()
+        self._lock = Lock()
+        self._sessions = WeakSet()
+        self._children = WeakSet()
+        self.reason = ""
+        self.cancelled_at: Optional[float] = None
+        self.skipped_requests = 0  # 因取消而未发出的请求数（用于估算节省的tokens）
+        if parent is not None:
+            parent._add_child(self)
+
+    def _add_child(self, child: "CancelToken") -> None:
+        with self._lock:
+            self._children.add(child)
+            already_cancelled = self._event.is_set()
+        if already_cancelled:
+            child.cancel(self.reason)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """可被取消打断的等待，返回是否已取消"""
+        return self._event.wait(timeout)
+
+    def attach(self, session: requests.Session) -> None:
+        with self._lock:
+            self._sessions.add(session)
+
+    def detach(self, session: requests.Session) -> None:
+        with self._lock:
+            self._sessions.discard(session)
+
+    def cancel(self, reason: str = "") -> bool:
+        """取消令牌（连同子令牌）；重复取消返回 False"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self.cancelled_at = time.monotonic()
+            self._event.set()
+            sessions = list(self._sessions)
+            children = list(self._children)
+        for session in sessions:
+            # 先中止在途请求（关闭其套接字），再关闭连接池
+            for adapter in list(session.adapters.values()):
+                abort = getattr(adapter, "abort", None)
+                if abort is not None:
+                    abort()
+            try:
+                session.close()
+            except Exception:
+                pass
+        for child in children:
+            child.cancel(reason)
+        return True
+
+    def note_skipped(self) -> None:
+        with self._lock:
+            self.skipped_requests += 1
+
 class ApiService:
     def __init__(self, config_manager):
         self.config_manager = config_manager
@@ -208,6 +424,9 @@ class ApiService:
         self.logger = logging.getLogger(__name__)
         # 初始化当前题目索引，虽然主要逻辑在AutoThread中，但这里有个默认值更安全
         self.current_question_index = 1
+        self.current_question_type = ""
+        # 回复长度学习器：为评分调用给出自适应的 max_tokens
+        self.output_token_budget = OutputTokenBudget()
 
         # 百度OCR access_token 缓存（自动化：用户无需参与）
         self._baidu_ocr_token_lock = Lock()
@@ -224,9 +443,45 @@ class ApiService:
         sess = getattr(self._thread_local, "session", None)
         if sess is None:
             sess = requests.Session()
+            sess.mount("https://", AbortableHTTPAdapter())
+            sess.mount("http://", AbortableHTTPAdapter())
             self._thread_local.session = sess
         return sess
 
+    def set_cancel_token(self, token: Optional[CancelToken]) -> None:
+        """为当前线程绑定取消令牌（None 表示解除）"""
+        self._thread_local.cancel_token = token
+
+    def get_cancel_token(self) -> Optional[CancelToken]:
+        """当前线程绑定的取消令牌"""
+        return getattr(self._thread_local, "cancel_token", None)
+
+    def _post(self, url: str, **kwargs) -> requests.Response:
+        """发送 POST 请求；当前线程绑定了取消令牌时，请求可被随时放弃
+
+        请求在本线程发送；Session 登记到取消令牌，取消时 AbortableHTTPAdapter 关闭在途连接的套接字，
+        阻塞的读取立即以连接错误返回，这里转为 RequestCancelledError。被中止的 Session 不再使用，
+        下次请求会新建 Session。
+        """
+        session = self._get_session()
+        cancel_token = self.get_cancel_token()
+        if cancel_token is None:
+            return session.post(url, **kwargs)
+        if cancel_token.cancelled:
+            cancel_token.note_skipped()
+            raise RequestCancelledError(REQUEST_CANCELLED_MESSAGE)
+
+        cancel_token.attach(session)
+        try:
+            return session.post(url, **kwargs)
+        except requests.RequestException:
+            if cancel_token.cancelled:
+                self._thread_local.session = None
+                raise RequestCancelledError(REQUEST_CANCELLED_MESSAGE)
+            raise
+        finally:
+            cancel_token.detach(session)
+
     def _get_baidu_ocr_access_token(self) -> Tuple[Optional[str], Optional[str]]:
         """获取百度OCR access_token（带缓存与自动刷新）。
 
@@ -257,7 +512,7 @@ class ApiService:
 
             try:
                 self.logger.debug("准备获取百度OCR access_token")
-                token_response = self._get_session().post(token_url, data=token_params, timeout=10)
+                token_response = self._post(token_url, data=token_params, timeout=10)
                 token_data = token_response.json()
 
                 access_token = token_data.get("access_token")
@@ -365,8 +620,9 @@ class ApiService:
         return canonical_request
 
     # 新增: 设置当前题目索引的方法
-    def set_current_question(self, index: int):
+    def set_current_question(self, index: int, question_type: str = ""):
         self.current_question_index = index
+        self.current_question_type = question_type or ""
 
     def call_first_api(self, img_str: str, prompt: Any, ocr_text: str = "") -> Tuple[Optional[str], Optional[str]]:
         return self._call_api_by_group("first", img_str, prompt, ocr_text)
@@ -374,6 +630,14 @@ class ApiService:
     def call_second_api(self, img_str: str, prompt: Any, ocr_text: str = "") -> Tuple[Optional[str], Optional[str]]:
         return self._call_api_by_group("second", img_str, prompt, ocr_text)
 
+    def call_cascade_api(self, img_str: str, prompt: Any, ocr_text: str = "") -> Tuple[Optional[str], Optional[str]]:
+        """级联评分的快速模型（低价档）"""
+        return self._call_api_by_group("cascade", img_str, prompt, ocr_text)
+
+    def call_arbiter_api(self, img_str: str, prompt: Any, ocr_text: str = "") -> Tuple[Optional[str], Optional[str]]:
+        """双评分差超阈值时的仲裁模型（第三方）"""
+        return self._call_api_by_group("arbiter", img_str, prompt, ocr_text)
+
     def _call_api_by_group(self, api_group: str, img_str: str, prompt: Any, ocr_text: str = "") -> Tuple[Optional[str], Optional[str]]:
         """根据API组别调用对应的预设供应商API"""
         try:
@@ -385,6 +649,14 @@ class ApiService:
                 provider = self.config_manager.second_api_provider
                 api_key = self.config_manager.second_api_key
                 model_id = self.config_manager.second_modelID
+            elif api_group == "cascade":
+                provider = self.config_manager.cascade_api_provider
+                api_key = self.config_manager.cascade_api_key
+                model_id = self.config_manager.cascade_modelID
+            elif api_group == "arbiter":
+                provider = self.config_manager.arbiter_api_provider
+                api_key = self.config_manager.arbiter_api_key
+                model_id = self.config_manager.arbiter_modelID
             else:
                 return None, "无效的API组别"
 
@@ -399,6 +671,10 @@ class ApiService:
                             self.config_manager.first_api_provider = provider
                         elif api_group == "second":
                             self.config_manager.second_api_provider = provider
+                        elif api_group == "cascade":
+                            self.config_manager.cascade_api_provider = provider
+                        elif api_group == "arbiter":
+                            self.config_manager.arbiter_api_provider = provider
                     except Exception:
                         pass
 
@@ -406,7 +682,8 @@ class ApiService:
                 return None, f"第{api_group}组API配置不完整 (供应商、Key或模型ID为空)"
 
             print(f"[API] 准备调用 {api_group} API, 供应商: {provider}")
-            return self._execute_api_call(provider, api_key, model_id, img_str, prompt, ocr_text)
+            budget_key = (self.current_question_index, self.current_question_type)
+            return self._execute_api_call(provider, api_key, model_id, img_str, prompt, ocr_text, budget_key=budget_key)
         except Exception as e:
             error_detail = traceback.format_exc()
             print(f"[API] 调用 {api_group} API 时发生严重错误: {str(e)}\n{error_detail}")
@@ -566,12 +843,68 @@ class ApiService:
         # 其他鉴权方法直接返回
         return api_key, None
 
-    def _execute_api_call(self, provider: str, api_key: str, model_id: str, img_str: str, prompt, ocr_text: str = "") -> Tuple[Optional[str], Optional[str]]:
+    def _execute_api_call(self, provider: str, api_key: str, model_id: str, img_str: str, prompt, ocr_text: str = "",
+                          budget_key: Optional[tuple] = None) -> Tuple[Optional[str], Optional[str]]:
+        """发送评分请求；budget_key=(题号, 题型) 时启用自适应 max_tokens
+
+        收紧后的上限若导致回复被截断（finish_reason=length），自动以默认上限重试一次，
+        保证不会因为省时而丢失完整的评分结果。
+        """
+        self._thread_local.last_usage = {}
+        started_at = time.monotonic()
+        if not PROVIDER_CONFIGS.get(provider, {}).get("supports_max_tokens", True):
+            budget_key = None  # 请求中无法限制输出长度：不收紧、也不采样回复长度
+        max_tokens = self._suggest_max_tokens(model_id, budget_key)
+        content, error, output_info = self._send_api_request(provider, api_key, model_id, img_str, prompt, ocr_text, max_tokens)
+        total_usage = dict(output_info)
+
+        cancel_token = self.get_cancel_token()
+        if content and output_info.get("truncated") and max_tokens < DEFAULT_MAX_TOKENS \
+                and not (cancel_token and cancel_token.cancelled):
+            self.logger.info(f"[{provider}] 回复在 max_tokens={max_tokens} 处被截断，以默认上限 {DEFAULT_MAX_TOKENS} 重试")
+            content, error, output_info = self._send_api_request(
+                provider, api_key, model_id, img_str, prompt, ocr_text, DEFAULT_MAX_TOKENS
+            )
+            for field, value in output_info.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    total_usage[field] = total_usage.get(field, 0) + value
+            total_usage["truncated"] = output_info.get("truncated", False)
+
+        # 记录本线程最近一次调用的用量（双评并发时每个线程各自独立）
+        total_usage["model_id"] = model_id
+        total_usage["provider"] = provider
+        total_usage["latency_seconds"] = round(time.monotonic() - started_at, 3)
+        self._thread_local.last_usage = total_usage
+
+        if content and budget_key and not output_info.get("truncated"):
+            question_index, question_type = budget_key
+            self.output_token_budget.record(model_id, question_index, question_type, output_info.get("completion_tokens", 0))
+        return content, error
+
+    def _suggest_max_tokens(self, model_id: str, budget_key: Optional[tuple]) -> int:
+        """根据配置与历史回复长度计算本次请求的 max_tokens"""
+        if not budget_key or not getattr(self.config_manager, 'adaptive_max_tokens_enabled', False):
+            return DEFAULT_MAX_TOKENS
+        question_index, question_type = budget_key
+        try:
+            return self.output_token_budget.suggest(
+                model_id, question_index, question_type,
+                percentile=float(getattr(self.config_manager, 'max_tokens_percentile', 0.95)),
+                headroom=float(getattr(self.config_manager, 'max_tokens_headroom', 1.3)),
+                min_samples=int(getattr(self.config_manager, 'max_tokens_min_samples', 5)),
+                floor=int(getattr(self.config_manager, 'max_tokens_floor', 512)),
+            )
+        except (TypeError, ValueError):
+            return DEFAULT_MAX_TOKENS
+
+    def _send_api_request(self, provider: str, api_key: str, model_id: str, img_str: str, prompt, ocr_text: str = "",
+                          max_tokens: int = DEFAULT_MAX_TOKENS) -> Tuple[Optional[str], Optional[str], Dict[str, Any]]:
+        """构建并发送单次请求，返回 (content, error, output_info)"""
         # 在函数开始就获取provider_name，避免异常处理时未定义
         provider_name = PROVIDER_CONFIGS.get(provider, {}).get("name", provider)
         
         if provider not in PROVIDER_CONFIGS:
-            return None, f"未知的供应商标识: {provider}"
+            return None, f"未知的供应商标识: {provider}", {}
 
         config = PROVIDER_CONFIGS[provider]
         url = config["url"]
@@ -587,7 +920,7 @@ class ApiService:
         # 预处理API Key
         processed_key, key_error = self._preprocess_api_key(api_key, auth_method)
         if key_error:
-            return None, key_error
+            return None, key_error, {}
 
         # 如果有OCR文本，将其以结构化段落注入到 user 内容中（避免破坏输出JSON要求）
         enhanced_prompt = prompt
@@ -612,14 +945,14 @@ class ApiService:
 
         # 防御性检查: 不允许在一次API调用中同时提供图像和OCR文本作为双重输入
         if img_str and isinstance(img_str, str) and img_str.strip() and ocr_text and isinstance(ocr_text, str) and ocr_text.strip():
-            return None, "禁止同时提供图像和OCR文本作为输入，请选择纯视觉模式或OCR文本模式。"
+            return None, "禁止同时提供图像和OCR文本作为输入，请选择纯视觉模式或OCR文本模式。", {}
 
         # 先构建 payload，因为腾讯签名需要用到它
         try:
             builder_func = getattr(self, config["payload_builder"])
-            payload = builder_func(model_id, img_str, enhanced_prompt)
+            payload = builder_func(model_id, img_str, enhanced_prompt, max_tokens=max_tokens)
         except Exception as e:
-            return None, f"构建请求体失败: {e}"
+            return None, f"构建请求体失败: {e}", {}
 
         # 特殊处理百度OCR：使用form-data格式
         if provider == "baidu_ocr":
@@ -656,10 +989,12 @@ class ApiService:
             # 百度OCR Token鉴权 - 自动获取并缓存 access_token
             access_token, token_err = self._get_baidu_ocr_access_token()
             if token_err:
-                return None, token_err
+                return None, token_err, {}
             sep = "&" if "?" in url else "?"
             url += f"{sep}access_token={access_token}"
 
+        cancel_token = self.get_cancel_token()
+
         # 通用请求发送逻辑（所有认证方式共享）
         try:
             self.logger.debug(f"[{provider_name}] 发送API请求到: {url}")
@@ -667,36 +1002,47 @@ class ApiService:
             # 根据格式选择传递方式
             if use_json_format:
                 headers["Content-Type"] = "application/json"
-                response = self._get_session().post(url, headers=headers, json=payload, timeout=60)
+                response = self._post(url, headers=headers, json=payload, timeout=(REQUEST_CONNECT_TIMEOUT, 60))
             else:
                 # form-data格式（用于百度OCR等）
-                response = self._get_session().post(url, headers=headers, data=payload, timeout=60)
+                response = self._post(url, headers=headers, data=payload, timeout=(REQUEST_CONNECT_TIMEOUT, 60))
 
             self.logger.debug(f"[{provider_name}] 收到响应: 状态码 {response.status_code}")
+
+            if cancel_token is not None and cancel_token.cancelled:
+                # 请求期间被取消：结果丢弃，但已产生的用量照常记账
+                usage = self._extract_usage(response.json(), provider) if response.status_code == 200 else {}
+                return None, f"[{provider_name}] {REQUEST_CANCELLED_MESSAGE}", usage
             
             if response.status_code == 200:
-                content = self._extract_response_content(response.json(), provider)
+                data = response.json()
+                content = self._extract_response_content(data, provider)
                 if content:
                     self.logger.debug(f"[{provider_name}] 成功提取响应内容")
-                    return content, None
+                    return content, None, self._extract_usage(data, provider)
                 else:
                     self.logger.warning(f"[{provider_name}] 响应内容为空或无法解析")
-                    return None, f"API响应内容为空或无法解析。原始响应: {str(response.json())[:200]}"
+                    return None, f"API响应内容为空或无法解析。原始响应: {str(data)[:200]}", self._extract_usage(data, provider)
             else:
                 error_text = response.text[:200]
                 self.logger.warning(f"[{provider_name}] API请求失败: {response.status_code}")
                 friendly_error = self._create_api_error_message(provider, response.status_code, error_text)
-                return None, friendly_error
+                return None, friendly_error, {}
+        except RequestCancelledError:
+            return None, f"[{provider_name}] {REQUEST_CANCELLED_MESSAGE}", {}
         except requests.exceptions.Timeout:
             self.logger.warning(f"[{provider_name}] 请求超时")
-            return None, f"[{provider_name}] 请求超时，请检查网络连接或稍后重试"
+            return None, f"[{provider_name}] 请求超时，请检查网络连接或稍后重试", {}
         except requests.exceptions.ConnectionError as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                # 取消时关闭了连接，由此产生的连接异常不是真正的失败
+                return None, f"[{provider_name}] {REQUEST_CANCELLED_MESSAGE}", {}
             self.logger.warning(f"[{provider_name}] 连接失败: {str(e)[:100]}")
-            return None, f"[{provider_name}] 无法连接到服务器，请检查网络设置"
+            return None, f"[{provider_name}] 无法连接到服务器，请检查网络设置", {}
         except requests.exceptions.RequestException as e:
             self.logger.exception(f"[{provider_name}] 网络请求异常")
             friendly_error = self._create_network_error_message(e)
-            return None, friendly_error
+            return None, friendly_error, {}
 
     def _extract_response_content(self, data: Dict[str, Any], provider: str) -> Optional[str]:
         """从API响应中提取内容
@@ -764,6 +1110,57 @@ class ApiService:
             return None # 解析失败
         return str(data) # Fallback
 
+    def _extract_usage(self, data: Dict[str, Any], provider: str) -> Dict[str, Any]:
+        """从API响应中提取 token 用量与截断标记（字段缺失时按0处理）
+
+        返回字段：prompt_tokens / completion_tokens / cached_tokens / image_tokens / total_tokens / truncated
+        """
+        usage_info: Dict[str, Any] = {
+            "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+            "image_tokens": 0, "total_tokens": 0, "truncated": False,
+        }
+
+        def _int(value) -> int:
+            try:
+                return int(value or 0)
+            except (TypeError, ValueError):
+                return 0
+
+        try:
+            if provider == "gemini":
+                usage = data.get("usageMetadata") or {}
+                usage_info["prompt_tokens"] = _int(usage.get("promptTokenCount"))
+                usage_info["completion_tokens"] = _int(usage.get("candidatesTokenCount"))
+                usage_info["cached_tokens"] = _int(usage.get("cachedContentTokenCount"))
+                usage_info["total_tokens"] = _int(usage.get("totalTokenCount"))
+                for detail in usage.get("promptTokensDetails") or []:
+                    if str(detail.get("modality", "")).upper() == "IMAGE":
+                        usage_info["image_tokens"] += _int(detail.get("tokenCount"))
+                usage_info["truncated"] = (data.get("candidates") or [{}])[0].get("finishReason") == "MAX_TOKENS"
+            elif provider != "baidu_ocr":
+                # OpenAI兼容格式使用 usage；腾讯混元使用 Usage（PascalCase）
+                body = data.get("Response") if isinstance(data.get("Response"), dict) else data
+                usage = body.get("usage") or body.get("Usage") or {}
+                usage_info["prompt_tokens"] = _int(usage.get("prompt_tokens", usage.get("PromptTokens")))
+                usage_info["completion_tokens"] = _int(usage.get("completion_tokens", usage.get("CompletionTokens")))
+                usage_info["total_tokens"] = _int(usage.get("total_tokens", usage.get("TotalTokens")))
+                details = usage.get("prompt_tokens_details") or {}
+                # 火山/智谱/阿里/OpenAI: prompt_tokens_details.cached_tokens；Moonshot: usage.cached_tokens
+                usage_info["cached_tokens"] = _int(details.get("cached_tokens", usage.get("cached_tokens")))
+                usage_info["image_tokens"] = _int(details.get("image_tokens"))
+                choice = (body.get("choices") or body.get("Choices") or [{}])[0]
+                usage_info["truncated"] = (choice.get("finish_reason") or choice.get("FinishReason")) == "length"
+        except (AttributeError, IndexError, TypeError):
+            pass
+
+        if not usage_info["total_tokens"]:
+            usage_info["total_tokens"] = usage_info["prompt_tokens"] + usage_info["completion_tokens"]
+        return usage_info
+
+    def get_last_usage(self) -> Dict[str, Any]:
+        """返回当前线程最近一次评分调用的 token 用量（含截断重试的累计）"""
+        return dict(getattr(self._thread_local, "last_usage", None) or {})
+
     # 新: 专用方法用于获取百度 doc_analysis 的原始结构化结果（便于置信度分析）
     def call_baidu_doc_analysis_structured(self, img_str: str, ocr_quality_level: str = 'moderate', language_type: str = 'CHN_ENG') -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
         """
@@ -815,7 +1212,7 @@ class ApiService:
                 "detect_alteration": "true",
             }
             headers = {"Content-Type": "application/x-www-form-urlencoded"}
-            response = self._get_session().post(url, headers=headers, data=payload, timeout=30)
+            response = self._post(url, headers=headers, data=payload, timeout=(REQUEST_CONNECT_TIMEOUT, 30))
             if response.status_code != 200:
                 return None, f"百度Handwriting请求失败: {response.status_code} {response.text[:200]}"
             return response.json(), None
@@ -829,10 +1226,18 @@ class ApiService:
         pos = img_str.find(marker)
         return img_str[pos + len(marker):] if pos != -1 else img_str
 
+    def _as_image_list(self, img_str) -> list:
+        """统一图片入参：支持单张base64字符串或多张图片列表（整卷模式一次请求携带多题截图）"""
+        if not img_str:
+            return []
+        if isinstance(img_str, (list, tuple)):
+            return [self._get_pure_base64(i) for i in img_str if i]
+        return [self._get_pure_base64(img_str)]
+
     # ==========================================================================
     #  各厂商专属的Payload构建函数
     # ==========================================================================
-    def _build_openai_compatible_payload(self, model_id, img_str, prompt):
+    def _build_openai_compatible_payload(self, model_id, img_str, prompt, max_tokens=DEFAULT_MAX_TOKENS):
         """
         适用于大多数与OpenAI兼容的厂商 (Moonshot, 智谱, Baidu V2, Aliyun-Compatible等)
         核心原则: 图片在前，文本在后，以保证最大兼容性。
@@ -852,22 +1257,20 @@ class ApiService:
 
         if not img_str:
             messages.append({"role": "user", "content": user_text})
-            return {"model": model_id, "messages": messages, "max_tokens": 4096}
+            return {"model": model_id, "messages": messages, "max_tokens": max_tokens}
 
-        pure_base64 = self._get_pure_base64(img_str)
-        # 视觉模式：system 作为单独消息，user 带 image+text
-        messages.append({
-            "role": "user",
-            "content": [
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{pure_base64}"}},
-                {"type": "text", "text": user_text}
-            ]
-        })
-        return {"model": model_id, "messages": messages, "max_tokens": 4096}
+        # 视觉模式：system 作为单独消息，user 带 image+text（多图时按顺序排列在文本之前）
+        content = [
+            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{pure_base64}"}}
+            for pure_base64 in self._as_image_list(img_str)
+        ]
+        content.append({"type": "text", "text": user_text})
+        messages.append({"role": "user", "content": content})
+        return {"model": model_id, "messages": messages, "max_tokens": max_tokens}
 
 
 
-    def _build_volcengine_payload(self, model_id, img_str, prompt):
+    def _build_volcengine_payload(self, model_id, img_str, prompt, max_tokens=DEFAULT_MAX_TOKENS):
         """
         专为火山引擎定制 - 符合官方API文档格式
 
@@ -904,31 +1307,29 @@ class ApiService:
         if not img_str:
             # 纯文本模式
             messages.append({"role": "user", "content": user_text})
-            return {"model": model_id, "messages": messages, "max_tokens": 4096}
+            return {"model": model_id, "messages": messages, "max_tokens": max_tokens}
 
         # 视觉模式 - AI改卷专用配置
         # 按照火山引擎官方文档：image在前，text在后
-        pure_base64 = self._get_pure_base64(img_str)
-        messages.append({
-            "role": "user",
-            "content": [
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{pure_base64}",
-                        "detail": "high"
-                    }
-                },
-                {"type": "text", "text": user_text}
-            ]
-        })
-        return {"model": model_id, "messages": messages, "max_tokens": 4096}
+        content = [
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{pure_base64}",
+                    "detail": "high"
+                }
+            }
+            for pure_base64 in self._as_image_list(img_str)
+        ]
+        content.append({"type": "text", "text": user_text})
+        messages.append({"role": "user", "content": content})
+        return {"model": model_id, "messages": messages, "max_tokens": max_tokens}
 
 
 
 
 
-    def _build_tencent_payload(self, model_id, img_str, prompt):
+    def _build_tencent_payload(self, model_id, img_str, prompt, max_tokens=DEFAULT_MAX_TOKENS):
         """专为腾讯混元定制 - 支持所有视觉模型
 
         更新历史 (Update History):
@@ -954,8 +1355,10 @@ class ApiService:
 
         Args:
             model_id: 模型名称，由用户界面输入
-            img_str: 图像base64字符串（可选）
+            img_str: 图像base64字符串（可选；整卷模式下为多张图片的列表）
             prompt: 文本提示
+            max_tokens: 不使用——ChatCompletions 接口没有输出长度上限参数
+                （供应商配置 supports_max_tokens=False，腾讯混元不做自适应 max_tokens）
 
         Returns:
             dict: 符合腾讯API格式的请求payload
@@ -980,22 +1383,20 @@ class ApiService:
             return {"Model": model_id, "Messages": messages, "Stream": False}
 
         # 视觉模型支持图像输入
-        pure_base64 = self._get_pure_base64(img_str)
         messages = []
         if system_text.strip():
             messages.append({"Role": "system", "Content": system_text})
-        messages.append({
-            "Role": "user",
-            "Contents": [
-                {"Type": "text", "Text": user_text},
-                {"Type": "image_url", "ImageUrl": {"Url": f"data:image/jpeg;base64,{pure_base64}"}}
-            ]
-        })
+        contents = [{"Type": "text", "Text": user_text}]
+        contents.extend(
+            {"Type": "image_url", "ImageUrl": {"Url": f"data:image/jpeg;base64,{pure_base64}"}}
+            for pure_base64 in self._as_image_list(img_str)
+        )
+        messages.append({"Role": "user", "Contents": contents})
         return {"Model": model_id, "Messages": messages, "Stream": False}
 
 
 
-    def _build_gemini_payload(self, model_id, img_str, prompt):
+    def _build_gemini_payload(self, model_id, img_str, prompt, max_tokens=DEFAULT_MAX_TOKENS):
         """专为 Google Gemini 定制"""
         system_text = ""
         user_text = ""
@@ -1008,21 +1409,23 @@ class ApiService:
         payload = {}
         if system_text.strip():
             payload["system_instruction"] = {"parts": [{"text": system_text}]}
+        # 仅在自适应收紧时下发输出上限，默认保持模型自身上限
+        if max_tokens < DEFAULT_MAX_TOKENS:
+            payload["generationConfig"] = {"maxOutputTokens": max_tokens}
 
         if not img_str:
             payload["contents"] = [{"parts": [{"text": user_text}]}]
             return payload
 
-        pure_base64 = self._get_pure_base64(img_str)
-        payload["contents"] = [{
-            "parts": [
-                {"text": user_text},
-                {"inline_data": {"mime_type": "image/jpeg", "data": pure_base64}}
-            ]
-        }]
+        parts = [{"text": user_text}]
+        parts.extend(
+            {"inline_data": {"mime_type": "image/jpeg", "data": pure_base64}}
+            for pure_base64 in self._as_image_list(img_str)
+        )
+        payload["contents"] = [{"parts": parts}]
         return payload
 
-    def _build_baidu_ocr_payload(self, model_id, img_str, prompt):
+    def _build_baidu_ocr_payload(self, model_id, img_str, prompt, max_tokens=DEFAULT_MAX_TOKENS):
         """专为百度OCR定制 - 手写文字识别
 
         基于用户提供的百度OCR教程实现：
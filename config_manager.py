@@ -98,9 +98,34 @@ class ConfigManager:
         
         self.dual_evaluation_enabled = False
         self.score_diff_threshold = 5
+        # 自适应双评：第二个API只在抽检或第一个API结果存在风险时调用
+        self.adaptive_dual_enabled = False
+        self.adaptive_dual_sample_rate = 0.2          # 抽检比例（0~1）
+        self.adaptive_dual_risk_boundary_margin = 0.25  # 原始得分距四舍五入分界点或及格线小于该值视为风险（0=不检查）
+        self.adaptive_dual_pass_ratio = 0.6             # 及格线占满分的比例
+        self.adaptive_dual_risk_basis_length = 400     # scoring_basis 超过该长度或含含糊措辞视为风险（0=不检查）
+        self.adaptive_dual_risk_ocr_margin = 0.05      # OCR平均置信度距质量门槛小于该值视为风险
+
+        # --- 级联评分（单评模式）：先用快速低价模型，存疑时升级到第一组主模型 ---
+        self.cascade_enabled = False
+        self.cascade_api_provider = "volcengine"
+        self.cascade_api_key = ""
+        self.cascade_modelID = ""
+        # 原始总分距离四舍五入分界点小于该值时视为“临界分”，升级到主模型复评
+        self.cascade_boundary_margin = 0.1
+
+        # --- 仲裁模型：双评分差超阈值时由第三个模型裁决 ---
+        self.arbiter_enabled = False
+        self.arbiter_api_provider = "volcengine"
+        self.arbiter_api_key = ""
+        self.arbiter_modelID = ""
+        self.arbiter_strategy = "closer_pair"  # closer_pair（取更接近的一对平均）/ median（三者中位数）
+
         self.subject = ""
         self.cycle_number = 1
         self.wait_time = 2
+        # 延迟人工复核：需人工介入时点击翻页跳过试卷并加入待复核队列（需配置翻页按钮）
+        self.defer_manual_review = False
 
         # --- OCR工作模式配置（独立于AI模型选择）---
         # OCR配置（使用索引，0=纯AI，1=百度OCR）
@@ -120,6 +145,70 @@ class ConfigManager:
         self.ocr_confidence_avg_threshold = 0.75
         self.ocr_confidence_min_threshold = 0.6
         self.ocr_confidence_low_line_ratio = 0.3
+
+        # --- 性能配置 ---
+        # 自适应 max_tokens：按历史回复长度（分位数×余量）收紧输出上限，被截断时自动以默认上限重试
+        self.adaptive_max_tokens_enabled = True
+        self.max_tokens_percentile = 0.95
+        self.max_tokens_headroom = 1.3
+        self.max_tokens_floor = 512
+        self.max_tokens_min_samples = 5
+        # 整卷模式：一份试卷的所有题目截图与细则合并为一次多模态请求（仅纯AI单评生效）
+        self.paper_batch_enabled = False
+        # 引擎子进程模式：阅卷引擎在独立进程中运行，界面不受GIL争用影响，引擎崩溃不影响窗口
+        self.engine_process_enabled = False
+        # --- 分数输出 ---
+        # gui：模拟键鼠输入阅卷网页；csv：只写入CSV（试运行/批量）；http：POST到阅卷平台接口
+        self.score_sink_mode = "gui"
+        self.score_sink_csv_path = ""  # 为空时写入 阅卷记录/分数输出.csv
+        self.score_sink_http_url = ""
+        self.score_sink_http_token = ""
+        self.score_sink_http_timeout = 10.0
+        # --- 答案图片来源 ---
+        # screen：截屏；http：按URL模板下载原图；proxy_log：从本地代理日志取最新的图片URL下载
+        self.image_source_mode = "screen"
+        self.image_source_url_template = ""  # 可含 {question_index}、{paper_no}
+        self.image_source_proxy_log_path = ""
+        self.image_source_url_filter = ""  # 代理日志中区分各题图片URL的正则，可含 {question_index}
+        self.image_source_token = ""
+        self.image_source_timeout = 10.0
+        self.image_source_wait_seconds = 5.0
+        # --- 整页扫描导入 ---
+        # 答题区域模板（answer_area）按屏幕截图坐标记录：template_dpi 为截图时试卷的显示分辨率，
+        # origin 为试卷左上角在屏幕上的位置；扫描件按自身DPI（缺失时用 default_dpi）换算后裁切
+        self.sheet_template_dpi = 96.0
+        self.sheet_origin_x = 0
+        self.sheet_origin_y = 0
+        self.sheet_default_dpi = 300.0
+        self.sheet_deskew_enabled = True
+        self.sheet_decode_workers = 0  # 0 表示按CPU核数
+        # 试卷身份识别：每份试卷读取一次试卷号区域（条码或区域哈希），已评过的试卷翻页跳过
+        self.paper_id_enabled = False
+        self.paper_id_mode = "barcode"  # barcode / hash
+        self.paper_id_area = None       # {'x1','y1','x2','y2'} 屏幕坐标
+        self.paper_id_scope = ""        # 考试标识，作为试卷标识前缀区分各次考试
+        self.paper_id_skip_graded = True
+        self.paper_id_max_consecutive_skips = 10  # 连续跳过的试卷超过该数量时停止（翻页可能未生效）
+        # 答案图片库：按内容哈希去重保存每条记录对应的答案图片（后台编码写入）
+        self.image_archive_enabled = True
+        self.image_archive_dir = ""           # 空表示 阅卷记录/答案图片库
+        self.image_archive_format = "webp"    # webp / png
+        self.image_archive_quality = 70
+        self.image_archive_grayscale = False
+        self.image_archive_max_size_mb = 2048.0
+        self.image_archive_retention_days = 180
+        # 运行中每追加多少条重新生成一次Excel（每次全量重写；0=只在运行结束时生成，运行结束时总会生成）
+        self.record_excel_checkpoint = 0
+        # 后台记录写入队列上限（条），写满后新记录暂存内存，不阻塞界面线程也不丢弃
+        self.record_queue_size = 1000
+        # 阅卷台账：每条记录同时写入 阅卷记录/阅卷台账.sqlite3，便于按题号/时间/模型/分差查询与导出
+        self.grading_ledger_enabled = True
+        # 运行日志：崩溃或重启后可从中断的试卷继续
+        self.run_journal_enabled = True
+        # 运行分析报告：每次运行结束后由阅卷台账生成（需要 pandas 与 numpy）
+        self.run_report_enabled = True
+        # 模型单价覆盖（元/百万tokens），键为模型ID前缀，值为 "输入单价,输出单价[,缓存单价]"
+        self.model_price_overrides = {}
         
         self.question_configs = {}
         for i in range(1, self.max_questions + 1):
@@ -181,9 +270,34 @@ class ConfigManager:
         
         self.dual_evaluation_enabled = self._get_config_safe('DualEvaluation', 'enabled', False, bool)
         self.score_diff_threshold = self._get_config_safe('DualEvaluation', 'score_diff_threshold', 5, int)
+        self.adaptive_dual_enabled = self._get_config_safe('DualEvaluation', 'adaptive_enabled', False, bool)
+        self.adaptive_dual_sample_rate = float(self._get_config_safe('DualEvaluation', 'adaptive_sample_rate', self.adaptive_dual_sample_rate))
+        self.adaptive_dual_risk_boundary_margin = float(self._get_config_safe('DualEvaluation', 'risk_boundary_margin', self.adaptive_dual_risk_boundary_margin))
+        self.adaptive_dual_pass_ratio = float(self._get_config_safe('DualEvaluation', 'pass_ratio', self.adaptive_dual_pass_ratio))
+        self.adaptive_dual_risk_basis_length = self._get_config_safe('DualEvaluation', 'risk_basis_length', self.adaptive_dual_risk_basis_length, int)
+        self.adaptive_dual_risk_ocr_margin = float(self._get_config_safe('DualEvaluation', 'risk_ocr_margin', self.adaptive_dual_risk_ocr_margin))
+        self.cascade_enabled = self._get_config_safe('Cascade', 'enabled', False, bool)
+        self.cascade_api_provider = self._normalize_ai_provider_value(
+            self._get_config_safe('Cascade', 'api_provider', "volcengine"),
+            default_provider_id="volcengine",
+            field_label="cascade_api_provider",
+        )
+        self.cascade_api_key = self._get_config_safe('Cascade', 'api_key', "")
+        self.cascade_modelID = self._get_config_safe('Cascade', 'modelID', "")
+        self.cascade_boundary_margin = float(self._get_config_safe('Cascade', 'boundary_margin', self.cascade_boundary_margin))
+        self.arbiter_enabled = self._get_config_safe('Arbiter', 'enabled', False, bool)
+        self.arbiter_api_provider = self._normalize_ai_provider_value(
+            self._get_config_safe('Arbiter', 'api_provider', "volcengine"),
+            default_provider_id="volcengine",
+            field_label="arbiter_api_provider",
+        )
+        self.arbiter_api_key = self._get_config_safe('Arbiter', 'api_key', "")
+        self.arbiter_modelID = self._get_config_safe('Arbiter', 'modelID', "")
+        self.arbiter_strategy = self._get_config_safe('Arbiter', 'strategy', "closer_pair")
         self.subject = self._get_config_safe('UI', 'subject', "")
         self.cycle_number = self._get_config_safe('Auto', 'cycle_number', 1, int)
         self.wait_time = self._get_config_safe('Auto', 'wait_time', 2, int)
+        self.defer_manual_review = self._get_config_safe('Auto', 'defer_manual_review', False, bool)
 
         # 加载OCR配置（使用索引）
         ocr_mode_raw = self._get_config_safe('OCR', 'ocr_mode_index', self.OCR_MODE_PURE_AI)
@@ -219,6 +333,57 @@ class ConfigManager:
         self.ocr_confidence_avg_threshold = float(self._get_config_safe('OCR', 'ocr_confidence_avg_threshold', self.ocr_confidence_avg_threshold))
         self.ocr_confidence_min_threshold = float(self._get_config_safe('OCR', 'ocr_confidence_min_threshold', self.ocr_confidence_min_threshold))
         self.ocr_confidence_low_line_ratio = float(self._get_config_safe('OCR', 'ocr_confidence_low_line_ratio', self.ocr_confidence_low_line_ratio))
+        # 加载性能配置
+        self.adaptive_max_tokens_enabled = self._get_config_safe('Performance', 'adaptive_max_tokens_enabled', self.adaptive_max_tokens_enabled, bool)
+        self.max_tokens_percentile = float(self._get_config_safe('Performance', 'max_tokens_percentile', self.max_tokens_percentile))
+        self.max_tokens_headroom = float(self._get_config_safe('Performance', 'max_tokens_headroom', self.max_tokens_headroom))
+        self.max_tokens_floor = self._get_config_safe('Performance', 'max_tokens_floor', self.max_tokens_floor, int)
+        self.max_tokens_min_samples = self._get_config_safe('Performance', 'max_tokens_min_samples', self.max_tokens_min_samples, int)
+        self.paper_batch_enabled = self._get_config_safe('Performance', 'paper_batch_enabled', self.paper_batch_enabled, bool)
+        self.engine_process_enabled = self._get_config_safe('Performance', 'engine_process_enabled', self.engine_process_enabled, bool)
+        self.record_excel_checkpoint = self._get_config_safe('Performance', 'record_excel_checkpoint', self.record_excel_checkpoint, int)
+        self.record_queue_size = self._get_config_safe('Performance', 'record_queue_size', self.record_queue_size, int)
+        self.grading_ledger_enabled = self._get_config_safe('Performance', 'grading_ledger_enabled', self.grading_ledger_enabled, bool)
+        self.run_journal_enabled = self._get_config_safe('Performance', 'run_journal_enabled', self.run_journal_enabled, bool)
+        self.run_report_enabled = self._get_config_safe('Performance', 'run_report_enabled', self.run_report_enabled, bool)
+        # 加载分数输出配置
+        self.score_sink_mode = self._get_config_safe('ScoreSink', 'mode', self.score_sink_mode).strip().lower() or "gui"
+        self.score_sink_csv_path = self._get_config_safe('ScoreSink', 'csv_path', self.score_sink_csv_path)
+        self.score_sink_http_url = self._get_config_safe('ScoreSink', 'http_url', self.score_sink_http_url)
+        self.score_sink_http_token = self._get_config_safe('ScoreSink', 'http_token', self.score_sink_http_token)
+        self.score_sink_http_timeout = float(self._get_config_safe('ScoreSink', 'http_timeout', self.score_sink_http_timeout))
+        # 加载答案图片来源配置
+        self.image_source_mode = self._get_config_safe('ImageSource', 'mode', self.image_source_mode).strip().lower() or "screen"
+        self.image_source_url_template = self._get_config_safe('ImageSource', 'url_template', self.image_source_url_template)
+        self.image_source_proxy_log_path = self._get_config_safe('ImageSource', 'proxy_log_path', self.image_source_proxy_log_path)
+        self.image_source_url_filter = self._get_config_safe('ImageSource', 'url_filter', self.image_source_url_filter)
+        self.image_source_token = self._get_config_safe('ImageSource', 'token', self.image_source_token)
+        self.image_source_timeout = float(self._get_config_safe('ImageSource', 'timeout', self.image_source_timeout))
+        self.image_source_wait_seconds = float(self._get_config_safe('ImageSource', 'wait_seconds', self.image_source_wait_seconds))
+        # 加载整页扫描导入配置
+        self.sheet_template_dpi = float(self._get_config_safe('SheetScan', 'template_dpi', self.sheet_template_dpi))
+        self.sheet_origin_x = self._get_config_safe('SheetScan', 'origin_x', self.sheet_origin_x, int)
+        self.sheet_origin_y = self._get_config_safe('SheetScan', 'origin_y', self.sheet_origin_y, int)
+        self.sheet_default_dpi = float(self._get_config_safe('SheetScan', 'default_dpi', self.sheet_default_dpi))
+        self.sheet_deskew_enabled = self._get_config_safe('SheetScan', 'deskew_enabled', self.sheet_deskew_enabled, bool)
+        self.sheet_decode_workers = self._get_config_safe('SheetScan', 'decode_workers', self.sheet_decode_workers, int)
+        self.paper_id_enabled = self._get_config_safe('PaperId', 'enabled', self.paper_id_enabled, bool)
+        self.paper_id_mode = self._get_config_safe('PaperId', 'mode', self.paper_id_mode)
+        self.paper_id_area = self._parse_area(self._get_config_safe('PaperId', 'area', ''))
+        self.paper_id_scope = self._get_config_safe('PaperId', 'scope', self.paper_id_scope)
+        self.paper_id_skip_graded = self._get_config_safe('PaperId', 'skip_graded', self.paper_id_skip_graded, bool)
+        self.paper_id_max_consecutive_skips = self._get_config_safe(
+            'PaperId', 'max_consecutive_skips', self.paper_id_max_consecutive_skips, int)
+        self.image_archive_enabled = self._get_config_safe('ImageArchive', 'enabled', self.image_archive_enabled, bool)
+        self.image_archive_dir = self._get_config_safe('ImageArchive', 'dir', self.image_archive_dir)
+        self.image_archive_format = self._get_config_safe('ImageArchive', 'format', self.image_archive_format)
+        self.image_archive_quality = self._get_config_safe('ImageArchive', 'quality', self.image_archive_quality, int)
+        self.image_archive_grayscale = self._get_config_safe('ImageArchive', 'grayscale', self.image_archive_grayscale, bool)
+        self.image_archive_max_size_mb = float(self._get_config_safe('ImageArchive', 'max_size_mb', self.image_archive_max_size_mb))
+        self.image_archive_retention_days = self._get_config_safe('ImageArchive', 'retention_days', self.image_archive_retention_days, int)
+        # 加载模型单价覆盖
+        if self.parser.has_section('Pricing'):
+            self.model_price_overrides = {k: v for k, v in self.parser.items('Pricing') if v}
         # 不再从配置文件读取/写入 UI 字号与字体族（移除用户自行调整字号的设定）
         
         for i in range(1, self.max_questions + 1):
@@ -440,8 +605,35 @@ class ConfigManager:
                 'second_modelID': str(self.second_modelID),
             }
             config['UI'] = {'subject': str(self.subject)}
-            config['Auto'] = {'cycle_number': str(self.cycle_number), 'wait_time': str(self.wait_time)}
-            config['DualEvaluation'] = {'enabled': str(self.dual_evaluation_enabled), 'score_diff_threshold': str(self.score_diff_threshold)}
+            config['Auto'] = {
+                'cycle_number': str(self.cycle_number),
+                'wait_time': str(self.wait_time),
+                'defer_manual_review': str(self.defer_manual_review),
+            }
+            config['DualEvaluation'] = {
+                'enabled': str(self.dual_evaluation_enabled),
+                'score_diff_threshold': str(self.score_diff_threshold),
+                'adaptive_enabled': str(self.adaptive_dual_enabled),
+                'adaptive_sample_rate': str(self.adaptive_dual_sample_rate),
+                'risk_boundary_margin': str(self.adaptive_dual_risk_boundary_margin),
+                'pass_ratio': str(self.adaptive_dual_pass_ratio),
+                'risk_basis_length': str(self.adaptive_dual_risk_basis_length),
+                'risk_ocr_margin': str(self.adaptive_dual_risk_ocr_margin),
+            }
+            config['Cascade'] = {
+                'enabled': str(self.cascade_enabled),
+                'api_provider': str(self.cascade_api_provider),
+                'api_key': str(self.cascade_api_key),
+                'modelID': str(self.cascade_modelID),
+                'boundary_margin': str(self.cascade_boundary_margin),
+            }
+            config['Arbiter'] = {
+                'enabled': str(self.arbiter_enabled),
+                'api_provider': str(self.arbiter_api_provider),
+                'api_key': str(self.arbiter_api_key),
+                'modelID': str(self.arbiter_modelID),
+                'strategy': str(self.arbiter_strategy),
+            }
             # 保存索引值（与UI文本无关）
             config['OCR'] = {
                 'ocr_mode_index': str(self.ocr_mode_index),
@@ -457,6 +649,63 @@ class ConfigManager:
                 'baidu_ocr_token_expires_at': str(self.baidu_ocr_token_expires_at),
                 'baidu_ocr_token_refresh_margin': str(self.baidu_ocr_token_refresh_margin),
             }
+            config['Performance'] = {
+                'adaptive_max_tokens_enabled': str(self.adaptive_max_tokens_enabled),
+                'max_tokens_percentile': str(self.max_tokens_percentile),
+                'max_tokens_headroom': str(self.max_tokens_headroom),
+                'max_tokens_floor': str(self.max_tokens_floor),
+                'max_tokens_min_samples': str(self.max_tokens_min_samples),
+                'paper_batch_enabled': str(self.paper_batch_enabled),
+                'engine_process_enabled': str(self.engine_process_enabled),
+                'record_excel_checkpoint': str(self.record_excel_checkpoint),
+                'record_queue_size': str(self.record_queue_size),
+                'grading_ledger_enabled': str(self.grading_ledger_enabled),
+                'run_journal_enabled': str(self.run_journal_enabled),
+                'run_report_enabled': str(self.run_report_enabled),
+            }
+            config['ScoreSink'] = {
+                'mode': str(self.score_sink_mode),
+                'csv_path': str(self.score_sink_csv_path),
+                'http_url': str(self.score_sink_http_url),
+                'http_token': str(self.score_sink_http_token),
+                'http_timeout': str(self.score_sink_http_timeout),
+            }
+            config['ImageSource'] = {
+                'mode': str(self.image_source_mode),
+                'url_template': str(self.image_source_url_template),
+                'proxy_log_path': str(self.image_source_proxy_log_path),
+                'url_filter': str(self.image_source_url_filter),
+                'token': str(self.image_source_token),
+                'timeout': str(self.image_source_timeout),
+                'wait_seconds': str(self.image_source_wait_seconds),
+            }
+            config['SheetScan'] = {
+                'template_dpi': str(self.sheet_template_dpi),
+                'origin_x': str(self.sheet_origin_x),
+                'origin_y': str(self.sheet_origin_y),
+                'default_dpi': str(self.sheet_default_dpi),
+                'deskew_enabled': str(self.sheet_deskew_enabled),
+                'decode_workers': str(self.sheet_decode_workers),
+            }
+            area = self.paper_id_area
+            config['PaperId'] = {
+                'enabled': str(self.paper_id_enabled),
+                'mode': self.paper_id_mode,
+                'area': f"{area['x1']},{area['y1']},{area['x2']},{area['y2']}" if area else "",
+                'scope': self.paper_id_scope,
+                'skip_graded': str(self.paper_id_skip_graded),
+                'max_consecutive_skips': str(self.paper_id_max_consecutive_skips),
+            }
+            config['ImageArchive'] = {
+                'enabled': str(self.image_archive_enabled),
+                'dir': self.image_archive_dir,
+                'format': self.image_archive_format,
+                'quality': str(self.image_archive_quality),
+                'grayscale': str(self.image_archive_grayscale),
+                'max_size_mb': str(self.image_archive_max_size_mb),
+                'retention_days': str(self.image_archive_retention_days),
+            }
+            config['Pricing'] = {str(k): str(v) for k, v in self.model_price_overrides.items()}
             
             for i in range(1, self.max_questions + 1):
                 section_name = f'Question{i}'
@@ -0,0 +1,202 @@
+# --- START OF FILE engine_process.py ---
+"""
+阅卷引擎子进程模式
+
+GradingThread 与主窗口同在一个解释器中时，JSON解析、正则提取、PIL编码等都会与界面争抢GIL，
+大批量阅卷时界面明显卡顿；引擎一旦崩溃也会连带关闭主窗口。
+
+启用 [Performance] engine_process_enabled 后，引擎改为在独立子进程中运行：
+- 截图、OCR、模型调用、分数输入全部在子进程完成（截图缓冲区不跨进程传输）；
+- 日志、进度、阅卷记录、完成/错误信号通过管道回传，主进程以定时器分批取出并重新发出同名信号；
+- 子进程异常退出时，主进程发出 error_signal，窗口不受影响。
+
+EngineProcessClient 与 GradingThread 的信号和控制接口保持一致（set_parameters/start/stop/isRunning/wait），
+主窗口与 Application 无需区分两种模式。
+"""
+
+import time
+import threading
+import traceback
+import multiprocessing
+from typing import Any, Dict, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from review_queue import ReviewQueue
+
+# 每次定时器回调最多处理的时长（秒），保证界面帧率
+_DRAIN_BUDGET_SECONDS = 0.008
+_POLL_INTERVAL_MS = 16
+
+
+def _engine_main(conn, stop_event, parameters: Dict[str, Any]) -> None:
+    """子进程入口：创建引擎并在本进程主线程中直接执行 run()（子进程不加载Qt）"""
+    send_lock = threading.Lock()
+
+    def _send(*message):
+        try:
+            with send_lock:
+                conn.send(message)
+        except (OSError, EOFError, BrokenPipeError):
+            pass
+
+    try:
+        from config_manager import ConfigManager
+        from api_service import ApiService
+        from grading_core import GradingEngine
+
+        config_manager = ConfigManager()
+        api_service = ApiService(config_manager)
+        worker = GradingEngine(api_service, config_manager)
+
+        # 回调在发出线程中同步执行：信号发出即写入管道（双评并发时多线程发送，用锁串行化）
+        worker.log_signal.connect(lambda msg, is_error, level: _send("log", msg, is_error, level))
+        worker.progress_signal.connect(lambda done, total: _send("progress", done, total))
+        worker.record_signal.connect(lambda record: _send("record", record))
+        worker.finished_signal.connect(lambda: _send("finished"))
+        worker.error_signal.connect(lambda reason: _send("error", reason))
+        worker.threshold_exceeded_signal.connect(lambda reason: _send("threshold_exceeded", reason))
+        worker.manual_intervention_signal.connect(lambda msg, raw: _send("manual_intervention", msg, raw))
+
+        def _watch_stop():
+            stop_event.wait()
+            worker.stop()
+
+        threading.Thread(target=_watch_stop, name="engine-stop-watcher", daemon=True).start()
+
+        worker.set_parameters(**parameters)
+        worker.run()
+    except Exception:
+        _send("crash", traceback.format_exc())
+    finally:
+        _send("exit")
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+class EngineProcessClient(QObject):
+    """在子进程中运行阅卷引擎的代理对象（接口与 GradingThread 一致）"""
+
+    log_signal = pyqtSignal(str, bool, str)
+    progress_signal = pyqtSignal(int, int)
+    finished_signal = pyqtSignal()
+    error_signal = pyqtSignal(str)
+    threshold_exceeded_signal = pyqtSignal(str)
+    manual_intervention_signal = pyqtSignal(str, str)
+    record_signal = pyqtSignal(dict)
+
+    def __init__(self, config_manager, parent=None):
+        super().__init__(parent)
+        self.config_manager = config_manager
+        self.parameters: Dict[str, Any] = {}
+        self.review_queue = ReviewQueue()  # 与子进程使用同一队列目录
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._stop_event = None
+        self._terminal_signal_sent = False
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(_POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._drain_messages)
+
+    def set_parameters(self, **kwargs):
+        self.parameters = kwargs
+
+    def start(self):
+        if self.isRunning():
+            return
+        # 子进程从配置文件加载配置，启动前先落盘，保证与界面一致
+        try:
+            self.config_manager.save_all_configs_to_file()
+        except Exception:
+            pass
+
+        parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+        self._conn = parent_conn
+        self._stop_event = self._ctx.Event()
+        self._terminal_signal_sent = False
+        self._process = self._ctx.Process(
+            target=_engine_main, args=(child_conn, self._stop_event, dict(self.parameters)),
+            name="grading-engine", daemon=True
+        )
+        self._process.start()
+        child_conn.close()  # 子进程退出后父端才能收到EOF
+        self._poll_timer.start()
+
+    def stop(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+        self.log_signal.emit("正在停止自动阅卷引擎进程...", False, "INFO")
+
+    def isRunning(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def wait(self, msecs: Optional[int] = None) -> bool:
+        """等待子进程退出（与 QThread.wait 一致，超时返回False）
+
+        等待期间持续取出管道消息，避免子进程因管道写满而阻塞。
+        """
+        if self._process is None:
+            return True
+        deadline = None if msecs is None else time.monotonic() + msecs / 1000.0
+        while self._process.is_alive():
+            self._drain_messages(time_budget=None)
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._process.join(0.05)
+        self._drain_messages(time_budget=None)
+        return True
+
+    def _drain_messages(self, time_budget: Optional[float] = _DRAIN_BUDGET_SECONDS):
+        """取出管道中的消息并重新发出信号；每次最多占用 time_budget 秒"""
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        try:
+            while self._conn is not None and self._conn.poll():
+                self._dispatch(self._conn.recv())
+                if deadline is not None and time.perf_counter() > deadline:
+                    return
+        except (EOFError, OSError):
+            self._on_process_exit()
+            return
+        if self._conn is not None and self._process is not None and not self._process.is_alive():
+            self._on_process_exit()
+
+    def _dispatch(self, message: tuple):
+        kind, args = message[0], message[1:]
+        if kind == "log":
+            self.log_signal.emit(*args)
+        elif kind == "progress":
+            self.progress_signal.emit(*args)
+        elif kind == "record":
+            self.record_signal.emit(args[0])
+        elif kind == "manual_intervention":
+            self.manual_intervention_signal.emit(*args)
+        elif kind in ("finished", "error", "threshold_exceeded"):
+            self._terminal_signal_sent = True
+            getattr(self, f"{kind}_signal").emit(*args)
+        elif kind == "crash":
+            self.log_signal.emit(f"阅卷引擎进程内部异常:\n{args[0]}", True, "ERROR")
+        elif kind == "exit":
+            self._on_process_exit()
+
+    def _on_process_exit(self):
+        """子进程结束：停止轮询；若未发出完成/错误信号，视为崩溃"""
+        if self._conn is None:
+            return
+        self._poll_timer.stop()
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+        self._conn = None
+        if self._process is not None:
+            self._process.join(1.0)
+        if not self._terminal_signal_sent:
+            self._terminal_signal_sent = True
+            exitcode = self._process.exitcode if self._process is not None else None
+            self.error_signal.emit(f"阅卷引擎进程异常退出（exitcode={exitcode}），主窗口不受影响，请检查日志后重试")
+
+# --- END OF FILE engine_process.py ---
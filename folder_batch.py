@@ -0,0 +1,296 @@
+# --- START OF FILE folder_batch.py ---
+"""
+文件夹批量模式：直接评阅一个目录（或zip压缩包）中已裁好的答案图片
+
+阅卷系统常可直接导出答案切图，此时无需截图与键鼠输入。每张图片仍走与自动阅卷相同的流水线
+（OCR → 提示词 → evaluate_answer → ScoreProcessor → 阅卷记录），但：
+- 多个工作线程并发评分，吞吐只受模型服务商限流约束（429 由统一重试机制处理）；
+- 图片按需流式读取：文件清单只保存路径，读取与base64编码在工作线程中进行，
+  待处理队列有上限，5万张图片时内存占用依然有界；
+- 结果逐行写入CSV（可选同时写入JSONL阅卷记录），单张失败不影响整批。
+
+图片与题目的对应关系：
+- 指定 question_index 时，所有图片都属于该题；
+- 否则按文件名解析“试卷号_题号”，如 0001_3.jpg、0001-q3.png。
+"""
+
+import os
+import re
+import csv
+import json
+import time
+import base64
+import zipfile
+import threading
+from queue import Queue, Empty, Full
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from api_service import ApiService, CancelToken, OutputTokenBudget
+from grading_core import GradingEngine
+from usage_accounting import empty_usage, merge_usage, format_usage
+from image_archive import create_image_archive
+
+IMAGE_EXTENSIONS = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png",
+                    ".webp": "image/webp", ".bmp": "image/bmp"}
+
+_NAME_PATTERN = re.compile(r"^(?P<paper>.+?)[_-]q?(?P<question>\d+)$", re.IGNORECASE)
+
+CSV_FIELDS = ["file", "paper_id", "question_index", "score", "status", "reason"]
+
+
+def parse_image_name(name: str) -> Optional[Tuple[str, int]]:
+    """从文件名解析 (试卷号, 题号)，无法解析时返回 None"""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    match = _NAME_PATTERN.match(stem)
+    if not match:
+        return None
+    return match.group("paper"), int(match.group("question"))
+
+
+def list_answer_images(source: str) -> Tuple[list, Callable[[str], bytes]]:
+    """列出目录或zip中的图片（只取名称，不读内容），返回 (名称列表, 读取函数)"""
+    if os.path.isfile(source) and zipfile.is_zipfile(source):
+        archive = zipfile.ZipFile(source)
+        archive_lock = threading.Lock()  # ZipFile 读取不是线程安全的
+        names = sorted(info.filename for info in archive.infolist()
+                       if not info.is_dir() and os.path.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS)
+
+        def _read_zip(name: str) -> bytes:
+            with archive_lock:
+                return archive.read(name)
+
+        return names, _read_zip
+
+    if not os.path.isdir(source):
+        raise ValueError(f"图片来源不存在或不是目录/zip: {source}")
+    names = []
+    for root, _dirs, files in os.walk(source):
+        for file_name in files:
+            if os.path.splitext(file_name)[1].lower() in IMAGE_EXTENSIONS:
+                names.append(os.path.relpath(os.path.join(root, file_name), source))
+    names.sort()
+
+    def _read_file(name: str) -> bytes:
+        with open(os.path.join(source, name), "rb") as f:
+            return f.read()
+
+    return names, _read_file
+
+
+def to_data_uri(name: str, data: bytes) -> str:
+    mime = IMAGE_EXTENSIONS.get(os.path.splitext(name)[1].lower(), "image/jpeg")
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+class FolderBatchRunner:
+    """并发评阅一个目录/zip中的答案图片"""
+
+    def __init__(self, config_manager, parameters: Dict[str, Any], workers: int = 8,
+                 log_callback: Optional[Callable[[str, bool, str], None]] = None,
+                 record_callback: Optional[Callable[[dict], None]] = None):
+        """
+        Args:
+            config_manager: 配置管理器（模型、OCR等配置）
+            parameters: 与自动阅卷相同的引擎参数（question_configs、dual_evaluation 等）
+            workers: 并发评分的线程数
+            log_callback: 日志回调 (message, is_error, level)
+            record_callback: 阅卷记录回调（明细记录）
+        """
+        self.config_manager = config_manager
+        self.parameters = parameters
+        self.workers = max(1, int(workers))
+        self.log_callback = log_callback or (lambda message, is_error, level: None)
+        self.record_callback = record_callback
+        self.question_configs = {q['question_index']: q for q in parameters.get('question_configs', [])}
+        self.stop_token = CancelToken()
+        self.stats = {'total': 0, 'completed': 0, 'failed': 0, 'skipped': 0, 'elapsed': 0.0, 'error': ''}
+        self.usage = empty_usage()
+        self._stats_lock = threading.Lock()
+        self.image_archive = None  # 各工作线程的引擎共用一个答案图片库
+        self.output_token_budget = OutputTokenBudget()  # 各工作线程共用回复长度样本，学习速度不随并发数摊薄
+
+    def stop(self):
+        """停止批量评分：在途请求立即放弃，未开始的图片不再处理"""
+        self.stop_token.cancel("用户停止批量评分")
+
+    def _iter_tasks(self, names: list, question_index: Optional[int],
+                    read_image: Callable[[str], bytes]) -> Iterator[tuple]:
+        for name in names:
+            if question_index is not None:
+                paper_id, q_index = os.path.splitext(os.path.basename(name))[0], question_index
+            else:
+                parsed = parse_image_name(name)
+                if parsed is None:
+                    yield name, "", None, None
+                    continue
+                paper_id, q_index = parsed
+            yield (name, paper_id, self.question_configs.get(q_index, {'question_index': q_index}),
+                   lambda name=name: to_data_uri(name, read_image(name)))
+
+    def run(self, source: str, output_csv: str, question_index: Optional[int] = None) -> dict:
+        """评阅 source 中的全部图片，结果逐行写入 output_csv，返回统计信息"""
+        names, read_image = list_answer_images(source)
+        self.log_callback(f"批量评分：共 {len(names)} 张图片", False, "INFO")
+        return self.run_tasks(self._iter_tasks(names, question_index, read_image), output_csv)
+
+    def run_tasks(self, task_iter: Iterator[tuple], output_csv: str) -> dict:
+        """评阅任务流，结果逐行写入 output_csv，返回统计信息
+
+        task_iter 产出 (名称, 试卷号, 题目配置, 图片加载函数)；加载函数在工作线程中调用，
+        返回 data URI。任务流被拉取进有界队列，来源可以是文件清单，也可以是整页扫描的裁切流水线；
+        stats['total'] 按实际产出的任务计数。
+        """
+        tasks: Queue = Queue(maxsize=self.workers * 2)
+        results: Queue = Queue()
+        start_time = time.time()
+        self.stats['total'] = 0
+        self.image_archive = create_image_archive(
+            self.config_manager, lambda message: self.log_callback(message, False, "WARNING")
+        )
+
+        def _produce():
+            try:
+                for task in task_iter:
+                    while not self.stop_token.cancelled:
+                        try:
+                            tasks.put(task, timeout=0.2)
+                            with self._stats_lock:
+                                self.stats['total'] += 1
+                            break
+                        except Full:
+                            continue
+                    if self.stop_token.cancelled:
+                        break
+            except Exception as e:
+                # 任务来源出错（读不了zip、扫描件裁切失败等）：其余任务无法产出，记为一条失败并结束批量
+                self.stats['error'] = f"任务来源异常，批量评分提前结束: {e}"
+                self.log_callback(self.stats['error'], True, "ERROR")
+                results.put({'file': '', 'paper_id': '', 'question_index': '', 'score': '',
+                             'status': 'error', 'reason': self.stats['error']})
+            finally:
+                if hasattr(task_iter, "close"):
+                    task_iter.close()  # 生成器来源（如扫描件裁切进程池）停止后及时释放
+                for _ in range(self.workers):
+                    tasks.put(None)
+
+        def _work():
+            engine = self._create_engine()
+            try:
+                while True:
+                    task = tasks.get()
+                    if task is None:
+                        break
+                    try:
+                        row = self._grade_one(engine, task)
+                    except Exception as e:
+                        row = {'file': task[0], 'paper_id': task[1], 'question_index': '', 'score': '',
+                               'status': 'error', 'reason': f"评分异常: {e}"}
+                    results.put(row)
+            finally:
+                with self._stats_lock:
+                    merge_usage(self.usage, engine.usage_tracker.snapshot()['run'])
+                results.put(None)
+
+        threads = [threading.Thread(target=_produce, name="batch-producer", daemon=True)]
+        threads += [threading.Thread(target=_work, name=f"batch-worker-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        finished_workers = 0
+        self.log_callback(f"批量评分：{self.workers} 个并发", False, "INFO")
+        with open(output_csv, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            while finished_workers < self.workers:
+                try:
+                    row = results.get(timeout=0.5)
+                except Empty:
+                    continue
+                if row is None:
+                    finished_workers += 1
+                    continue
+                writer.writerow(row)
+                f.flush()
+                self._count(row)
+
+        if self.image_archive is not None:
+            self.image_archive.close()
+            self.image_archive = None
+        self.stats['elapsed'] = time.time() - start_time
+        self.stats['usage'] = dict(self.usage)
+        self.log_callback(
+            f"批量评分结束：成功 {self.stats['completed']}，失败 {self.stats['failed']}，"
+            f"跳过 {self.stats['skipped']}，用时 {self.stats['elapsed']:.1f} 秒；{format_usage(self.usage)}",
+            False, "INFO"
+        )
+        return self.stats
+
+    def _create_engine(self) -> GradingEngine:
+        """每个工作线程一个引擎（引擎与 ApiService 的题目状态不是线程共享的）"""
+        api_service = ApiService(self.config_manager)
+        api_service.output_token_budget = self.output_token_budget
+        engine = GradingEngine(api_service, self.config_manager)
+        engine.log_signal.connect(self.log_callback)
+        if self.record_callback is not None:
+            engine.record_signal.connect(self.record_callback)
+        engine.set_parameters(**self.parameters)
+        engine.reset_run_state(parent_token=self.stop_token)
+        engine.image_archive = self.image_archive
+        return engine
+
+    def _grade_one(self, engine: GradingEngine, task: tuple) -> dict:
+        name, paper_id, q_config, load_image = task
+        row = {'file': name, 'paper_id': paper_id, 'question_index': '', 'score': '', 'status': '', 'reason': ''}
+        if q_config is None:
+            row.update(status='skipped', reason='文件名无法解析为“试卷号_题号”')
+            return row
+        row['question_index'] = q_config.get('question_index')
+        if not q_config.get('standard_answer'):
+            row.update(status='skipped', reason='该题未配置评分细则')
+            return row
+        if self.stop_token.cancelled:
+            row.update(status='stopped', reason='已停止')
+            return row
+
+        try:
+            img_str = load_image()
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            row.update(status='error', reason=f"读取图片失败: {e}")
+            return row
+
+        scores = []
+        engine.capture_source = lambda _q_config: img_str
+        engine.score_sink = lambda _q_config, score: scores.append(score) or True
+        outcome = engine.grade_image(
+            q_config, img_str,
+            dual_evaluation=bool(self.parameters.get('dual_evaluation', False)),
+            score_diff_threshold=self.parameters.get('score_diff_threshold', 10),
+            paper_id=paper_id
+        )
+        row.update(status=outcome['status'], reason=outcome['reason'])
+        if scores and outcome['status'] == 'completed':
+            row['score'] = scores[-1]
+        return row
+
+    def _count(self, row: dict):
+        if row['status'] == 'completed':
+            self.stats['completed'] += 1
+        elif row['status'] in ('skipped', 'stopped'):
+            self.stats['skipped'] += 1
+        else:
+            self.stats['failed'] += 1
+
+
+def write_record_jsonl(path: str) -> Callable[[dict], None]:
+    """返回把阅卷记录追加写入 JSONL 文件的回调（多线程安全）"""
+    lock = threading.Lock()
+
+    def _write(record: dict):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    return _write
+
+# --- END OF FILE folder_batch.py ---
@@ -0,0 +1,229 @@
+# --- START OF FILE grading_cli.py ---
+"""
+无界面命令行入口：在 Linux 服务器/CI 上运行阅卷核心（不加载Qt、不操作键鼠）
+
+题目配置（评分细则、题型、OCR模式等）与模型配置读取自 config.ini；答案图片由命令行指定，
+分数与阅卷记录输出到终端或 JSONL 文件，便于基准测试各项性能优化；
+指定 --ledger 时阅卷记录同时写入阅卷台账（界面运行按配置写入，命令行运行默认不写入）。
+
+示例：
+    python grading_cli.py --image 1=answers/q1.jpg --image 2=answers/q2.png --records out.jsonl
+    python grading_cli.py --folder crops.zip --question 3 --workers 16 --csv scores.csv --ledger
+    python grading_cli.py --sheets scans/ --workers 16 --csv scores.csv
+"""
+
+import os
+import sys
+import base64
+import argparse
+import threading
+
+from config_manager import ConfigManager
+from api_service import ApiService
+from grading_core import GradingEngine
+from grading_ledger import GradingLedger
+from folder_batch import FolderBatchRunner, write_record_jsonl
+from sheet_ingest import list_sheet_files, build_sheet_options, iter_sheet_tasks
+
+IMAGE_MIME_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+
+EXIT_CODES = {"completed": 0, "error": 1, "threshold_exceeded": 2}
+
+
+def load_image_as_data_uri(path: str) -> str:
+    """读取图片文件为 data URI（与屏幕截图的格式一致）"""
+    mime = IMAGE_MIME_TYPES.get(os.path.splitext(path)[1].lower(), "image/jpeg")
+    with open(path, "rb") as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode()}"
+
+
+def parse_image_args(items) -> dict:
+    """解析 --image 题号=路径，返回 {题号: 路径}"""
+    images = {}
+    for item in items or []:
+        index, sep, path = item.partition("=")
+        if not sep or not index.strip().isdigit():
+            raise ValueError(f"--image 参数格式应为 题号=图片路径: {item}")
+        if not os.path.isfile(path):
+            raise ValueError(f"图片不存在: {path}")
+        images[int(index)] = path
+    return images
+
+
+def build_run_parameters(config_manager, question_indices, dual_evaluation: bool) -> dict:
+    """按界面启动阅卷时的方式组装引擎参数"""
+    dual_evaluation = dual_evaluation and len(question_indices) == 1  # 多题模式不支持双评
+    question_configs = []
+    for q_idx in question_indices:
+        q_config = config_manager.get_question_config(q_idx).copy()
+        q_config['question_index'] = q_idx
+        q_config['dual_eval_enabled'] = dual_evaluation
+        question_configs.append(q_config)
+    return {
+        'cycle_number': 1,
+        'wait_time': 0,
+        'question_configs': question_configs,
+        'dual_evaluation': dual_evaluation,
+        'score_diff_threshold': config_manager.score_diff_threshold,
+        'first_model_id': config_manager.first_modelID,
+        'second_model_id': config_manager.second_modelID,
+        'is_single_question_one_run': len(question_indices) == 1,
+        'paper_batch_mode': config_manager.paper_batch_enabled,
+    }
+
+
+def build_record_callback(records_path, ledger):
+    """阅卷记录回调：追加写入 JSONL 文件和/或写入阅卷台账；都未指定时返回 None"""
+    callbacks = []
+    if records_path:
+        callbacks.append(write_record_jsonl(records_path))
+    if ledger is not None:
+        callbacks.append(lambda record: ledger.add_records([record]))
+    if not callbacks:
+        return None
+
+    def _record(record: dict):
+        for callback in callbacks:
+            callback(record)
+
+    return _record
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AI阅卷核心命令行（无界面）")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--image", action="append", metavar="题号=路径",
+                        help="题目的答案图片，可重复指定")
+    source.add_argument("--folder", metavar="DIR_OR_ZIP",
+                        help="批量模式：评阅目录或zip中已裁好的答案图片")
+    source.add_argument("--sheets", metavar="FILE_OR_DIR",
+                        help="批量模式：整页扫描件（多页TIFF/PDF），按各题答题区域模板裁切后评阅")
+    parser.add_argument("--question", type=int, help="批量模式：所有图片都属于该题（否则按文件名 试卷号_题号 解析）")
+    parser.add_argument("--workers", type=int, default=8, help="批量模式：并发评分线程数")
+    parser.add_argument("--csv", metavar="FILE", default="批量评分结果.csv", help="批量模式：分数输出的CSV文件")
+    parser.add_argument("--dual", action="store_true", help="启用双评（仅单题时生效）")
+    parser.add_argument("--records", metavar="FILE", help="阅卷记录追加写入的 JSONL 文件")
+    parser.add_argument("--ledger", nargs="?", const="", metavar="DB",
+                        help="阅卷记录同时写入阅卷台账（不给路径时为 阅卷记录/阅卷台账.sqlite3）")
+    parser.add_argument("--verbose", action="store_true", help="输出 DETAIL 级别日志")
+    args = parser.parse_args(argv)
+
+    def _log(message, is_error, level):
+        if args.verbose or level != "DETAIL":
+            print(f"[{level}] {message}", file=sys.stderr)
+
+    ledger = GradingLedger(args.ledger or None) if args.ledger is not None else None
+    try:
+        if args.folder or args.sheets:
+            return run_folder_batch(args, _log, build_record_callback(args.records, ledger))
+        return run_images(args, parser, _log, build_record_callback(args.records, ledger))
+    finally:
+        if ledger is not None:
+            ledger.close()
+
+
+def run_images(args, parser, _log, record_callback) -> int:
+    """单份模式：按 --image 指定的各题答案图片评阅一份试卷"""
+    try:
+        images = parse_image_args(args.image)
+    except ValueError as e:
+        parser.error(str(e))
+
+    config_manager = ConfigManager()
+    missing = [i for i in images if not config_manager.get_question_config(i).get('standard_answer')]
+    if missing:
+        print(f"以下题目未在配置中设置评分细则: {missing}", file=sys.stderr)
+        return EXIT_CODES["error"]
+
+    engine = GradingEngine(ApiService(config_manager), config_manager)
+    engine.capture_source = lambda q_config: load_image_as_data_uri(images[q_config['question_index']])
+
+    scores = {}
+
+    def _score_sink(q_config, score):
+        scores[q_config['question_index']] = score
+        print(f"第{q_config['question_index']}题: {score}")
+        return True
+
+    engine.score_sink = _score_sink
+
+    def _record(record):
+        if record_callback is not None:
+            record_callback(record)
+        if record.get('record_type') == 'summary':
+            print(f"用时 {record.get('total_elapsed_time_seconds', 0):.2f} 秒", file=sys.stderr)
+
+    engine.log_signal.connect(_log)
+    engine.record_signal.connect(_record)
+    engine.manual_intervention_signal.connect(lambda message, _raw: print(f"需人工介入: {message}", file=sys.stderr))
+    engine.set_parameters(**build_run_parameters(config_manager, sorted(images), args.dual))
+
+    # 引擎在工作线程中运行，主线程响应 Ctrl+C 并请求停止
+    worker = threading.Thread(target=engine.run, name="grading-engine")
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        engine.stop()
+        worker.join()
+
+    if engine.completion_status != "completed":
+        print(f"阅卷未完成: {engine.interrupt_reason}", file=sys.stderr)
+    return EXIT_CODES.get(engine.completion_status, EXIT_CODES["error"])
+
+
+def run_folder_batch(args, log, record_callback=None) -> int:
+    """批量模式：并发评阅目录/zip中的答案图片，或整页扫描件的裁切结果"""
+    config_manager = ConfigManager()
+    if args.question is not None:
+        question_indices = [args.question]
+    else:
+        question_indices = [i for i in config_manager.get_enabled_questions()
+                            if config_manager.get_question_config(i).get('standard_answer')]
+    if not question_indices:
+        print("没有配置评分细则的题目，请用 --question 指定或在配置中启用题目", file=sys.stderr)
+        return EXIT_CODES["error"]
+
+    parameters = build_run_parameters(config_manager, question_indices, args.dual)
+    runner = FolderBatchRunner(
+        config_manager, parameters, workers=args.workers, log_callback=log, record_callback=record_callback
+    )
+
+    if args.sheets:
+        options = build_sheet_options(config_manager, runner.question_configs)
+        if not options['boxes']:
+            print("所选题目均未设置答题区域，无法从扫描件裁切", file=sys.stderr)
+            return EXIT_CODES["error"]
+        try:
+            files = list_sheet_files(args.sheets)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return EXIT_CODES["error"]
+        tasks = iter_sheet_tasks(files, runner.question_configs, options, config_manager.sheet_decode_workers)
+        log(f"整页扫描：{len(files)} 个文件，裁切 {len(options['boxes'])} 道题", False, "INFO")
+        batch = lambda: runner.run_tasks(tasks, args.csv)
+    else:
+        batch = lambda: runner.run(args.folder, args.csv, question_index=args.question)
+
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(batch()), name="folder-batch")
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        runner.stop()
+        worker.join()
+
+    total = result.get('total') or sum(result.get(k, 0) for k in ('completed', 'failed', 'skipped'))
+    if result.get('error'):
+        print(result['error'], file=sys.stderr)
+    print(f"完成 {result.get('completed', 0)}/{total}，结果已写入 {args.csv}")
+    return EXIT_CODES["completed"] if not result.get('failed') else EXIT_CODES["error"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE grading_cli.py ---
@@ -0,0 +1,325 @@
+# --- START OF FILE grading_ledger.py ---
+"""
+阅卷台账（SQLite）
+
+阅卷历史原本只存在按日期、题数、单双评命名的多个Excel中，查询“上周二第3题双评分差大于2的所有试卷”
+需要逐个打开工作簿。台账把每条明细记录存为 grades 表的一行：
+- 时间、题号、服务商/模型、分数、双评分差等常用筛选列建有索引，查询只需毫秒；
+- 模型原始回复、OCR原文等大字段zlib压缩后存入 grade_raw 附表，不拖慢主表扫描；
+- 汇总记录按 run_id 存入 runs 表；
+- export_excel() 以查询结果生成与现有阅卷记录相同布局的Excel。
+
+命令行示例：
+    python grading_ledger.py --question 3 --since 2026-10-13 --until 2026-10-13 --min-diff 2 --export 第3题.xlsx
+"""
+
+import os
+import sys
+import json
+import zlib
+import sqlite3
+import argparse
+import datetime
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from record_writer import SHEET_NAME, build_detail_rows, write_workbook
+
+# 压缩存入 grade_raw 的大字段
+RAW_FIELDS = (
+    'raw_ai_response', 'api1_raw_response', 'api2_raw_response', 'arbiter_raw_response',
+    'ocr_recognized_text', 'ocr_confidence_meta', 'student_answer', 'reasoning_basis',
+    'api1_scoring_basis', 'api2_scoring_basis', 'arbiter_scoring_basis',
+    'api1_student_answer_summary', 'api2_student_answer_summary',
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS grades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    graded_at TEXT NOT NULL,
+    run_id TEXT,
+    paper_no INTEGER,
+    paper_id TEXT,
+    question_index INTEGER,
+    is_dual INTEGER NOT NULL DEFAULT 0,
+    provider TEXT,
+    model_id TEXT,
+    second_provider TEXT,
+    second_model_id TEXT,
+    score REAL,
+    api1_score REAL,
+    api2_score REAL,
+    score_difference REAL,
+    grading_tier TEXT,
+    cost REAL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS grade_raw (
+    grade_id INTEGER PRIMARY KEY REFERENCES grades(id) ON DELETE CASCADE,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    finished_at TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_grades_graded_at ON grades(graded_at);
+CREATE INDEX IF NOT EXISTS idx_grades_question ON grades(question_index, graded_at);
+CREATE INDEX IF NOT EXISTS idx_grades_model ON grades(provider, model_id);
+CREATE INDEX IF NOT EXISTS idx_grades_second_model ON grades(second_provider, second_model_id);
+CREATE INDEX IF NOT EXISTS idx_grades_score ON grades(score);
+CREATE INDEX IF NOT EXISTS idx_grades_run ON grades(run_id);
+CREATE INDEX IF NOT EXISTS idx_grades_paper ON grades(paper_id, question_index);
+"""
+
+
+def default_ledger_path() -> str:
+    """默认台账路径：阅卷记录/阅卷台账.sqlite3"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "阅卷记录", "阅卷台账.sqlite3")
+
+
+def parse_record_timestamp(timestamp: Any) -> str:
+    """把记录中的“2025年09月20日_14点03分05秒”转为可排序的 ISO 时间，无法解析时取当前时间"""
+    try:
+        parsed = datetime.datetime.strptime(str(timestamp), '%Y年%m月%d日_%H点%M分%S秒')
+    except (TypeError, ValueError):
+        parsed = datetime.datetime.now()
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class GradingLedger:
+    """阅卷台账（线程安全：单连接 + 锁，由后台记录写入线程批量写入）"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or default_ledger_path()
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """旧版台账的单评记录一律记为第一模型；按记录中的 api_calls 改为实际给出分数的模型（级联快速模型等）"""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= 1:
+            return
+        updates = []
+        for grade_id, record_json in self._conn.execute("SELECT id, record FROM grades WHERE is_dual = 0"):
+            try:
+                calls = json.loads(record_json).get('api_calls') or []
+            except (ValueError, AttributeError):
+                continue
+            final_call = next((call for call in reversed(calls) if not call.get('failed')), None)
+            if final_call and final_call.get('model_id'):
+                updates.append((final_call.get('provider') or None, final_call['model_id'], grade_id))
+        with self._conn:
+            self._conn.executemany("UPDATE grades SET provider = COALESCE(?, provider), model_id = ? WHERE id = ?",
+                                   updates)
+            self._conn.execute("PRAGMA user_version = 1")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def add_records(self, records: Iterable[dict]) -> int:
+        """在一个事务中写入一批记录（明细与汇总），返回写入的明细条数"""
+        count = 0
+        with self._lock, self._conn:
+            for record in records:
+                if record.get('record_type') == 'summary':
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO runs (run_id, finished_at, summary) VALUES (?, ?, ?)",
+                        (record.get('run_id') or parse_record_timestamp(record.get('timestamp')),
+                         parse_record_timestamp(record.get('timestamp')),
+                         json.dumps(record, ensure_ascii=False, default=str))
+                    )
+                    continue
+                self._insert_grade(record)
+                count += 1
+        return count
+
+    def _insert_grade(self, record: dict) -> None:
+        raw = {key: record[key] for key in RAW_FIELDS if key in record}
+        slim = {key: value for key, value in record.items() if key not in raw}
+        is_dual = bool(record.get('is_dual_evaluation'))
+        cursor = self._conn.execute(
+            "INSERT INTO grades (graded_at, run_id, paper_no, paper_id, question_index, is_dual, provider, model_id, "
+            "second_provider, second_model_id, score, api1_score, api2_score, score_difference, grading_tier, cost, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (parse_record_timestamp(record.get('timestamp')), record.get('run_id'), record.get('paper_no'),
+             record.get('paper_id'), record.get('question_index'), int(is_dual),
+             record.get('provider'), record.get('model_id'),
+             record.get('second_provider'), record.get('second_model_id'),
+             _to_float(record.get('total_score')),
+             _to_float(record.get('api1_raw_score')) if is_dual else None,
+             _to_float(record.get('api2_raw_score')) if is_dual else None,
+             _to_float(record.get('score_difference')) if is_dual else None,
+             record.get('grading_tier'), _to_float(record.get('estimated_cost')),
+             json.dumps(slim, ensure_ascii=False, default=str))
+        )
+        if raw:
+            self._conn.execute(
+                "INSERT INTO grade_raw (grade_id, data) VALUES (?, ?)",
+                (cursor.lastrowid, zlib.compress(json.dumps(raw, ensure_ascii=False, default=str).encode("utf-8")))
+            )
+
+    def graded_paper_ids(self, question_indices: Iterable[int]) -> set:
+        """已评完给定全部题目的试卷标识（用于试卷身份识别时跳过已评试卷）"""
+        indices = sorted(set(question_indices))
+        if not indices:
+            return set()
+        placeholders = ", ".join("?" * len(indices))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT paper_id FROM grades WHERE paper_id IS NOT NULL AND paper_id != '' "
+                f"AND question_index IN ({placeholders}) GROUP BY paper_id "
+                f"HAVING COUNT(DISTINCT question_index) = ?",
+                indices + [len(indices)]
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def query(self, question_index: Optional[int] = None, since: Optional[str] = None, until: Optional[str] = None,
+              min_score_difference: Optional[float] = None, provider: Optional[str] = None,
+              model_id: Optional[str] = None, run_id: Optional[str] = None,
+              min_score: Optional[float] = None, max_score: Optional[float] = None,
+              include_raw: bool = False, limit: Optional[int] = None) -> List[dict]:
+        """按条件查询明细记录，返回记录字典（按时间排序）
+
+        since/until 为 'YYYY-MM-DD' 或 'YYYY-MM-DD HH:MM:SS'；只给日期时 until 包含当天全天。
+        """
+        conditions, params = [], []
+        if question_index is not None:
+            conditions.append("g.question_index = ?")
+            params.append(question_index)
+        if since:
+            conditions.append("g.graded_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("g.graded_at <= ?")
+            params.append(until + " 23:59:59" if len(until) == 10 else until)
+        if min_score_difference is not None:
+            conditions.append("g.score_difference > ?")
+            params.append(min_score_difference)
+        if provider:
+            conditions.append("(g.provider = ? OR g.second_provider = ?)")
+            params.extend([provider, provider])
+        if model_id:
+            conditions.append("(g.model_id = ? OR g.second_model_id = ?)")
+            params.extend([model_id, model_id])
+        if run_id:
+            conditions.append("g.run_id = ?")
+            params.append(run_id)
+        if min_score is not None:
+            conditions.append("g.score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            conditions.append("g.score <= ?")
+            params.append(max_score)
+
+        sql = "SELECT g.id, g.graded_at, g.record" + (", r.data" if include_raw else "") + " FROM grades g"
+        if include_raw:
+            sql += " LEFT JOIN grade_raw r ON r.grade_id = g.id"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY g.graded_at, g.id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            record = json.loads(row[2])
+            if include_raw and row[3] is not None:
+                record.update(json.loads(zlib.decompress(row[3]).decode("utf-8")))
+            record['ledger_id'] = row[0]
+            record['graded_at'] = row[1]
+            results.append(record)
+        return results
+
+    def query_runs(self, since: Optional[str] = None, until: Optional[str] = None) -> List[dict]:
+        """按结束时间查询汇总记录（按时间排序）"""
+        conditions, params = [], []
+        if since:
+            conditions.append("finished_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("finished_at <= ?")
+            params.append(until + " 23:59:59" if len(until) == 10 else until)
+        sql = "SELECT finished_at, summary FROM runs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY finished_at"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = []
+        for finished_at, summary in rows:
+            record = json.loads(summary)
+            record['finished_at'] = finished_at
+            results.append(record)
+        return results
+
+    def export_excel(self, excel_path: str, **filters) -> int:
+        """把查询结果导出为与阅卷记录相同布局的Excel（单评、双评混合时分两个工作表），返回记录条数"""
+        records = self.query(include_raw=True, **filters)
+        groups: Dict[str, List[dict]] = {}
+        for record in records:
+            headers, rows = build_detail_rows(record)
+            name = "双评" if record.get('is_dual_evaluation') else "单评"
+            groups.setdefault(name, []).append({"headers": headers, "rows": rows})
+        if len(groups) == 1:
+            groups = {SHEET_NAME: next(iter(groups.values()))}
+        write_workbook(groups or {SHEET_NAME: []}, excel_path)
+        return len(records)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="查询阅卷台账并导出Excel")
+    parser.add_argument("--db", help="台账文件（默认 阅卷记录/阅卷台账.sqlite3）")
+    parser.add_argument("--question", type=int, help="题号")
+    parser.add_argument("--since", help="起始时间 YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--until", help="截止时间 YYYY-MM-DD[ HH:MM:SS]（只给日期时含当天）")
+    parser.add_argument("--min-diff", type=float, help="双评分差大于该值")
+    parser.add_argument("--provider", help="服务商（第一或第二模型）")
+    parser.add_argument("--model", help="模型ID（第一或第二模型）")
+    parser.add_argument("--run", help="运行标识 run_id")
+    parser.add_argument("--export", metavar="FILE", help="导出为Excel；不指定时在终端列出")
+    args = parser.parse_args(argv)
+
+    ledger = GradingLedger(args.db)
+    filters = dict(question_index=args.question, since=args.since, until=args.until,
+                   min_score_difference=args.min_diff, provider=args.provider,
+                   model_id=args.model, run_id=args.run)
+    if args.export:
+        count = ledger.export_excel(args.export, **filters)
+        print(f"已导出 {count} 条记录到 {args.export}")
+    else:
+        for record in ledger.query(**filters):
+            diff = record.get('score_difference')
+            print(f"{record['graded_at']}  第{record.get('question_index')}题  得分 {record.get('total_score')}"
+                  + (f"  分差 {diff}" if record.get('is_dual_evaluation') else "")
+                  + f"  {record.get('model_id') or ''}")
+    ledger.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE grading_ledger.py ---
@@ -0,0 +1,241 @@
+# --- START OF FILE image_archive.py ---
+"""
+答案图片库（按内容寻址、去重）
+
+record_grading_result 拿到答案图片却从不保存，事后无法核对某个分数依据的是哪张图片；
+直接保存PNG又会很快占满磁盘。图片库按内容哈希存放：
+- 键为原始图片字节的 SHA-256，同一张图片无论出现多少次只保存一份；
+- 重新编码为 WebP（可选灰度；Pillow 不支持 WebP 时退回 PNG），体积通常只有截图的几分之一；
+- 按哈希前两级分目录（ab/cd/<hash>.webp），单个目录文件数有界；
+- 编码与写盘在后台线程进行，评分线程只计算哈希并入队；
+- 保留天数与总容量上限可配置，超出时按修改时间删除最旧的图片。
+
+明细记录中的 image_key 即图片的键，load_archived_image(key) 可取回图片（用于复核与重评，见 regrade.py）。
+"""
+
+import os
+import sys
+import time
+import base64
+import hashlib
+import threading
+from io import BytesIO
+from queue import Queue, Full
+from typing import Optional
+
+ARCHIVE_FORMATS = ("webp", "png")
+_EXTENSIONS = (".webp", ".png")
+_MIME = {".webp": "image/webp", ".png": "image/png"}
+# 每写入多少张图片检查一次保留期限与容量
+_LIMIT_CHECK_EVERY = 200
+# 写入队列已满时最多等待的秒数（短暂的磁盘抖动不丢图，持续过慢时不拖住评分）
+_FULL_QUEUE_WAIT = 2.0
+
+
+def default_archive_dir() -> str:
+    """默认图片库目录：阅卷记录/答案图片库"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "阅卷记录", "答案图片库")
+
+
+def decode_data_uri(img_str: str) -> bytes:
+    """data URI 或纯 base64 → 图片字节"""
+    marker = "base64,"
+    pos = img_str.find(marker)
+    return base64.b64decode(img_str[pos + len(marker):] if pos != -1 else img_str)
+
+
+def archived_image_path(key: str, root: Optional[str] = None) -> Optional[str]:
+    """图片库中某个键对应的文件路径；不存在时返回 None"""
+    if not key or len(key) < 4:
+        return None
+    directory = os.path.join(root or default_archive_dir(), key[:2], key[2:4])
+    for extension in _EXTENSIONS:
+        path = os.path.join(directory, key + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_archived_image(key: str, root: Optional[str] = None) -> Optional[str]:
+    """按键取回图片（data URI），只读、不启动后台线程与清理（供重评等离线工具使用）"""
+    path = archived_image_path(key, root)
+    if path is None:
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    return f"data:{_MIME[os.path.splitext(path)[1]]};base64,{base64.b64encode(data).decode()}"
+
+
+class ImageArchive:
+    """按内容寻址的答案图片库（线程安全，可供多个评分线程共用）"""
+
+    def __init__(self, root: Optional[str] = None, image_format: str = "webp", quality: int = 70,
+                 grayscale: bool = False, max_size_mb: float = 2048, retention_days: int = 180,
+                 max_queue: int = 200, log_callback=None):
+        if image_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"未知的图片库格式: {image_format}（可选 {', '.join(ARCHIVE_FORMATS)}）")
+        self.root = root or default_archive_dir()
+        self.image_format = image_format
+        self.quality = max(1, min(100, int(quality)))
+        self.grayscale = grayscale
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb and max_size_mb > 0 else 0
+        self.retention_seconds = retention_days * 86400 if retention_days and retention_days > 0 else 0
+        self._log = log_callback or (lambda message: None)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._written_since_check = 0
+        self._queue: Queue = Queue(maxsize=max(1, int(max_queue)))
+        self._thread = threading.Thread(target=self._run, name="image-archive", daemon=True)
+        self._thread.start()
+        self._queue.put(("limits", None, None))  # 启动时先清理一次过期图片
+
+    def _shard_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4])
+
+    def path_for(self, key: str) -> Optional[str]:
+        """已保存图片的路径；不存在时返回 None"""
+        return archived_image_path(key, self.root)
+
+    def add(self, img_str: str) -> str:
+        """登记一张答案图片，返回其键（图片在后台编码保存；已存在的图片不重复保存）
+
+        写入队列持续已满、图片未能入库时返回空字符串，记录中不留下指向不存在图片的键。
+        """
+        if not img_str:
+            return ""
+        data = decode_data_uri(img_str)
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if key in self._pending:
+                return key
+            self._pending.add(key)
+        existing = self.path_for(key)
+        if existing is not None:
+            try:
+                os.utime(existing)  # 保留期限从最近一次出现算起
+            except OSError:
+                pass
+            with self._lock:
+                self._pending.discard(key)
+            return key
+        try:
+            self._queue.put(("save", key, data), timeout=_FULL_QUEUE_WAIT)
+        except Full:
+            with self._lock:
+                self._pending.discard(key)
+            self._log("答案图片库写入队列已满，本张图片未保存")
+            return ""
+        return key
+
+    def load_data_uri(self, key: str) -> Optional[str]:
+        """按键取回图片（data URI）；已被清理或从未保存时返回 None"""
+        return load_archived_image(key, self.root)
+
+    def _encode(self, data: bytes):
+        """重新编码，返回 (扩展名, 字节)"""
+        from PIL import Image
+        with Image.open(BytesIO(data)) as image:
+            image = image.convert("L" if self.grayscale else "RGB")
+            buffered = BytesIO()
+            try:
+                if self.image_format == "webp":
+                    try:
+                        image.save(buffered, format="WEBP", quality=self.quality, method=4)
+                        return ".webp", buffered.getvalue()
+                    except (KeyError, OSError):
+                        buffered.seek(0)
+                        buffered.truncate()
+                image.save(buffered, format="PNG", optimize=True)
+                return ".png", buffered.getvalue()
+            finally:
+                image.close()
+
+    def _save(self, key: str, data: bytes) -> None:
+        extension, encoded = self._encode(data)
+        directory = self._shard_dir(key)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, key + extension)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(encoded)
+        os.replace(temp_path, path)
+
+    def enforce_limits(self) -> int:
+        """删除超过保留期限的图片，总容量仍超限时按修改时间删除最旧的，返回删除数量"""
+        if not (self.retention_seconds or self.max_bytes) or not os.path.isdir(self.root):
+            return 0
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if os.path.splitext(name)[1] in _EXTENSIONS:
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        cutoff = time.time() - self.retention_seconds if self.retention_seconds else None
+        removed = 0
+        for mtime, size, path in files:
+            expired = cutoff is not None and mtime < cutoff
+            if not expired and not (self.max_bytes and total > self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            self._log(f"答案图片库已清理 {removed} 张过期或超出容量的图片")
+        return removed
+
+    def _run(self) -> None:
+        while True:
+            action, key, data = self._queue.get()
+            if action == "stop":
+                break
+            try:
+                if action == "limits":
+                    self.enforce_limits()
+                    continue
+                self._save(key, data)
+                self._written_since_check += 1
+                if self._written_since_check >= _LIMIT_CHECK_EVERY:
+                    self._written_since_check = 0
+                    self.enforce_limits()
+            except Exception as e:
+                self._log(f"答案图片保存失败: {e}")
+            finally:
+                if key is not None:
+                    with self._lock:
+                        self._pending.discard(key)
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """写完队列中的图片后结束后台线程"""
+        if self._thread.is_alive():
+            self._queue.put(("stop", None, None))
+            self._thread.join(timeout)
+
+
+def create_image_archive(config_manager, log_callback=None) -> Optional[ImageArchive]:
+    """按配置创建答案图片库；未启用时返回 None"""
+    if not getattr(config_manager, 'image_archive_enabled', False):
+        return None
+    return ImageArchive(
+        getattr(config_manager, 'image_archive_dir', '') or None,
+        image_format=(getattr(config_manager, 'image_archive_format', 'webp') or 'webp').strip().lower(),
+        quality=getattr(config_manager, 'image_archive_quality', 70),
+        grayscale=getattr(config_manager, 'image_archive_grayscale', False),
+        max_size_mb=float(getattr(config_manager, 'image_archive_max_size_mb', 2048)),
+        retention_days=getattr(config_manager, 'image_archive_retention_days', 180),
+        log_callback=log_callback,
+    )
+
+# --- END OF FILE image_archive.py ---
@@ -0,0 +1,210 @@
+# --- START OF FILE image_sources.py ---
+"""
+答案图片来源（image source）
+
+GradingEngine 的 capture_source 钩子决定答案图片从哪里来，调用形式为 source(q_config) -> data URI：
+- screen（默认）：不设置钩子，由引擎隐藏窗口后按答案区域截屏（ImageGrab，JPEG重编码）；
+- http：按URL模板直接下载阅卷网页已加载的原始答案图片，清晰度更高、体积更小，且无需隐藏窗口的等待；
+- proxy_log：本地代理把阅卷网页请求的答案图片URL逐行记入日志，按题号取最新一条下载。
+
+URL模板与过滤条件可使用占位符 {question_index}（题号）与 {paper_no}（引擎当前的试卷序号，
+续阅时接着中断前的序号，跳过/转待复核的试卷同样计数，与阅卷记录中的试卷序号一致）。
+模式与参数保存在配置的 [ImageSource] 段，create_image_source() 按配置创建。
+"""
+
+import os
+import re
+import abc
+import json
+import time
+import base64
+import threading
+from typing import Optional
+
+IMAGE_SOURCE_MODES = ("screen", "http", "proxy_log")
+
+_MIME_BY_EXTENSION = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png",
+                      ".webp": "image/webp", ".bmp": "image/bmp", ".gif": "image/gif"}
+
+
+class ImageSource(abc.ABC):
+    """图片来源基类：可直接赋给 GradingEngine.capture_source"""
+
+    mode = ""
+
+    def __init__(self, token: str = "", timeout: float = 10.0):
+        import requests  # 与 api_service 相同的依赖
+        self._requests = requests
+        self.timeout = timeout
+        self._paper_counts = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        if token:
+            self._session.headers["Authorization"] = f"Bearer {token}"
+
+    def __call__(self, q_config: dict, paper_no: Optional[int] = None) -> Optional[str]:
+        """paper_no 由引擎传入当前试卷序号（与阅卷记录、待复核队列一致）；
+        未传入时（单独调用）才按本对象内该题的调用次数计数"""
+        question_index = q_config.get('question_index', '')
+        with self._lock:
+            if paper_no is None:
+                paper_no = self._paper_counts.get(question_index, 0) + 1
+            self._paper_counts[question_index] = paper_no
+        return self.fetch(q_config, paper_no)
+
+    @abc.abstractmethod
+    def fetch(self, q_config: dict, paper_no: int) -> Optional[str]:
+        """返回第 paper_no 份试卷该题答案图片的 data URI"""
+
+    def _download(self, url: str) -> str:
+        """下载图片并转为 data URI（失败抛出异常，由引擎按截图失败处理）"""
+        response = self._session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        mime = response.headers.get("Content-Type", "").split(";")[0].strip()
+        if not mime.startswith("image/"):
+            path = url.split("?", 1)[0]
+            mime = _MIME_BY_EXTENSION.get(os.path.splitext(path)[1].lower(), "")
+        if not mime:
+            raise ValueError(f"返回内容不是图片: {url}")
+        if not response.content:
+            raise ValueError(f"图片内容为空: {url}")
+        return f"data:{mime};base64,{base64.b64encode(response.content).decode()}"
+
+    def describe(self) -> str:
+        return self.mode
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class HttpImageSource(ImageSource):
+    """按URL模板下载原始答案图片"""
+
+    mode = "http"
+
+    def __init__(self, url_template: str, token: str = "", timeout: float = 10.0):
+        if not url_template:
+            raise ValueError("HTTP图片来源未配置URL模板（[ImageSource] url_template）")
+        super().__init__(token, timeout)
+        self.url_template = url_template
+
+    def fetch(self, q_config: dict, paper_no: int) -> Optional[str]:
+        url = (self.url_template.replace("{question_index}", str(q_config.get('question_index', '')))
+               .replace("{paper_no}", str(paper_no)))
+        return self._download(url)
+
+    def describe(self) -> str:
+        return f"http（{self.url_template}）"
+
+
+class ProxyLogImageSource(ImageSource):
+    """从本地代理日志中取阅卷网页最新加载的答案图片URL
+
+    日志每行一个URL，或一个含 "url" 字段的JSON对象。url_filter 为正则（可含 {question_index}），
+    用于区分各题的图片请求；同一URL只使用一次，新URL未出现时最多等待 wait_seconds 秒。
+    日志被轮转或截断（文件变小）时从头读取。
+    """
+
+    mode = "proxy_log"
+    _POLL_INTERVAL = 0.1
+    _MAX_PENDING_URLS = 500
+    _MAX_USED_URLS = 5000
+
+    def __init__(self, log_path: str, url_filter: str = "", token: str = "",
+                 timeout: float = 10.0, wait_seconds: float = 5.0):
+        if not log_path:
+            raise ValueError("代理日志图片来源未配置日志路径（[ImageSource] proxy_log_path）")
+        super().__init__(token, timeout)
+        self.log_path = log_path
+        self.url_filter = url_filter
+        self.wait_seconds = wait_seconds
+        self._patterns = {}
+        if url_filter:
+            try:
+                self._compile_filter("1")
+            except re.error as e:
+                raise ValueError(f"代理日志URL过滤正则无效（[ImageSource] url_filter）: {e}")
+        self._used_urls = {}  # 按使用顺序保存，超出上限时淘汰最早的
+        # 只使用启动之后新出现的请求
+        self._offset = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        self._pending_urls = []
+
+    def _compile_filter(self, question_index: str):
+        """按题号编译过滤正则（每题只编译一次）"""
+        pattern = self._patterns.get(question_index)
+        if pattern is None:
+            pattern = re.compile(self.url_filter.replace("{question_index}", re.escape(question_index)))
+            self._patterns[question_index] = pattern
+        return pattern
+
+    def _mark_used(self, url: str) -> None:
+        self._used_urls[url] = None
+        while len(self._used_urls) > self._MAX_USED_URLS:
+            del self._used_urls[next(iter(self._used_urls))]
+
+    def _read_new_urls(self) -> None:
+        if not os.path.exists(self.log_path):
+            return
+        if os.path.getsize(self.log_path) < self._offset:
+            self._offset = 0  # 日志已轮转或截断
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        # 只消费完整的行，未写完的行留到下次
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for raw_line in complete.splitlines():
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    line = str(json.loads(line).get("url", ""))
+                except (ValueError, AttributeError):
+                    continue
+            if line:
+                self._pending_urls.append(line)
+        del self._pending_urls[:-self._MAX_PENDING_URLS]  # 与答案无关的请求不无限累积
+
+    def fetch(self, q_config: dict, paper_no: int) -> Optional[str]:
+        question_index = str(q_config.get('question_index', ''))
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            with self._lock:
+                pattern = self._compile_filter(question_index) if self.url_filter else None
+                self._read_new_urls()
+                candidates = [u for u in self._pending_urls
+                              if u not in self._used_urls and (pattern is None or pattern.search(u))]
+                if candidates:
+                    url = candidates[-1]  # 最新一条即当前试卷
+                    self._mark_used(url)
+                    self._pending_urls = [u for u in self._pending_urls if u not in self._used_urls]
+                    break
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"代理日志中 {self.wait_seconds:g} 秒内未出现第{question_index}题的新图片请求")
+            time.sleep(self._POLL_INTERVAL)
+        return self._download(url)
+
+    def describe(self) -> str:
+        return f"proxy_log（{self.log_path}）"
+
+
+def create_image_source(config_manager) -> Optional[ImageSource]:
+    """按配置创建图片来源；screen 模式返回 None（引擎截屏）"""
+    mode = (getattr(config_manager, 'image_source_mode', 'screen') or 'screen').strip().lower()
+    token = getattr(config_manager, 'image_source_token', '')
+    timeout = float(getattr(config_manager, 'image_source_timeout', 10.0))
+    if mode == "http":
+        return HttpImageSource(getattr(config_manager, 'image_source_url_template', ''), token, timeout)
+    if mode == "proxy_log":
+        return ProxyLogImageSource(
+            getattr(config_manager, 'image_source_proxy_log_path', ''),
+            url_filter=getattr(config_manager, 'image_source_url_filter', ''),
+            token=token, timeout=timeout,
+            wait_seconds=float(getattr(config_manager, 'image_source_wait_seconds', 5.0)),
+        )
+    if mode != "screen":
+        raise ValueError(f"未知的图片来源模式: {mode}（可选 {', '.join(IMAGE_SOURCE_MODES)}）")
+    return None
+
+# --- END OF FILE image_sources.py ---
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 import datetime
 import pathlib
 import warnings
@@ -52,16 +53,23 @@ if sys.platform == 'win32':
         pass  # 如果设置失败，继续使用默认编码
 
 from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal
 from PyQt5.QtGui import QFont
 from ui_components.main_window import MainWindow
 from api_service import ApiService
 from config_manager import ConfigManager
 from auto_thread import GradingThread
-import winsound
+from engine_process import EngineProcessClient
+from usage_accounting import format_usage
+try:
+    import winsound
+except ImportError:  # 非Windows平台没有系统提示音，播放时静默失败
+    winsound = None
 import csv
 import traceback
-import pandas as pd
+from record_writer import RecordJournalWriter, BackgroundRecordWriter, build_detail_rows
+from grading_ledger import GradingLedger
+from run_journal import RunJournal
 
 class SimpleNotificationDialog(QDialog):
     def __init__(self, title, message, sound_type='info', parent=None):
@@ -224,6 +232,11 @@ class ManualInterventionDialog(QDialog):
         super().reject()
 
 
+class RecordWriterLogBridge(QObject):
+    """后台记录写入线程的日志经信号排队到界面线程"""
+    log_signal = pyqtSignal(str, bool)
+
+
 class SignalConnectionManager:
     def __init__(self):
         self.connections = []
@@ -276,14 +289,54 @@ class Application:
         except Exception:
             pass
         self.api_service = ApiService(self.config_manager)
-        self.worker = GradingThread(self.api_service, self.config_manager)
+        # 引擎子进程模式下由代理对象转发子进程的信号，接口与 GradingThread 一致
+        if self.config_manager.engine_process_enabled:
+            self.worker = EngineProcessClient(self.config_manager)
+        else:
+            self.worker = GradingThread(self.api_service, self.config_manager)
         self.main_window = MainWindow(self.config_manager, self.api_service, self.worker)
         self.signal_manager = SignalConnectionManager()
+        # 阅卷记录在后台线程追加写入日志、运行结束时生成Excel，界面线程只负责入队
+        self.record_writer_log = RecordWriterLogBridge()
+        self.record_writer_log.log_signal.connect(self.main_window.log_message)
+        self.record_writer = BackgroundRecordWriter(
+            RecordJournalWriter(
+                checkpoint_every=self.config_manager.record_excel_checkpoint,
+                log_callback=self.record_writer_log.log_signal.emit
+            ),
+            max_queue=self.config_manager.record_queue_size,
+            log_callback=self.record_writer_log.log_signal.emit,
+            ledger=self._open_grading_ledger(),
+            on_run_recorded=self._write_run_report if self.config_manager.run_report_enabled else None
+        )
 
 
 
         self._setup_application()
 
+    def _open_grading_ledger(self):
+        """打开阅卷台账；未启用或打开失败时返回None（不影响Excel记录）"""
+        if not self.config_manager.grading_ledger_enabled:
+            return None
+        try:
+            return GradingLedger()
+        except Exception as e:
+            self.main_window.log_message(f"阅卷台账打开失败，本次只写入Excel记录: {e}", True)
+            return None
+
+    def _write_run_report(self, summary_record):
+        """汇总记录写入台账后生成本次运行的分析报告（在记录写入线程中执行）"""
+        run_id = summary_record.get('run_id')
+        if not run_id or self.record_writer.ledger is None:
+            return
+        try:
+            from run_analytics import write_run_report
+            report_path = write_run_report(run_id, self.record_writer.ledger.db_path)
+        except ImportError:
+            self.record_writer_log.log_signal.emit("未安装 pandas/numpy，跳过运行分析报告", False)
+            return
+        self.record_writer_log.log_signal.emit(f"已生成运行分析报告: {report_path}", False)
+
     def _setup_global_exception_hook(self):
         """设置全局异常钩子"""
         def handle_exception(exc_type, exc_value, exc_traceback):
@@ -645,56 +698,72 @@ class Application:
             else:
                 summary_data.append(f"模型: {record_data.get('first_model_id', '未指定')}")
 
-            # 读取现有Excel文件或创建新的
-            if excel_filepath.exists():
-                try:
-                    existing_df = pd.read_excel(excel_filepath, header=0)
-                    # 检查是否是汇总记录格式（只有一列）
-                    if len(existing_df.columns) == 1 and existing_df.columns[0] == "汇总信息":
-                        # 如果是汇总格式，直接添加
-                        summary_df = pd.DataFrame([summary_data], columns=["汇总信息"])
-                        combined_df = pd.concat([existing_df, summary_df], ignore_index=True)
-                    else:
-                        # 如果是详细记录格式，添加到末尾
-                        # 添加空白行
-                        blank_rows = pd.DataFrame([[""] * len(existing_df.columns)] * 2)
-                        # 创建汇总行，填充到与现有列数相同
-                        summary_row = summary_data[:len(existing_df.columns)] if len(summary_data) >= len(existing_df.columns) else summary_data + [""] * (len(existing_df.columns) - len(summary_data))
-                        summary_df = pd.DataFrame([summary_row], columns=existing_df.columns)
-                        more_blank_rows = pd.DataFrame([[""] * len(existing_df.columns)] * 4)
-                        combined_df = pd.concat([existing_df, blank_rows, summary_df, more_blank_rows], ignore_index=True)
-                except Exception as e:
-                    self.main_window.log_message(f"读取现有Excel文件失败: {str(e)}，将创建新汇总文件", True)
-                    combined_df = pd.DataFrame([summary_data], columns=["汇总信息"])
-            else:
-                combined_df = pd.DataFrame([summary_data], columns=["汇总信息"])
-
-            # 写入Excel文件
-            with pd.ExcelWriter(excel_filepath, engine='openpyxl') as writer:
-                combined_df.to_excel(writer, index=False, sheet_name='阅卷记录')
-
-                # 获取工作簿和工作表
-                workbook = writer.book
-                worksheet = writer.sheets['阅卷记录']
-
-                # 设置列宽
-                column_widths = {
-                    'A': 80,  # 汇总信息列
-                }
-
-                for col, width in column_widths.items():
-                    if col in worksheet.column_dimensions:
-                        worksheet.column_dimensions[col].width = width
+            # 仲裁模型
+            arbiter_stats = record_data.get('arbiter_stats') or {}
+            if arbiter_stats.get('invoked'):
+                summary_data.append(f"仲裁: 调用 {arbiter_stats['invoked']} 次，成功裁决 {arbiter_stats.get('resolved', 0)} 次")
+
+            # 停止响应耗时
+            if record_data.get('stop_latency') is not None:
+                summary_data.append(f"停止响应耗时: {record_data['stop_latency']:.2f} 秒")
+
+            # 双评并发取消
+            cancel_stats = record_data.get('dual_cancel_stats') or {}
+            if cancel_stats.get('cancelled'):
+                summary_data.append(
+                    f"双评取消: {cancel_stats['cancelled']} 次，节省等待 {cancel_stats.get('seconds_saved', 0.0):.1f} 秒，"
+                    f"约节省 {cancel_stats.get('tokens_saved', 0)} tokens"
+                )
 
-                # 设置自动换行
-                from openpyxl.styles import Alignment
-                wrap_alignment = Alignment(wrap_text=True, vertical='top')
+            # 延迟人工复核
+            if record_data.get('deferred_review_count'):
+                summary_data.append(f"待复核: {record_data['deferred_review_count']} 份试卷已跳过并加入待复核队列（Ctrl+R 查看）")
+            if record_data.get('skipped_graded_count'):
+                summary_data.append(f"重复试卷: {record_data['skipped_graded_count']} 份已评过的试卷已翻页跳过")
+
+            # 自适应双评：复评率与一致率
+            adaptive_stats = record_data.get('adaptive_dual_stats') or {}
+            if adaptive_stats.get('questions'):
+                compared = adaptive_stats.get('agreements', 0) + adaptive_stats.get('disagreements', 0)
+                line = (f"自适应双评: 共 {adaptive_stats['questions']} 题，复评 {adaptive_stats.get('second_runs', 0)} 题"
+                        f"（抽检 {adaptive_stats.get('sampled', 0)}，风险触发 {adaptive_stats.get('risk_triggered', 0)}）")
+                if compared:
+                    line += (f"，一致率 {adaptive_stats.get('agreements', 0) / compared * 100:.1f}%"
+                             f"，平均分差 {adaptive_stats.get('score_diff_sum', 0.0) / compared:.2f}")
+                summary_data.append(line)
+
+            # 级联评分升级率
+            if record_data.get('cascade_attempted'):
+                summary_data.append(
+                    f"级联评分: 快速模型评阅 {record_data.get('cascade_attempted')} 题，"
+                    f"升级主模型 {record_data.get('cascade_escalated', 0)} 题，"
+                    f"升级率 {record_data.get('cascade_escalation_rate', 0.0) * 100:.1f}%"
+                )
 
-                for row in worksheet.iter_rows():
-                    for cell in row:
-                        cell.alignment = wrap_alignment
+            # Token 用量与估算费用（整批 / 每份试卷 / 每题）
+            run_usage = record_data.get('token_usage_run') or {}
+            if run_usage.get('calls'):
+                summary_data.append(f"Token用量: {format_usage(run_usage)}")
+                summary_data.append(f"每份试卷平均费用: ¥{record_data.get('avg_cost_per_paper', 0.0):.4f}")
+                by_question = record_data.get('token_usage_by_question') or {}
+                question_parts = [
+                    f"题目{q}: ¥{u.get('cost', 0.0):.4f}/{u.get('prompt_tokens', 0) + u.get('completion_tokens', 0)}tokens"
+                    for q, u in sorted(by_question.items(), key=lambda kv: str(kv[0]))
+                ]
+                if question_parts:
+                    summary_data.append("各题费用: " + "；".join(question_parts))
+
+            # 记录写入线程：队列深度与落盘延迟
+            writer_metrics = self.record_writer.metrics()
+            summary_data.append(
+                f"记录写入: 已写入 {writer_metrics['written']} 条（{writer_metrics['batches']} 批），"
+                f"队列峰值 {writer_metrics['max_queue_depth']}，"
+                f"最大落盘延迟 {writer_metrics['max_flush_latency']:.2f} 秒，重试 {writer_metrics['retries']} 次"
+            )
 
-            self.main_window.log_message(f"已保存汇总记录到: {excel_filename}")
+            # 交给后台写入线程：追加到记录日志，并由日志重新生成Excel（运行结束的检查点）
+            self.record_writer.append_summary(excel_filepath, summary_data, record=record_data)
+            self.main_window.log_message(f"汇总记录已提交写入: {excel_filename}")
             return excel_filepath
 
         except Exception as e:
@@ -719,117 +788,13 @@ class Application:
             # --- 1. 准备文件路径 ---
             excel_filepath = self._get_excel_filepath(record_data, self.worker)
             excel_filename = excel_filepath.name
-            file_exists = excel_filepath.exists()
-
-            # --- 2. 动态构建表头和行 ---
-            is_dual = record_data.get('is_dual_evaluation', False)
-            question_index_str = f"题目{record_data.get('question_index', 0)}"
-            final_total_score_str = str(record_data.get('total_score', 0))
-
-            headers = ["题目编号"]
-            rows_to_write = []
-
-            if is_dual:
-                headers.extend(["API标识", "分差阈值", "学生答案摘要", "AI分项得分", "AI原始回复", "AI原始总分", "双评分差", "最终得分", "OCR识别原文", "OCR置信度", "评分细则(前50字)"])
-
-                ocr_text_str = record_data.get('ocr_recognized_text', '未启用OCR或识别失败')
-                ocr_conf_str = record_data.get('ocr_avg_confidence', '未启用OCR')
-                rubric_str = record_data.get('scoring_rubric_summary', '未配置')
-                
-                row1 = [question_index_str,
-                       "API-1",
-                       str(record_data.get('score_diff_threshold', "未提供")),
-                       record_data.get('api1_scoring_basis', '未提供'),
-                       str(record_data.get('api1_itemized_scores', [])),
-                       record_data.get('api1_raw_response', '未提供'),
-                       str(record_data.get('api1_raw_score', 0.0)),
-                       f"{record_data.get('score_difference', 0.0):.2f}",
-                       final_total_score_str,
-                       ocr_text_str,
-                       ocr_conf_str,
-                       rubric_str]
-                row2 = [question_index_str,
-                       "API-2",
-                       str(record_data.get('score_diff_threshold', "未提供")),
-                       record_data.get('api2_scoring_basis', '未提供'),
-                       str(record_data.get('api2_itemized_scores', [])),
-                       record_data.get('api2_raw_response', '未提供'),
-                       str(record_data.get('api2_raw_score', 0.0)),
-                       f"{record_data.get('score_difference', 0.0):.2f}",
-                       final_total_score_str,
-                       ocr_text_str,
-                       ocr_conf_str,
-                       rubric_str]
-                rows_to_write.extend([row1, row2])
-            else: # 单评模式
-                headers.extend(["学生答案摘要", "AI分项得分", "AI原始回复", "最终得分", "OCR识别原文", "OCR置信度", "评分细则(前50字)"])
-
-                single_row = [question_index_str,
-                             record_data.get('reasoning_basis', '无法提取'),
-                             str(record_data.get('sub_scores', '未提供')),
-                             record_data.get('raw_ai_response', '无法提取'),
-                             final_total_score_str,
-                             record_data.get('ocr_recognized_text', '未启用OCR或识别失败'),
-                             record_data.get('ocr_avg_confidence', '未启用OCR'),
-                             record_data.get('scoring_rubric_summary', '未配置')]
-                rows_to_write.append(single_row)
-
-            # --- 3. 写入Excel文件 ---
-            if file_exists:
-                # 如果文件存在，读取现有数据并追加
-                try:
-                    existing_df = pd.read_excel(excel_filepath, header=0)
-                    new_df = pd.DataFrame(rows_to_write, columns=headers)
-                    combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-                except Exception as e:
-                    self.main_window.log_message(f"读取现有Excel文件失败: {str(e)}，将覆盖文件", True)
-                    combined_df = pd.DataFrame(rows_to_write, columns=headers)
-            else:
-                combined_df = pd.DataFrame(rows_to_write, columns=headers)
-
-            # 使用openpyxl引擎写入并设置格式
-            with pd.ExcelWriter(excel_filepath, engine='openpyxl') as writer:
-                combined_df.to_excel(writer, index=False, sheet_name='阅卷记录')
-
-                # 获取工作簿和工作表
-                workbook = writer.book
-                worksheet = writer.sheets['阅卷记录']
-
-                # 设置列宽
-                column_widths = {
-                    'A': 10,  # 题目编号
-                    'B': 10,  # API标识 / 学生答案摘要
-                    'C': 10,  # 分差阈值 / AI分项得分
-                    'D': 80,  # 学生答案摘要（增加宽度以容纳较长的AI回答）
-                    'E': 20,  # AI分项得分
-                    'F': 200, # AI原始回复（增加宽度以容纳完整的JSON回复）
-                    'G': 15,  # AI原始总分/最终得分
-                    'H': 12,  # 双评分差
-                    'I': 12,  # 最终得分
-                    'J': 150, # OCR识别原文
-                    'K': 12,  # OCR置信度
-                    'L': 50   # 评分细则(前50字)
-                }
-
-                for col, width in column_widths.items():
-                    if col in worksheet.column_dimensions:
-                        worksheet.column_dimensions[col].width = width
-
-                # 设置自动换行
-                from openpyxl.styles import Alignment
-                wrap_alignment = Alignment(wrap_text=True, vertical='top')
-
-                for row in worksheet.iter_rows():
-                    for cell in row:
-                        cell.alignment = wrap_alignment
-
-                # 设置标题行格式
-                from openpyxl.styles import Font
-                header_font = Font(bold=True)
-                for cell in worksheet[1]:
-                    cell.font = header_font
-
-            self.main_window.log_message(f"已保存阅卷记录到: {excel_filename}")
+
+            # --- 2. 动态构建表头和行（单评/双评布局见 record_writer.build_detail_rows）---
+            headers, rows_to_write = build_detail_rows(record_data)
+
+            # --- 3. 交给后台写入线程（不等待磁盘），到达检查点时由日志重新生成Excel ---
+            self.record_writer.append_rows(excel_filepath, headers, rows_to_write, record=record_data)
+            self.main_window.log_message(f"阅卷记录已提交写入: {excel_filename}（题目{record_data.get('question_index', 0)}）")
             return excel_filepath
 
         except PermissionError as e:
@@ -909,16 +874,50 @@ class Application:
             # 如果启动失败，确保UI状态正确
             self.main_window.update_ui_state(is_running=False)
 
+    def offer_resume_interrupted_run(self):
+        """上次阅卷因崩溃或重启中断时，询问是否从中断的试卷继续"""
+        if not self.config_manager.run_journal_enabled:
+            return
+        try:
+            state = RunJournal.load_incomplete()
+        except OSError as e:
+            self.main_window.log_message(f"读取运行日志失败: {e}", is_error=True)
+            return
+        if state is None:
+            return
+        from PyQt5.QtWidgets import QMessageBox
+        reply = QMessageBox.question(
+            self.main_window, "继续上次阅卷",
+            f"上次阅卷（开始于 {state.get('started_at') or '未知时间'}）在第 "
+            f"{state['completed_cycles'] + 1}/{state['cycle_number']} 份试卷中断，是否从中断处继续？\n\n"
+            "继续前请确认阅卷网页已停在该份试卷。",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+        )
+        if reply == QMessageBox.Yes:
+            self.main_window.resume_interrupted_run(state)
+        else:
+            try:
+                RunJournal.abandon()
+            except OSError as e:
+                self.main_window.log_message(f"写入运行日志失败: {e}", is_error=True)
+
     def run(self):
         """运行应用程序"""
         # 显示主窗口
         self.main_window.show()
+        # 事件循环启动后检查是否有中断的运行
+        QTimer.singleShot(0, self.offer_resume_interrupted_run)
 
         # 运行应用程序事件循环
         result = self.app.exec_()
+        # 退出前写完队列中的记录，并把尚未生成到Excel的记录补齐
+        self.record_writer.close()
         return result
 
 if __name__ == "__main__":
+    # 打包后的exe以spawn方式启动引擎子进程时需要
+    multiprocessing.freeze_support()
+
     # 创建应用程序实例
     app = Application()
 
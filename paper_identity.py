@@ -0,0 +1,109 @@
+# --- START OF FILE paper_identity.py ---
+"""
+试卷身份识别（paper ID）
+
+屏幕上是哪一份学生试卷原本无从得知：重新运行或“下一份”多点了一次，同一份试卷可能被评两次，
+也可能漏评一份而无人察觉。配置了试卷号区域（与答案区域相同的 x1,y1,x2,y2 屏幕坐标，
+通常框住准考证号条码或考号）后，每份试卷在截取第一题答案后读取一次该区域：
+- barcode：本地解码条码/二维码（需要 pyzbar，未安装或未识别到时退回 hash）；
+- hash：区域缩小、二值化后取哈希，同一份试卷重复截取得到相同的标识。
+
+得到的试卷标识写入明细记录（paper_id）、阅卷台账与运行日志，已评过的试卷直接翻页跳过，不调用OCR与模型。
+不同考试的考号可能相同，scope（如 “2026期中-数学”）会作为前缀加入标识，把各次考试区分开。
+"""
+
+import hashlib
+from typing import Optional
+
+PAPER_ID_MODES = ("barcode", "hash")
+
+# 二值化哈希：区域缩放到的最大宽度与墨迹阈值
+_HASH_MAX_WIDTH = 128
+_INK_THRESHOLD = 128
+# 区域灰度标准差低于该值视为空白（页面未加载或区域配置错误），不作为试卷标识
+_BLANK_STDDEV = 3.0
+
+
+def region_hash(image) -> str:
+    """试卷号区域的二值化哈希；区域为空白时返回空字符串"""
+    from PIL import Image, ImageStat
+    gray = image.convert("L")
+    try:
+        if ImageStat.Stat(gray).stddev[0] < _BLANK_STDDEV:
+            return ""
+        width, height = gray.size
+        if width > _HASH_MAX_WIDTH:
+            new_height = max(1, round(height * _HASH_MAX_WIDTH / width))
+            resized = gray.resize((_HASH_MAX_WIDTH, new_height), Image.Resampling.BOX)
+            gray.close()
+            gray = resized
+        bitmap = gray.point(lambda v: 255 if v >= _INK_THRESHOLD else 0).convert("1")
+        try:
+            return "img-" + hashlib.sha1(bitmap.tobytes()).hexdigest()[:16]
+        finally:
+            bitmap.close()
+    finally:
+        gray.close()
+
+
+def decode_barcode(image) -> Optional[str]:
+    """本地解码区域中的条码/二维码，返回第一个结果；未安装 pyzbar 时抛出 ImportError"""
+    from pyzbar import pyzbar  # 可选依赖
+    for symbol in pyzbar.decode(image):
+        text = symbol.data.decode("utf-8", errors="replace").strip()
+        if text:
+            return text
+    return None
+
+
+class PaperIdentifier:
+    """按配置的屏幕区域读取当前试卷的标识"""
+
+    def __init__(self, area: dict, mode: str = "barcode", scope: str = "", log_callback=None):
+        if not area or not all(key in area for key in ('x1', 'y1', 'x2', 'y2')):
+            raise ValueError("已启用试卷身份识别，但未配置试卷号区域（[PaperId] area）")
+        if mode not in PAPER_ID_MODES:
+            raise ValueError(f"未知的试卷身份识别方式: {mode}（可选 {', '.join(PAPER_ID_MODES)}）")
+        self.area = area
+        self.mode = mode
+        self.scope = (scope or "").strip()
+        self._log = log_callback or (lambda message: None)
+        self._barcode_available = mode == "barcode"
+
+    def identify(self) -> str:
+        """截取试卷号区域并返回试卷标识；无法识别（区域空白）时返回空字符串"""
+        from PIL import ImageGrab
+        x1, y1, x2, y2 = (self.area[key] for key in ('x1', 'y1', 'x2', 'y2'))
+        image = ImageGrab.grab(bbox=(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+        try:
+            return self.identify_image(image)
+        finally:
+            image.close()
+
+    def identify_image(self, image) -> str:
+        raw = None
+        if self._barcode_available:
+            try:
+                raw = decode_barcode(image)
+            except ImportError:
+                self._barcode_available = False
+                self._log("未安装 pyzbar，试卷身份识别改用区域哈希")
+        if raw is None:
+            raw = region_hash(image)
+        if not raw:
+            return ""
+        return f"{self.scope}/{raw}" if self.scope else raw
+
+    def describe(self) -> str:
+        return f"{self.mode}（区域 {self.area['x1']},{self.area['y1']},{self.area['x2']},{self.area['y2']}）"
+
+
+def create_paper_identifier(config_manager, log_callback=None) -> Optional[PaperIdentifier]:
+    """按配置创建试卷身份识别；未启用时返回 None"""
+    if not getattr(config_manager, 'paper_id_enabled', False):
+        return None
+    mode = (getattr(config_manager, 'paper_id_mode', 'barcode') or 'barcode').strip().lower()
+    return PaperIdentifier(getattr(config_manager, 'paper_id_area', None), mode,
+                           getattr(config_manager, 'paper_id_scope', ''), log_callback)
+
+# --- END OF FILE paper_identity.py ---
@@ -0,0 +1,488 @@
+# --- START OF FILE record_writer.py ---
+"""
+阅卷记录写入：追加式日志 + 检查点生成Excel
+
+原先每条记录都 read_excel 整个当天文件、concat 后整体重写并逐格设置对齐，一次运行的总耗时是 O(n²)，
+“AI原始回复”列较长时到第500份试卷每条记录要数秒。现在：
+- 每条记录追加一行到与Excel同名的 .jsonl 日志（常数时间，不读旧数据）；
+- 每次运行结束（汇总记录）、关闭程序或调用 flush() 时，由日志一次性生成格式化的Excel：
+  openpyxl 只写模式流式输出，列宽按列设置，换行/加粗样式每张表只生成一次、各单元格直接引用。
+  xlsx 无法追加，生成一次的代价与总行数成正比，因此运行中默认不生成；
+  checkpoint_every > 0 时另外每追加这么多条重新生成一次（每次仍是全量重写）。
+
+Excel 被教师打开（PermissionError）时日志照常写入，Excel 留待下一个检查点重新生成，记录不会丢失。
+
+BackgroundRecordWriter 把上述磁盘操作移到专用线程：界面线程只把记录放入有界队列，
+写入线程成批取出、按文件合并为一次追加，失败时保留该批记录按间隔重试，不丢弃。
+配置了阅卷台账（grading_ledger）时，同一批原始记录在一个事务中写入台账；
+汇总记录写入台账后调用 on_run_recorded（如生成运行分析报告），仍在写入线程中执行，不阻塞界面。
+"""
+
+import os
+import json
+import time
+import threading
+from queue import Queue, Empty, Full
+from typing import Callable, Dict, List, Optional, Tuple
+
+from usage_accounting import format_usage
+
+SHEET_NAME = "阅卷记录"
+SUMMARY_HEADER = "汇总信息"
+
+# 明细记录列宽（题目编号、API标识、分差阈值、学生答案摘要、AI分项得分、AI原始回复……）
+DETAIL_COLUMN_WIDTHS = {
+    'A': 10, 'B': 10, 'C': 10, 'D': 80, 'E': 20, 'F': 200, 'G': 15,
+    'H': 12, 'I': 12, 'J': 150, 'K': 12, 'L': 50, 'M': 60, 'N': 14,
+}
+SUMMARY_COLUMN_WIDTHS = {'A': 80}
+
+
+def build_detail_rows(record_data: dict) -> Tuple[List[str], List[list]]:
+    """由明细记录构建Excel表头与行（双评每个模型一行，仲裁时追加一行）"""
+    is_dual = record_data.get('is_dual_evaluation', False)
+    question_index_str = f"题目{record_data.get('question_index', 0)}"
+    final_total_score_str = str(record_data.get('total_score', 0))
+
+    headers = ["题目编号"]
+    rows_to_write = []
+
+    if is_dual:
+        headers.extend(["API标识", "分差阈值", "学生答案摘要", "AI分项得分", "AI原始回复", "AI原始总分", "双评分差", "最终得分", "OCR识别原文", "OCR置信度", "评分细则(前50字)", "本题Token用量/费用", "评分档位"])
+
+        ocr_text_str = record_data.get('ocr_recognized_text', '未启用OCR或识别失败')
+        ocr_conf_str = record_data.get('ocr_avg_confidence', '未启用OCR')
+        rubric_str = record_data.get('scoring_rubric_summary', '未配置')
+        usage_str = format_usage(record_data.get('token_usage') or {})
+
+        row1 = [question_index_str,
+               "API-1",
+               str(record_data.get('score_diff_threshold', "未提供")),
+               record_data.get('api1_scoring_basis', '未提供'),
+               str(record_data.get('api1_itemized_scores', [])),
+               record_data.get('api1_raw_response', '未提供'),
+               str(record_data.get('api1_raw_score', 0.0)),
+               f"{record_data.get('score_difference', 0.0):.2f}",
+               final_total_score_str,
+               ocr_text_str,
+               ocr_conf_str,
+               rubric_str,
+               usage_str,
+               record_data.get('grading_tier', '双评')]
+        row2 = [question_index_str,
+               "API-2",
+               str(record_data.get('score_diff_threshold', "未提供")),
+               record_data.get('api2_scoring_basis', '未提供'),
+               str(record_data.get('api2_itemized_scores', [])),
+               record_data.get('api2_raw_response', '未提供'),
+               str(record_data.get('api2_raw_score', 0.0)),
+               f"{record_data.get('score_difference', 0.0):.2f}",
+               final_total_score_str,
+               ocr_text_str,
+               ocr_conf_str,
+               rubric_str,
+               usage_str,
+               record_data.get('grading_tier', '双评')]
+        rows_to_write.extend([row1, row2])
+        if record_data.get('arbiter_used'):
+            row3 = [question_index_str,
+                   f"仲裁API({record_data.get('arbiter_strategy', '')}→{record_data.get('arbiter_agreed_with', '')})",
+                   str(record_data.get('score_diff_threshold', "未提供")),
+                   record_data.get('arbiter_scoring_basis', '未提供'),
+                   str(record_data.get('arbiter_itemized_scores', [])),
+                   record_data.get('arbiter_raw_response', '未提供'),
+                   str(record_data.get('arbiter_raw_score', 0.0)),
+                   f"{record_data.get('score_difference', 0.0):.2f}",
+                   final_total_score_str,
+                   ocr_text_str,
+                   ocr_conf_str,
+                   rubric_str,
+                   usage_str,
+                   record_data.get('grading_tier', '仲裁')]
+            rows_to_write.append(row3)
+    else: # 单评模式
+        headers.extend(["学生答案摘要", "AI分项得分", "AI原始回复", "最终得分", "OCR识别原文", "OCR置信度", "评分细则(前50字)", "本题Token用量/费用", "评分档位"])
+
+        single_row = [question_index_str,
+                     record_data.get('reasoning_basis', '无法提取'),
+                     str(record_data.get('sub_scores', '未提供')),
+                     record_data.get('raw_ai_response', '无法提取'),
+                     final_total_score_str,
+                     record_data.get('ocr_recognized_text', '未启用OCR或识别失败'),
+                     record_data.get('ocr_avg_confidence', '未启用OCR'),
+                     record_data.get('scoring_rubric_summary', '未配置'),
+                     format_usage(record_data.get('token_usage') or {}),
+                     record_data.get('grading_tier', '主模型')]
+        rows_to_write.append(single_row)
+    return headers, rows_to_write
+
+
+def journal_path_for(excel_path) -> str:
+    """Excel 对应的追加日志路径（同目录、同名 .jsonl）"""
+    return os.path.splitext(str(excel_path))[0] + ".jsonl"
+
+
+def read_journal(journal_path: str) -> List[dict]:
+    """读取日志条目；末尾未写完的行（如进程中断）被忽略"""
+    entries = []
+    if not os.path.exists(journal_path):
+        return entries
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def import_legacy_workbook(excel_path) -> Optional[dict]:
+    """把旧版本直接写成的Excel（没有日志）读为一条日志条目，保证重新生成时不丢失已有记录"""
+    if not os.path.exists(str(excel_path)):
+        return None
+    from openpyxl import load_workbook
+    workbook = load_workbook(str(excel_path), read_only=True)
+    try:
+        sheet = workbook[SHEET_NAME] if SHEET_NAME in workbook.sheetnames else workbook.worksheets[0]
+        rows = [["" if v is None else v for v in row] for row in sheet.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+    if not rows:
+        return None
+    return {"headers": rows[0], "rows": rows[1:]}
+
+
+def build_workbook(journal_path: str, excel_path) -> int:
+    """由日志生成格式化的Excel（先写临时文件再替换，Excel被占用时抛出 PermissionError）
+
+    Returns:
+        写入的数据行数
+    """
+    return write_workbook({SHEET_NAME: read_journal(journal_path)}, excel_path)
+
+
+def write_workbook(sheets: Dict[str, List[dict]], excel_path) -> int:
+    """把日志条目（{"headers","rows"} 或 {"summary"}）按工作表写成格式化的Excel，返回数据行数"""
+    from copy import copy
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font
+
+    workbook = Workbook(write_only=True)
+    wrap_alignment = Alignment(wrap_text=True, vertical='top')
+    header_font = Font(bold=True)
+    row_count = 0
+
+    for sheet_name, entries in sheets.items():
+        headers = next((entry["headers"] for entry in entries if entry.get("headers")), None)
+        sheet = workbook.create_sheet(sheet_name)
+        for column, width in (DETAIL_COLUMN_WIDTHS if headers else SUMMARY_COLUMN_WIDTHS).items():
+            sheet.column_dimensions[column].width = width
+
+        # 样式模板：每张表登记一次，单元格直接复制其样式索引，不再逐格查找/登记样式
+        body_template = WriteOnlyCell(sheet)
+        body_template.alignment = wrap_alignment
+        header_template = WriteOnlyCell(sheet)
+        header_template.alignment = wrap_alignment
+        header_template.font = header_font
+        body_style, header_style = body_template._style, header_template._style
+
+        def _append(values, bold=False):
+            style = header_style if bold else body_style
+            cells = []
+            for value in values:
+                cell = WriteOnlyCell(sheet, value=value)
+                cell._style = copy(style)
+                cells.append(cell)
+            sheet.append(cells)
+
+        _append(headers or [SUMMARY_HEADER], bold=True)
+        width = len(headers) if headers else 1
+        for entry in entries:
+            if "rows" in entry:
+                for row in entry["rows"]:
+                    _append(row)
+                    row_count += 1
+            elif "summary" in entry:
+                lines = [str(line) for line in entry["summary"]]
+                if not headers:
+                    _append(["\n".join(lines)])
+                    row_count += 1
+                    continue
+                # 与明细记录同表时：空两行，汇总逐列铺开（超出列数的合并到最后一格），再空四行
+                if len(lines) > width:
+                    lines = lines[:width - 1] + ["\n".join(lines[width - 1:])]
+                for _ in range(2):
+                    sheet.append([""] * width)
+                _append(lines + [""] * (width - len(lines)))
+                for _ in range(4):
+                    sheet.append([""] * width)
+                row_count += 1
+
+    excel_path = str(excel_path)
+    temp_path = excel_path + ".tmp"
+    workbook.save(temp_path)
+    try:
+        os.replace(temp_path, excel_path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return row_count
+
+
+class RecordJournalWriter:
+    """追加写入阅卷记录日志，并在检查点重新生成Excel（线程安全）"""
+
+    def __init__(self, checkpoint_every: int = 0,
+                 log_callback: Optional[Callable[[str, bool], None]] = None):
+        """checkpoint_every: 运行中每追加多少条重新生成一次Excel；0 表示只在运行结束与 flush() 时生成"""
+        self.checkpoint_every = max(0, int(checkpoint_every))
+        self.log_callback = log_callback or (lambda message, is_error: None)
+        self._pending: Dict[str, int] = {}  # Excel路径 -> 上次生成后新增的条目数
+        self._rebuild_failed = set()  # 因文件被占用未能生成的Excel路径
+        self._lock = threading.Lock()
+
+    def append_rows(self, excel_path, headers: List[str], rows: List[list]) -> bool:
+        """追加明细记录；返回本次是否到达检查点并已生成Excel"""
+        return self._append(excel_path, {"headers": headers, "rows": rows}, flush=False)
+
+    def append_summary(self, excel_path, lines: List[str]) -> bool:
+        """追加汇总记录（一次运行结束），随即生成Excel"""
+        return self._append(excel_path, {"summary": lines}, flush=True)
+
+    def _append(self, excel_path, entry: dict, flush: bool) -> bool:
+        return self.append_entries(excel_path, [entry], flush)
+
+    def append_entries(self, excel_path, entries: List[dict], flush: bool = False) -> bool:
+        """一次打开日志追加多条记录（后台写入线程合并写入时使用）
+
+        日志写入失败（如 PermissionError）时抛出异常，由调用方重试；Excel 生成失败只记日志。
+        Returns:
+            本次是否到达检查点并已生成Excel
+        """
+        excel_path = str(excel_path)
+        journal_path = journal_path_for(excel_path)
+        lines = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries)
+        with self._lock:
+            if not os.path.exists(journal_path):
+                legacy = import_legacy_workbook(excel_path)
+                if legacy is not None:
+                    lines = json.dumps(legacy, ensure_ascii=False, default=str) + "\n" + lines
+            with open(journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self._pending[excel_path] = self._pending.get(excel_path, 0) + len(entries)
+            if not flush and (not self.checkpoint_every or self._pending[excel_path] < self.checkpoint_every):
+                return False
+            return self._flush_locked(excel_path)
+
+    def flush(self, excel_path=None) -> bool:
+        """重新生成有新记录的Excel（不指定路径时处理全部）；返回是否全部成功"""
+        with self._lock:
+            paths = [str(excel_path)] if excel_path is not None else list(self._pending)
+            return all([self._flush_locked(path) for path in paths])
+
+    def retry_failed(self) -> bool:
+        """重新生成上次因文件被占用而失败的Excel"""
+        with self._lock:
+            return all([self._flush_locked(path) for path in list(self._rebuild_failed)])
+
+    def _flush_locked(self, excel_path: str) -> bool:
+        if not self._pending.get(excel_path):
+            return True
+        try:
+            build_workbook(journal_path_for(excel_path), excel_path)
+        except OSError as e:  # 多为 PermissionError：教师正打开该Excel
+            if excel_path not in self._rebuild_failed:
+                self.log_callback(
+                    f"Excel文件暂未更新（记录已写入日志，文件可写后自动补齐）: {excel_path}，原因: {e}", True)
+            self._rebuild_failed.add(excel_path)
+            return False
+        self.log_callback(f"已保存阅卷记录到: {os.path.basename(excel_path)}", False)
+        self._rebuild_failed.discard(excel_path)
+        self._pending[excel_path] = 0
+        return True
+
+    @property
+    def has_failed_rebuilds(self) -> bool:
+        with self._lock:
+            return bool(self._rebuild_failed)
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(self._pending.values())
+
+
+class BackgroundRecordWriter:
+    """后台记录写入线程：有界队列 + 批量合并写入 + 失败重试（接口与 RecordJournalWriter 相同，但不等待磁盘）"""
+
+    def __init__(self, journal_writer: RecordJournalWriter, max_queue: int = 1000, batch_size: int = 100,
+                 retry_interval: float = 2.0, log_callback: Optional[Callable[[str, bool], None]] = None,
+                 ledger=None, on_run_recorded: Optional[Callable[[dict], None]] = None):
+        self.journal_writer = journal_writer
+        self.ledger = ledger  # GradingLedger，可选
+        self.on_run_recorded = on_run_recorded
+        self._ledger_backlog: List[dict] = []  # 台账写入失败时暂存，下一批重试
+        self.batch_size = max(1, int(batch_size))
+        self.retry_interval = retry_interval
+        self.log_callback = log_callback or (lambda message, is_error: None)
+        self._queue: Queue = Queue(maxsize=max(1, int(max_queue)))
+        # 队列满时新记录暂存于此（不阻塞提交线程，通常是界面线程）；非空期间新记录都追加到这里以保持顺序
+        self._overflow: List[tuple] = []
+        self._overflow_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'written': 0, 'batches': 0, 'retries': 0, 'max_queue_depth': 0,
+                         'last_flush_latency': 0.0, 'max_flush_latency': 0.0}
+        self._thread = threading.Thread(target=self._run, name="record-writer", daemon=True)
+        self._thread.start()
+
+    def append_rows(self, excel_path, headers: List[str], rows: List[list], record: Optional[dict] = None) -> None:
+        self._submit(excel_path, {"headers": headers, "rows": rows}, flush=False, record=record)
+
+    def append_summary(self, excel_path, lines: List[str], record: Optional[dict] = None) -> None:
+        self._submit(excel_path, {"summary": lines}, flush=True, record=record)
+
+    def _submit(self, excel_path, entry: dict, flush: bool, record: Optional[dict] = None) -> None:
+        item = (time.monotonic(), str(excel_path), entry, flush, record)
+        with self._overflow_lock:
+            overflowing = bool(self._overflow)
+            if not overflowing:
+                try:
+                    self._queue.put_nowait(item)
+                except Full:
+                    overflowing = True
+            if overflowing:
+                # 队列满说明磁盘长时间不可写：暂存到溢出列表，不阻塞提交线程，也不丢弃记录
+                if not self._overflow:
+                    self.log_callback(
+                        f"阅卷记录写入队列已满（{self._queue.maxsize} 条），后续记录暂存内存等待磁盘写入...", True)
+                self._overflow.append(item)
+            depth = self._queue.qsize() + len(self._overflow)
+        with self._metrics_lock:
+            self._metrics['max_queue_depth'] = max(self._metrics['max_queue_depth'], depth)
+
+    def metrics(self) -> dict:
+        """队列深度与落盘延迟（记录从提交到写入日志的秒数）"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        with self._overflow_lock:
+            metrics['overflow'] = len(self._overflow)
+        metrics['queue_depth'] = self._queue.qsize() + metrics['overflow']
+        return metrics
+
+    def _has_overflow(self) -> bool:
+        with self._overflow_lock:
+            return bool(self._overflow)
+
+    def _next_batch(self) -> list:
+        batch = []
+        if not self._has_overflow():
+            try:
+                batch.append(self._queue.get(timeout=0.5))
+            except Empty:
+                return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+        # 队列中的记录都早于溢出列表中的记录，取完队列再按顺序取溢出列表
+        if len(batch) < self.batch_size:
+            with self._overflow_lock:
+                take = self.batch_size - len(batch)
+                batch.extend(self._overflow[:take])
+                del self._overflow[:take]
+        return batch
+
+    def _write_ledger(self, batch: list) -> None:
+        """整批原始记录一个事务写入台账；失败时暂存到下一批（台账只是索引副本，日志仍是权威记录）"""
+        if self.ledger is None:
+            return
+        records = self._ledger_backlog + [item[4] for item in batch if item[4] is not None]
+        if not records:
+            return
+        try:
+            self.ledger.add_records(records)
+            self._ledger_backlog = []
+        except Exception as e:
+            self._ledger_backlog = records
+            self.log_callback(f"阅卷台账写入失败，{len(records)} 条记录将随下一批重试: {e}", True)
+            return
+        if self.on_run_recorded is not None:
+            for record in records:
+                if record.get('record_type') == 'summary':
+                    try:
+                        self.on_run_recorded(record)
+                    except Exception as e:
+                        self.log_callback(f"运行结束后的处理失败: {e}", True)
+
+    def _write_batch(self, batch: list) -> None:
+        """按文件合并为一次追加；日志写入失败时保留整批，按间隔重试直到成功或关闭"""
+        self._write_ledger(batch)
+        grouped: Dict[str, list] = {}
+        for item in batch:
+            grouped.setdefault(item[1], []).append(item)
+        for excel_path, items in grouped.items():
+            entries = [item[2] for item in items]
+            flush = any(item[3] for item in items)
+            while True:
+                try:
+                    self.journal_writer.append_entries(excel_path, entries, flush=flush)
+                    break
+                except OSError as e:
+                    with self._metrics_lock:
+                        self._metrics['retries'] += 1
+                    self.log_callback(f"阅卷记录写入失败，{self.retry_interval:g} 秒后重试（记录保留在队列中）: {e}", True)
+                    if self._stop_event.wait(self.retry_interval):
+                        # 关闭时最后再试一次，仍失败则放弃（进程即将退出）
+                        try:
+                            self.journal_writer.append_entries(excel_path, entries, flush=flush)
+                        except OSError:
+                            self.log_callback(f"退出时仍无法写入 {len(entries)} 条阅卷记录: {excel_path}", True)
+                        break
+            latency = time.monotonic() - min(item[0] for item in items)
+            with self._metrics_lock:
+                self._metrics['written'] += len(entries)
+                self._metrics['batches'] += 1
+                self._metrics['last_flush_latency'] = latency
+                self._metrics['max_flush_latency'] = max(self._metrics['max_flush_latency'], latency)
+
+    def _run(self) -> None:
+        last_retry = time.monotonic()
+        while not (self._stop_event.is_set() and self._queue.empty() and not self._has_overflow()):
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    self.log_callback(f"阅卷记录写入线程异常: {e}", True)
+            # Excel 被占用而未生成的，定期重试
+            if self.journal_writer.has_failed_rebuilds and time.monotonic() - last_retry >= self.retry_interval:
+                last_retry = time.monotonic()
+                self.journal_writer.retry_failed()
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """写完队列中的记录、生成全部Excel后结束线程
+
+        超时后写入线程仍在运行时不生成Excel、不关闭台账（写入线程仍在使用），写入线程继续在后台写入。
+        """
+        self._stop_event.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.log_callback(
+                f"阅卷记录仍在写入（剩余约 {self.metrics()['queue_depth']} 条），未等待其完成", True)
+            return
+        self.journal_writer.flush()
+        if self.ledger is not None:
+            if self._ledger_backlog:
+                self._write_ledger([])
+            self.ledger.close()
+
+# --- END OF FILE record_writer.py ---
@@ -0,0 +1,266 @@
+# --- START OF FILE regrade.py ---
+"""
+评分细则修改后的批量重评
+
+评分细则（standard_answer）改动后，已评的答案原本只能回到阅卷系统逐份重新截图评分。
+阅卷台账保存了每条答案的OCR文本，答案图片库按 image_key 保存了图片，因此可以离线重评：
+- 按题号与时间段（或运行标识）从台账取出明细记录；
+- OCR模式的题目直接使用台账中的OCR文本（不再调用OCR），纯AI模式的题目从图片库取回图片；
+- 用新的评分细则经 select_and_build_prompt → evaluate_answer → ScoreProcessor 重新评分，
+  不输入分数、不写阅卷记录，多个工作线程并发（每个线程一个引擎，与文件夹批量模式相同）；
+- 输出新旧分数对比CSV（按台账顺序）与一页汇总（变化份数、平均/最大分差、费用）。
+
+示例：
+    python regrade.py --question 3 --since 2026-10-01 --rubric-file 第3题新细则.txt --workers 16
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from config_manager import ConfigManager
+from api_service import ApiService, CancelToken
+from grading_core import GradingEngine
+from grading_ledger import GradingLedger
+from image_archive import load_archived_image
+from usage_accounting import empty_usage, merge_usage, format_usage
+
+DIFF_FIELDS = ["ledger_id", "graded_at", "run_id", "paper_no", "paper_id", "question_index", "source",
+               "old_score", "new_score", "delta", "status", "reason"]
+
+# record_grading_result 在未启用OCR或识别失败时写入的占位文本
+_NO_OCR_TEXT = "未启用OCR或识别失败"
+
+
+def default_regrade_dir() -> str:
+    """默认输出目录：阅卷记录/重评"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "阅卷记录", "重评")
+
+
+def _stored_ocr_text(record: dict) -> str:
+    text = record.get('ocr_recognized_text') or ""
+    return "" if text == _NO_OCR_TEXT else text
+
+
+class RegradeRunner:
+    """用新的评分细则并发重评台账中的一批答案"""
+
+    def __init__(self, config_manager, q_config: dict, workers: int = 8, dual_evaluation: bool = False,
+                 archive_root: Optional[str] = None, log_callback: Optional[Callable] = None):
+        """
+        Args:
+            q_config: 题目配置（standard_answer 为新的评分细则）
+            workers: 并发评分的线程数
+            archive_root: 答案图片库目录（默认按配置）
+            log_callback: 日志回调 (message, is_error, level)
+        """
+        self.config_manager = config_manager
+        self.q_config = dict(q_config, dual_eval_enabled=dual_evaluation)
+        self.workers = max(1, int(workers))
+        self.dual_evaluation = dual_evaluation
+        self.score_diff_threshold = getattr(config_manager, 'score_diff_threshold', 10)
+        self.archive_root = archive_root or getattr(config_manager, 'image_archive_dir', '') or None
+        self.log_callback = log_callback or (lambda message, is_error, level: None)
+        self.stop_token = CancelToken()
+        self.usage = empty_usage()
+        self._local = threading.local()
+        self._engines: List[GradingEngine] = []
+        self._engines_lock = threading.Lock()
+
+    def stop(self):
+        """停止重评：在途请求立即放弃，未开始的答案不再处理"""
+        self.stop_token.cancel("用户停止重评")
+
+    def _engine(self) -> GradingEngine:
+        """每个工作线程一个引擎（引擎与 ApiService 的题目状态不是线程共享的）"""
+        engine = getattr(self._local, 'engine', None)
+        if engine is None:
+            engine = GradingEngine(ApiService(self.config_manager), self.config_manager)
+            engine.log_signal.connect(self.log_callback)
+            engine.set_parameters(
+                dual_evaluation=self.dual_evaluation, score_diff_threshold=self.score_diff_threshold,
+                first_model_id=getattr(self.config_manager, 'first_modelID', ''),
+                second_model_id=getattr(self.config_manager, 'second_modelID', ''),
+                is_single_question_one_run=True,
+            )
+            engine.reset_run_state(parent_token=self.stop_token)
+            self._local.engine = engine
+            with self._engines_lock:
+                self._engines.append(engine)
+        return engine
+
+    def _regrade_one(self, record: dict) -> dict:
+        row = {field: record.get(field, '') for field in ("ledger_id", "graded_at", "run_id", "paper_no", "paper_id")}
+        old_score = record.get('total_score')
+        row.update(question_index=record.get('question_index', ''), old_score=old_score,
+                   new_score='', delta='', status='', reason='')
+        if self.stop_token.cancelled:
+            row.update(source='', status='stopped', reason='已停止')
+            return row
+
+        ocr_text = _stored_ocr_text(record) if self.q_config.get('ocr_mode_index', 0) == 1 else ""
+        img_str = ""
+        if ocr_text:
+            row['source'] = 'ocr'
+        else:
+            row['source'] = 'image'
+            try:
+                img_str = load_archived_image(record.get('image_key', ''), self.archive_root) or ""
+            except OSError as e:
+                row.update(status='error', reason=f"读取答案图片失败: {e}")
+                return row
+            if not img_str:
+                row.update(status='error', reason="图片库中没有该答案的图片（未入库或已被清理）")
+                return row
+
+        try:
+            result = self._engine().regrade_answer(
+                self.q_config, img_str, ocr_text, record.get('ocr_confidence_meta') or None,
+                self.dual_evaluation, self.score_diff_threshold
+            )
+        except Exception as e:
+            row.update(status='error', reason=f"重评异常: {e}")
+            return row
+        row.update(status=result['status'], reason=result['reason'])
+        if result['status'] == 'completed':
+            row['new_score'] = result['score']
+            if isinstance(old_score, (int, float)):
+                row['delta'] = round(result['score'] - old_score, 4)
+        return row
+
+    def run(self, records: Iterable[dict], output_csv: str) -> dict:
+        """重评 records，对比结果按原顺序写入 output_csv，返回汇总信息"""
+        start = time.time()
+        rows = []
+        directory = os.path.dirname(output_csv)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output_csv, "w", encoding="utf-8-sig", newline="") as f, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="regrade") as executor:
+            writer = csv.DictWriter(f, fieldnames=DIFF_FIELDS)
+            writer.writeheader()
+            for row in executor.map(self._regrade_one, records):
+                writer.writerow(row)
+                rows.append(row)
+                if row['status'] == 'completed' and row['delta'] not in ('', 0):
+                    self.log_callback(
+                        f"试卷{row['paper_no']}（{row['paper_id'] or '未识别'}）第{row['question_index']}题: "
+                        f"{row['old_score']} → {row['new_score']}", False, "RESULT")
+        with self._engines_lock:
+            for engine in self._engines:
+                merge_usage(self.usage, engine.usage_tracker.snapshot()['run'])
+        summary = summarize_rows(rows)
+        summary['elapsed'] = time.time() - start
+        summary['usage'] = format_usage(self.usage)
+        return summary
+
+
+def summarize_rows(rows: List[dict]) -> Dict[str, object]:
+    """新旧分数对比的汇总"""
+    deltas = [row['delta'] for row in rows if row['status'] == 'completed' and row['delta'] != '']
+    changed = [d for d in deltas if d != 0]
+    return {
+        'total': len(rows),
+        'completed': sum(1 for row in rows if row['status'] == 'completed'),
+        'failed': sum(1 for row in rows if row['status'] not in ('completed', 'stopped')),
+        'stopped': sum(1 for row in rows if row['status'] == 'stopped'),
+        'changed': len(changed),
+        'raised': sum(1 for d in changed if d > 0),
+        'lowered': sum(1 for d in changed if d < 0),
+        'mean_delta': sum(deltas) / len(deltas) if deltas else 0.0,
+        'mean_abs_delta': sum(abs(d) for d in deltas) / len(deltas) if deltas else 0.0,
+        'max_abs_delta': max((abs(d) for d in deltas), default=0.0),
+    }
+
+
+def render_summary(summary: dict, question_index: int, output_csv: str) -> str:
+    return "\n".join([
+        f"# 第{question_index}题重评汇总", "",
+        f"生成时间：{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", "",
+        f"- 重评 {summary['total']} 条：完成 {summary['completed']}，失败 {summary['failed']}，未处理 {summary['stopped']}",
+        f"- 分数变化 {summary['changed']} 条（升高 {summary['raised']}，降低 {summary['lowered']}）",
+        f"- 平均分差 {summary['mean_delta']:+.3f}，平均绝对分差 {summary['mean_abs_delta']:.3f}，"
+        f"最大绝对分差 {summary['max_abs_delta']:.3f}",
+        f"- 用时 {summary['elapsed']:.1f} 秒；{summary['usage']}",
+        f"- 逐条对比：{os.path.basename(output_csv)}", "",
+    ])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="评分细则修改后，用台账中的OCR文本/图片库中的答案图片批量重评")
+    parser.add_argument("--question", type=int, required=True, help="题号")
+    parser.add_argument("--since", help="起始时间 YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--until", help="截止时间 YYYY-MM-DD[ HH:MM:SS]（只给日期时含当天）")
+    parser.add_argument("--run", help="只重评该运行标识 run_id 的记录")
+    parser.add_argument("--rubric-file", metavar="FILE", help="新评分细则文本文件（默认使用 config.ini 中的当前细则）")
+    parser.add_argument("--workers", type=int, default=8, help="并发评分线程数")
+    parser.add_argument("--dual", action="store_true", help="启用双评")
+    parser.add_argument("--db", help="台账文件（默认 阅卷记录/阅卷台账.sqlite3）")
+    parser.add_argument("--out", metavar="FILE", help="对比CSV（默认 阅卷记录/重评/重评_第N题_<时间>.csv）")
+    parser.add_argument("--verbose", action="store_true", help="输出 DETAIL 级别日志")
+    args = parser.parse_args(argv)
+
+    def _log(message, is_error, level):
+        if args.verbose or level != "DETAIL":
+            print(f"[{level}] {message}", file=sys.stderr)
+
+    config_manager = ConfigManager()
+    q_config = config_manager.get_question_config(args.question).copy()
+    q_config['question_index'] = args.question
+    if args.rubric_file:
+        with open(args.rubric_file, "r", encoding="utf-8") as f:
+            q_config['standard_answer'] = f.read().strip()
+    if not q_config.get('standard_answer'):
+        print(f"第{args.question}题没有评分细则，请用 --rubric-file 指定", file=sys.stderr)
+        return 1
+
+    ledger = GradingLedger(args.db)
+    try:
+        records = ledger.query(question_index=args.question, since=args.since, until=args.until,
+                               run_id=args.run, include_raw=True)
+    finally:
+        ledger.close()
+    if not records:
+        print("台账中没有符合条件的记录", file=sys.stderr)
+        return 1
+    _log(f"第{args.question}题：从台账取出 {len(records)} 条记录，{args.workers} 个线程重评", False, "INFO")
+
+    output_csv = args.out or os.path.join(
+        default_regrade_dir(), f"重评_第{args.question}题_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.csv")
+    runner = RegradeRunner(config_manager, q_config, workers=args.workers, dual_evaluation=args.dual,
+                           log_callback=_log)
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(runner.run(records, output_csv)), name="regrade")
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        runner.stop()
+        worker.join()
+    if not result:
+        return 1
+
+    summary_path = os.path.splitext(output_csv)[0] + "_汇总.md"
+    report = render_summary(result, args.question, output_csv)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(report)
+    print(f"对比结果已写入 {output_csv}")
+    return 0 if not result['failed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE regrade.py ---
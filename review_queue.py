@@ -0,0 +1,163 @@
+# --- START OF FILE review_queue.py ---
+"""
+待复核队列（延迟人工复核）
+
+无人值守运行时，遇到需要人工介入的试卷（OCR质量不达标、AI请求人工介入、双评分差超阈值）
+不再中止整批阅卷，而是点击“翻页”跳过该份试卷，并把现场证据写入持久化队列：
+答案截图、OCR文本、各模型原始回复与原因。教师回来后可在界面中查看、导出并逐条标记处理。
+
+存储格式：
+- 队列目录下的 review_queue.jsonl：每行一条记录（追加写入，状态变更时整体重写）
+- images/ 子目录：答案截图（JPEG）
+"""
+
+import os
+import sys
+import json
+import uuid
+import base64
+import datetime
+from threading import Lock
+from typing import Dict, Any, List, Optional
+
+
+def default_review_queue_dir() -> str:
+    """默认队列目录：与阅卷记录同级的 阅卷记录/待复核队列"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "阅卷记录", "待复核队列")
+
+
+class ReviewQueue:
+    """持久化的待复核队列（线程安全）"""
+
+    STATUS_PENDING = "pending"
+    STATUS_RESOLVED = "resolved"
+
+    def __init__(self, queue_dir: Optional[str] = None):
+        self.queue_dir = queue_dir or default_review_queue_dir()
+        self.images_dir = os.path.join(self.queue_dir, "images")
+        self.queue_file = os.path.join(self.queue_dir, "review_queue.jsonl")
+        self._lock = Lock()
+
+    def _ensure_dirs(self) -> None:
+        os.makedirs(self.images_dir, exist_ok=True)
+
+    def _save_image(self, item_id: str, img_str: str) -> str:
+        """保存base64截图，返回文件路径；无图片或保存失败时返回空字符串"""
+        if not img_str or not isinstance(img_str, str):
+            return ""
+        marker = "base64,"
+        pos = img_str.find(marker)
+        pure_base64 = img_str[pos + len(marker):] if pos != -1 else img_str
+        image_path = os.path.join(self.images_dir, f"{item_id}.jpg")
+        try:
+            with open(image_path, "wb") as f:
+                f.write(base64.b64decode(pure_base64))
+            return image_path
+        except (ValueError, OSError):
+            return ""
+
+    def add(self, question_index: Any, reason: str, img_str: str = "", ocr_text: str = "",
+            raw_responses: Optional[Dict[str, Any]] = None, extra: Optional[Dict[str, Any]] = None) -> str:
+        """加入一条待复核记录，返回记录ID"""
+        item_id = datetime.datetime.now().strftime("%Y%m%d%H%M%S") + "_" + uuid.uuid4().hex[:6]
+        with self._lock:
+            self._ensure_dirs()
+            item = {
+                "id": item_id,
+                "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "status": self.STATUS_PENDING,
+                "question_index": question_index,
+                "reason": str(reason),
+                "image_path": self._save_image(item_id, img_str),
+                "ocr_text": ocr_text or "",
+                "raw_responses": raw_responses or {},
+            }
+            if extra:
+                item.update(extra)
+            with open(self.queue_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        return item_id
+
+    def list_items(self, include_resolved: bool = True) -> List[Dict[str, Any]]:
+        """读取队列中的记录（按加入顺序）"""
+        with self._lock:
+            items = self._read_all()
+        if include_resolved:
+            return items
+        return [item for item in items if item.get("status") != self.STATUS_RESOLVED]
+
+    def pending_count(self) -> int:
+        return len(self.list_items(include_resolved=False))
+
+    def mark_resolved(self, item_id: str, note: str = "") -> bool:
+        """将记录标记为已处理"""
+        with self._lock:
+            items = self._read_all()
+            found = False
+            for item in items:
+                if item.get("id") == item_id:
+                    item["status"] = self.STATUS_RESOLVED
+                    item["resolved_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    if note:
+                        item["resolve_note"] = note
+                    found = True
+            if found:
+                self._write_all(items)
+            return found
+
+    def export(self, file_path: str, include_resolved: bool = True) -> str:
+        """导出为 Excel（.xlsx）或 CSV（其他扩展名），返回导出文件路径"""
+        rows = []
+        for item in self.list_items(include_resolved=include_resolved):
+            rows.append({
+                "记录ID": item.get("id", ""),
+                "加入时间": item.get("created_at", ""),
+                "状态": "已处理" if item.get("status") == self.STATUS_RESOLVED else "待复核",
+                "题目编号": item.get("question_index", ""),
+                "原因": item.get("reason", ""),
+                "答案截图": item.get("image_path", ""),
+                "OCR识别原文": item.get("ocr_text", ""),
+                "AI原始回复": json.dumps(item.get("raw_responses", {}), ensure_ascii=False),
+                "处理备注": item.get("resolve_note", ""),
+            })
+
+        if file_path.lower().endswith(".xlsx"):
+            import pandas as pd
+            pd.DataFrame(rows).to_excel(file_path, index=False, sheet_name="待复核队列")
+        else:
+            import csv
+            with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
+                fieldnames = list(rows[0].keys()) if rows else ["记录ID"]
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+        return file_path
+
+    def _read_all(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.queue_file):
+            return []
+        items = []
+        with open(self.queue_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    items.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # 跳过被截断的行（例如写入时断电）
+        return items
+
+    def _write_all(self, items: List[Dict[str, Any]]) -> None:
+        self._ensure_dirs()
+        tmp_path = self.queue_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.queue_file)
+
+# --- END OF FILE review_queue.py ---
@@ -0,0 +1,222 @@
+# --- START OF FILE run_analytics.py ---
+"""
+阅卷运行分析报告
+
+generate_summary_record 只记录份数、状态与用时。这里从阅卷台账（grading_ledger）读取明细，
+用 pandas/NumPy 按列计算（不逐条循环，整学期的历史也能在数秒内完成）：
+- 各题得分分布（均值、标准差、分位数、零分占比）；
+- 双评一致性（平均绝对分差、超过阈值的占比、仲裁占比）；
+- 各服务商/模型的调用耗时分位数（P50/P90/P99）与失败重试率；
+- 人工介入率、每份试卷的费用。
+
+每次运行结束、汇总记录写入台账后生成一页报告（阅卷记录/分析报告/分析报告_<run_id>.md），
+用于依据数据调整并发与模型选择。也可在命令行对任意时间段生成：
+    python run_analytics.py --since 2026-09-01 --out 本学期分析.md
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+import datetime
+from typing import Any, Dict, Optional
+
+from grading_ledger import default_ledger_path
+
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def default_report_dir() -> str:
+    """默认报告目录：阅卷记录/分析报告"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "阅卷记录", "分析报告")
+
+
+def _where(column_prefix: str, time_column: str, run_id: Optional[str], since: Optional[str],
+           until: Optional[str]):
+    conditions, params = [], []
+    if run_id:
+        conditions.append(f"{column_prefix}run_id = ?")
+        params.append(run_id)
+    if since:
+        conditions.append(f"{column_prefix}{time_column} >= ?")
+        params.append(since)
+    if until:
+        conditions.append(f"{column_prefix}{time_column} <= ?")
+        params.append(until + " 23:59:59" if len(until) == 10 else until)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def load_frames(db_path: Optional[str] = None, run_id: Optional[str] = None,
+                since: Optional[str] = None, until: Optional[str] = None) -> Dict[str, Any]:
+    """从台账读取 grades / calls / runs 三个 DataFrame（JSON 字段由 SQLite 展开，不在 Python 中逐条解析）"""
+    import pandas as pd  # 可选依赖
+    conn = sqlite3.connect(f"file:{db_path or default_ledger_path()}?mode=ro", uri=True)
+    try:
+        where, params = _where("g.", "graded_at", run_id, since, until)
+        grades = pd.read_sql_query(
+            "SELECT g.run_id, g.paper_no, g.question_index, g.is_dual, g.provider, g.model_id, "
+            "g.score, g.score_difference, g.cost, "
+            "json_extract(g.record, '$.score_diff_threshold') AS threshold, "
+            "json_extract(g.record, '$.arbiter_used') AS arbiter_used "
+            f"FROM grades g{where}", conn, params=params)
+        # 整卷请求登记在每道题的记录中，只统计一次
+        shared_filter = (" AND" if where else " WHERE") + " COALESCE(json_extract(c.value, '$.paper_share'), 0) = 0"
+        calls = pd.read_sql_query(
+            "SELECT json_extract(c.value, '$.provider') AS provider, "
+            "json_extract(c.value, '$.model_id') AS model_id, "
+            "json_extract(c.value, '$.latency_seconds') AS latency, "
+            "json_extract(c.value, '$.failed') AS failed "
+            f"FROM grades g, json_each(g.record, '$.api_calls') c{where}{shared_filter}", conn, params=params)
+        where, params = _where("", "finished_at", run_id, since, until)
+        runs = pd.read_sql_query(
+            "SELECT run_id, finished_at, "
+            "json_extract(summary, '$.questions_completed') AS papers, "
+            "json_extract(summary, '$.manual_intervention_count') AS manual_interventions, "
+            "json_extract(summary, '$.deferred_review_count') AS deferred, "
+            "json_extract(summary, '$.skipped_graded_count') AS skipped_graded, "
+            "json_extract(summary, '$.total_elapsed_time_seconds') AS elapsed_seconds "
+            f"FROM runs{where}", conn, params=params)
+    finally:
+        conn.close()
+    for frame, columns in ((grades, ("score", "score_difference", "cost", "threshold")),
+                           (calls, ("latency",)),
+                           (runs, ("papers", "manual_interventions", "deferred", "skipped_graded", "elapsed_seconds"))):
+        for column in columns:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    calls["failed"] = calls["failed"].fillna(0).astype(bool)
+    return {"grades": grades, "calls": calls, "runs": runs}
+
+
+def compute_analytics(frames: Dict[str, Any]) -> Dict[str, Any]:
+    """按列计算各项指标，返回 DataFrame 与标量组成的字典"""
+    import numpy as np  # 可选依赖
+    grades, calls, runs = frames["grades"], frames["calls"], frames["runs"]
+    result: Dict[str, Any] = {"answers": len(grades)}
+
+    # 各题得分分布
+    by_question = grades.groupby("question_index")["score"]
+    distribution = by_question.describe(percentiles=[0.1, 0.5, 0.9])
+    distribution["零分占比"] = (grades["score"] == 0).groupby(grades["question_index"]).mean()
+    result["score_distribution"] = distribution.rename(columns={
+        "count": "份数", "mean": "均值", "std": "标准差", "min": "最低", "10%": "P10",
+        "50%": "中位数", "90%": "P90", "max": "最高",
+    })
+
+    # 双评一致性
+    dual = grades[grades["is_dual"] == 1].assign(
+        abs_diff=lambda d: d["score_difference"].abs(),
+        over=lambda d: d["score_difference"] > d["threshold"],
+        arbiter=lambda d: d["arbiter_used"].fillna(0).astype(bool),
+    )
+    result["dual_agreement"] = dual.groupby("question_index").agg(
+        份数=("abs_diff", "size"), 平均绝对分差=("abs_diff", "mean"),
+        超阈值占比=("over", "mean"), 仲裁占比=("arbiter", "mean"),
+    ) if len(dual) else None
+
+    # 调用耗时与失败重试
+    if len(calls):
+        grouped = calls.groupby(["provider", "model_id"])
+        latency = grouped["latency"].quantile(list(LATENCY_QUANTILES)).unstack()
+        latency.columns = [f"P{int(q * 100)}耗时(秒)" for q in latency.columns]
+        latency.insert(0, "调用次数", grouped.size())
+        latency["失败率"] = grouped["failed"].mean()
+        result["latency"] = latency
+        result["failure_rate"] = float(calls["failed"].mean())
+        result["calls_per_answer"] = len(calls) / len(grades) if len(grades) else np.nan
+    else:
+        result["latency"] = None
+        result["failure_rate"] = np.nan
+        result["calls_per_answer"] = np.nan
+
+    # 人工介入率（按汇总记录中的份数）
+    papers = runs["papers"].fillna(0).sum()
+    result["papers"] = int(papers)
+    result["manual_intervention_rate"] = (runs["manual_interventions"].sum() / papers) if papers else np.nan
+    result["deferred"] = int(runs["deferred"].fillna(0).sum())
+    result["skipped_graded"] = int(runs["skipped_graded"].fillna(0).sum())
+
+    # 每份试卷费用（同一运行、同一份试卷的各题合计）
+    paper_cost = grades.groupby(["run_id", "paper_no"])["cost"].sum()
+    result["total_cost"] = float(grades["cost"].sum())
+    result["cost_per_paper"] = paper_cost.describe(percentiles=[0.5, 0.9]) if len(paper_cost) else None
+    return result
+
+
+def _format_rate(value) -> str:
+    return "—" if value != value else f"{value * 100:.1f}%"
+
+
+def render_report(analytics: Dict[str, Any], title: str) -> str:
+    """一页 Markdown 报告"""
+    lines = [f"# {title}", "",
+             f"生成时间：{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", "",
+             "## 概览", "",
+             f"- 评分答案 {analytics['answers']} 条，试卷 {analytics['papers']} 份",
+             f"- 费用合计 ¥{analytics['total_cost']:.4f}",
+             f"- 人工介入率 {_format_rate(analytics['manual_intervention_rate'])}"
+             f"（转入复核 {analytics['deferred']} 份，跳过已评 {analytics['skipped_graded']} 份）",
+             f"- 模型调用失败率 {_format_rate(analytics['failure_rate'])}，每条答案平均调用 "
+             + ("—" if analytics['calls_per_answer'] != analytics['calls_per_answer']
+                else f"{analytics['calls_per_answer']:.2f}") + " 次", ""]
+
+    def table(heading: str, frame) -> None:
+        lines.extend([f"## {heading}", ""])
+        if frame is None or len(frame) == 0:
+            lines.extend(["（无数据）", ""])
+        else:
+            lines.extend(["```", frame.to_string(float_format=lambda v: f"{v:.3f}"), "```", ""])
+
+    table("各题得分分布", analytics["score_distribution"])
+    table("双评一致性", analytics["dual_agreement"])
+    table("调用耗时与失败率（按服务商/模型）", analytics["latency"])
+    cost = analytics["cost_per_paper"]
+    table("每份试卷费用（元）", cost.to_frame("每份试卷费用") if cost is not None else None)
+    return "\n".join(lines)
+
+
+def generate_report(out_path: str, db_path: Optional[str] = None, run_id: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None, title: str = "阅卷分析报告") -> str:
+    """读取台账、计算指标并写出报告，返回报告路径"""
+    analytics = compute_analytics(load_frames(db_path, run_id, since, until))
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(render_report(analytics, title))
+    return out_path
+
+
+def write_run_report(run_id: str, db_path: Optional[str] = None, report_dir: Optional[str] = None) -> str:
+    """生成单次运行的报告：阅卷记录/分析报告/分析报告_<run_id>.md"""
+    out_path = os.path.join(report_dir or default_report_dir(), f"分析报告_{run_id}.md")
+    return generate_report(out_path, db_path, run_id=run_id, title=f"阅卷分析报告（运行 {run_id}）")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="从阅卷台账生成分析报告")
+    parser.add_argument("--db", help="台账文件（默认 阅卷记录/阅卷台账.sqlite3）")
+    parser.add_argument("--run", help="运行标识 run_id")
+    parser.add_argument("--since", help="起始时间 YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--until", help="截止时间 YYYY-MM-DD[ HH:MM:SS]（只给日期时含当天）")
+    parser.add_argument("--out", help="报告文件（默认 阅卷记录/分析报告/分析报告_<时间>.md）")
+    args = parser.parse_args(argv)
+
+    out_path = args.out or os.path.join(
+        default_report_dir(), f"分析报告_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.md")
+    try:
+        generate_report(out_path, args.db, args.run, args.since, args.until)
+    except ImportError:
+        print("分析报告需要安装 pandas 与 numpy：pip install pandas numpy")
+        return 1
+    print(f"已生成分析报告: {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE run_analytics.py ---
@@ -0,0 +1,173 @@
+# --- START OF FILE run_journal.py ---
+"""
+运行日志（预写式），用于崩溃后从中断处继续阅卷
+
+程序崩溃或电脑重启时，原先只能从第1份试卷重新开始，操作者需要自己推算剩余份数。
+界面启动的运行（运行参数 run_journal=True）把以下事件逐行追加到 阅卷记录/运行日志/run_journal.jsonl
+（命令行与批量等无界面运行不写入，以免覆盖界面的续跑信息）：
+- start：运行参数与 run_id；resume：从第几份试卷继续；
+- stage：每道题的阶段完成情况（captured 截图 → graded 评分 → scored 分数已输入 → recorded 已记录），
+  graded 阶段同时保存OCR与模型评分结果，以及答案图片的哈希；
+- paper_done：一份试卷完成（含试卷标识 paper_id），写入后 fsync，保证断电后不丢失；
+- finish：正常结束（含手动停止、错误中断）。
+
+启动时若最后一次运行没有 finish 事件，load_incomplete() 返回续跑所需的信息：原参数、已完成份数，
+以及中断那份试卷中已完成评分的题目结果——重新截到同一份试卷（试卷标识一致；未识别试卷标识时按图片哈希）
+时直接复用，不再调用OCR与模型；已输入分数（scored）的题目续跑时直接跳过，不会重复输入。
+已完成试卷的标识用于续跑时跳过已评试卷。
+"""
+
+import os
+import sys
+import json
+import hashlib
+import datetime
+from typing import Any, Dict, Optional
+
+JOURNAL_FILE_NAME = "run_journal.jsonl"
+
+
+def default_journal_path() -> str:
+    """默认运行日志路径：阅卷记录/运行日志/run_journal.jsonl"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "阅卷记录", "运行日志", JOURNAL_FILE_NAME)
+
+
+def image_hash(img_str: str) -> str:
+    """答案图片（data URI 或 base64）的哈希，用于判断重新截到的是否为同一张图片"""
+    if not img_str:
+        return ""
+    marker = "base64,"
+    pos = img_str.find(marker)
+    payload = img_str[pos + len(marker):] if pos != -1 else img_str
+    return hashlib.sha1(payload.encode("ascii", errors="ignore")).hexdigest()
+
+
+class RunJournal:
+    """一次运行的预写式日志（引擎单线程写入）"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_journal_path()
+        self._file = None
+
+    def _open(self, mode: str) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, mode, encoding="utf-8")
+
+    def _write(self, event: str, sync: bool = False, **data) -> None:
+        if self._file is None:
+            return
+        data['event'] = event
+        data['time'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._file.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def start(self, run_id: str, parameters: Dict[str, Any]) -> None:
+        """开始新的运行：上一次的日志保留为 .prev"""
+        self.close()
+        if os.path.exists(self.path):
+            os.replace(self.path, self.path + ".prev")
+        self._open("w")
+        parameters = {k: v for k, v in parameters.items() if k != 'resume_state'}
+        self._write("start", sync=True, run_id=run_id, parameters=parameters)
+
+    def resume(self, run_id: str, completed_cycles: int) -> None:
+        """续跑：在原日志后追加"""
+        self.close()
+        self._open("a")
+        self._write("resume", sync=True, run_id=run_id, completed_cycles=completed_cycles)
+
+    def stage(self, cycle: int, question_index: Any, stage: str, **data) -> None:
+        self._write("stage", cycle=cycle, question_index=question_index, stage=stage, **data)
+
+    def paper_done(self, cycle: int, paper_id: str = "") -> None:
+        self._write("paper_done", sync=True, cycle=cycle, paper_id=paper_id)
+
+    def finish(self, status: str, reason: str = "") -> None:
+        self._write("finish", sync=True, status=status, reason=reason)
+        self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    @staticmethod
+    def load_incomplete(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """读取未正常结束的运行；没有或已结束时返回 None
+
+        Returns:
+            {'run_id', 'parameters', 'started_at', 'completed_cycles', 'cycle_number',
+             'graded_paper_ids': [已完成试卷的标识],
+             'cached': {题号字符串: {'paper_id', 'image_hash', 'ocr', 'eval'[, 'scored', 'recorded']}}}
+            已输入分数的题目带 'scored'（输入的分数），已写入记录的再带 'recorded': True
+        """
+        path = path or default_journal_path()
+        if not os.path.exists(path):
+            return None
+        state = None
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时未写完的最后一行
+                kind = event.get('event')
+                if kind == 'start':
+                    state = {'run_id': event.get('run_id'), 'parameters': event.get('parameters') or {},
+                             'started_at': event.get('time'), 'completed_cycles': 0,
+                             'graded_paper_ids': [], 'cached': {}}
+                elif state is None:
+                    continue
+                elif kind == 'resume':
+                    state['cached'] = {}
+                elif kind == 'paper_done':
+                    state['completed_cycles'] = int(event.get('cycle', 0)) + 1
+                    state['cached'] = {}
+                    if event.get('paper_id'):
+                        state['graded_paper_ids'].append(event['paper_id'])
+                elif kind == 'stage' and event.get('stage') == 'graded':
+                    state['cached'][str(event.get('question_index'))] = {
+                        'paper_id': event.get('paper_id', ''),
+                        'image_hash': event.get('image_hash', ''),
+                        'ocr': event.get('ocr'),
+                        'eval': event.get('eval'),
+                    }
+                elif kind == 'stage' and event.get('stage') == 'scored':
+                    state['cached'].setdefault(str(event.get('question_index')), {})['scored'] = event.get('score')
+                elif kind == 'stage' and event.get('stage') == 'recorded':
+                    state['cached'].setdefault(str(event.get('question_index')), {})['recorded'] = True
+                elif kind == 'finish':
+                    state = None
+        if state is None:
+            return None
+        # JSON 中的坐标元组会变为列表，按原格式还原
+        for q_config in state['parameters'].get('question_configs') or []:
+            for key, value in list(q_config.items()):
+                if key.endswith('_pos') and isinstance(value, list):
+                    q_config[key] = tuple(value)
+        state['cycle_number'] = int(state['parameters'].get('cycle_number', 1) or 1)
+        if state['completed_cycles'] >= state['cycle_number']:
+            return None
+        return state
+
+    @staticmethod
+    def abandon(path: Optional[str] = None) -> None:
+        """放弃续跑：追加 finish 事件，下次启动不再提示"""
+        journal = RunJournal(path)
+        if not os.path.exists(journal.path):
+            return
+        journal._open("a")
+        journal.finish("abandoned", "用户选择不续跑")
+
+# --- END OF FILE run_journal.py ---
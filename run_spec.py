@@ -0,0 +1,262 @@
+# --- START OF FILE run_spec.py ---
+"""
+运行配置快照（每次运行开始时冻结）
+
+引擎原先在评分过程中反复读取实时配置：OCR预处理开关、服务商、级联/自适应双评阈值等用
+getattr(config_manager, ...) 读取，题目设置是字符串键字典，每份试卷都用 q_config.get(...)
+加默认值取值。运行中老师在界面上修改设置，同一份试卷的前后几题可能按不同设置评分。
+
+运行开始时把参数编译为不可变的快照：
+- QuestionSpec：一道题的设置，字段已校验并转换好类型（分数为浮点数、坐标为元组、区域为只读映射）；
+- RunSpec：运行参数（份数、双评、阈值）与评分过程中用到的全局设置，以及各题的 QuestionSpec。
+
+两者都是冻结的 __slots__ 数据类，运行期间只读、按属性取值。QuestionSpec 另提供只读的
+get()/[] 接口，score_sink、capture_source 等按字典读取题目设置的钩子无需修改。
+字段不合法（如最低分高于最高分、步长不为正数）时 from_config/from_parameters 抛出 ValueError。
+"""
+
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+
+from config_manager import get_ocr_quality_internal_value
+
+DEFAULT_QUESTION_TYPE = 'Subjective_PointBased_QA'
+OCR_QUALITY_LEVELS = ("relaxed", "moderate", "strict")
+ARBITER_STRATEGIES = ("closer_pair", "median")
+
+_AREA_KEYS = ('x1', 'y1', 'x2', 'y2')
+
+
+def _position(value, name: str) -> Optional[Tuple[int, int]]:
+    """屏幕坐标 → (x, y)；未配置（None 或 (0, 0)）返回 None"""
+    if value is None:
+        return None
+    try:
+        x, y = (int(v) for v in value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} 坐标格式不正确: {value!r}")
+    return None if (x, y) == (0, 0) else (x, y)
+
+
+def _area(value, name: str) -> Optional[Mapping[str, int]]:
+    """答案区域 → 只读映射 {x1, y1, x2, y2}；未配置返回 None"""
+    if not value:
+        return None
+    try:
+        return MappingProxyType({key: int(value[key]) for key in _AREA_KEYS})
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"{name} 区域格式不正确: {value!r}")
+
+
+@dataclass(frozen=True)
+class QuestionSpec:
+    """一道题的冻结设置"""
+    __slots__ = ('question_index', 'enabled', 'question_type', 'standard_answer', 'min_score', 'max_score',
+                 'score_rounding_step', 'ocr_mode_index', 'ocr_quality_level', 'answer_area',
+                 'score_input_pos', 'confirm_button_pos', 'enable_next_button', 'next_button_pos',
+                 'enable_three_step_scoring', 'score_input_pos_step1', 'score_input_pos_step2',
+                 'score_input_pos_step3', 'dual_eval_enabled')
+
+    question_index: int
+    enabled: bool
+    question_type: str
+    standard_answer: str
+    min_score: float
+    max_score: float
+    score_rounding_step: float
+    ocr_mode_index: int
+    ocr_quality_level: str
+    answer_area: Optional[Mapping[str, int]]
+    score_input_pos: Optional[Tuple[int, int]]
+    confirm_button_pos: Optional[Tuple[int, int]]
+    enable_next_button: bool
+    next_button_pos: Optional[Tuple[int, int]]
+    enable_three_step_scoring: bool
+    score_input_pos_step1: Optional[Tuple[int, int]]
+    score_input_pos_step2: Optional[Tuple[int, int]]
+    score_input_pos_step3: Optional[Tuple[int, int]]
+    dual_eval_enabled: bool
+
+    @classmethod
+    def from_config(cls, q_config: Mapping[str, Any], default_min_score: float = 0,
+                    default_max_score: float = 100) -> "QuestionSpec":
+        """由题目配置字典编译（已是 QuestionSpec 时原样返回）"""
+        if isinstance(q_config, cls):
+            return q_config
+        try:
+            question_index = int(q_config.get('question_index', 0) or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"题号不正确: {q_config.get('question_index')!r}")
+        label = f"第{question_index}题"
+        try:
+            min_score = float(q_config.get('min_score', default_min_score))
+            max_score = float(q_config.get('max_score', default_max_score))
+            step = float(q_config.get('score_rounding_step', 0.5))
+            ocr_mode_index = int(q_config.get('ocr_mode_index', 0) or 0)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{label} 分数或OCR模式设置不是数字: {e}")
+        if min_score > max_score:
+            raise ValueError(f"{label} 最低分 {min_score} 高于最高分 {max_score}")
+        if step <= 0:
+            raise ValueError(f"{label} 分数步长必须大于0: {step}")
+        if ocr_mode_index not in (0, 1):
+            raise ValueError(f"{label} OCR模式不正确: {ocr_mode_index}（0=纯AI，1=百度OCR）")
+        quality = str(q_config.get('ocr_quality_level') or 'moderate').strip()
+        if quality not in OCR_QUALITY_LEVELS:
+            quality = get_ocr_quality_internal_value(quality)  # 界面文本（宽松/适度/严格），无法识别时为 moderate
+        standard_answer = q_config.get('standard_answer') or ''
+        return cls(
+            question_index=question_index,
+            enabled=bool(q_config.get('enabled', True)),
+            question_type=str(q_config.get('question_type') or DEFAULT_QUESTION_TYPE),
+            standard_answer=standard_answer if isinstance(standard_answer, str) else str(standard_answer),
+            min_score=min_score,
+            max_score=max_score,
+            score_rounding_step=step,
+            ocr_mode_index=ocr_mode_index,
+            ocr_quality_level=quality,
+            answer_area=_area(q_config.get('answer_area'), f"{label}答案"),
+            score_input_pos=_position(q_config.get('score_input_pos'), f"{label}分数输入框"),
+            confirm_button_pos=_position(q_config.get('confirm_button_pos'), f"{label}确认按钮"),
+            enable_next_button=bool(q_config.get('enable_next_button', False)),
+            next_button_pos=_position(q_config.get('next_button_pos'), f"{label}翻页按钮"),
+            enable_three_step_scoring=bool(q_config.get('enable_three_step_scoring', False)),
+            score_input_pos_step1=_position(q_config.get('score_input_pos_step1'), f"{label}三步输入第1格"),
+            score_input_pos_step2=_position(q_config.get('score_input_pos_step2'), f"{label}三步输入第2格"),
+            score_input_pos_step3=_position(q_config.get('score_input_pos_step3'), f"{label}三步输入第3格"),
+            dual_eval_enabled=bool(q_config.get('dual_eval_enabled', False)),
+        )
+
+    @property
+    def is_ocr_mode(self) -> bool:
+        return self.ocr_mode_index == 1
+
+    @property
+    def next_pos(self) -> Optional[Tuple[int, int]]:
+        """启用翻页按钮时的翻页坐标"""
+        return self.next_button_pos if self.enable_next_button else None
+
+    # 只读字典接口：供按 q_config.get(...) 读取题目设置的钩子使用
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__
+
+    def keys(self):
+        return iter(self.__slots__)
+
+    def to_dict(self) -> dict:
+        """普通字典（可 JSON 序列化，用于记录与日志）"""
+        result = {f.name: getattr(self, f.name) for f in fields(self)}
+        if self.answer_area is not None:
+            result['answer_area'] = dict(self.answer_area)
+        return result
+
+
+@dataclass(frozen=True)
+class RunSpec:
+    """一次运行的冻结参数与设置"""
+    __slots__ = ('questions', 'cycle_number', 'wait_time', 'dual_evaluation', 'score_diff_threshold',
+                 'paper_batch_mode', 'is_single_question_one_run', 'first_model_id', 'second_model_id',
+                 'first_provider', 'second_provider', 'subject', 'defer_manual_review',
+                 'ocr_preprocess_enabled', 'ocr_preprocess_to_gray', 'ocr_preprocess_max_width',
+                 'ocr_preprocess_jpeg_quality', 'ocr_confidence_avg_threshold', 'cascade_enabled',
+                 'cascade_boundary_margin', 'adaptive_dual_enabled', 'adaptive_dual_sample_rate',
+                 'adaptive_dual_risk_boundary_margin', 'adaptive_dual_pass_ratio',
+                 'adaptive_dual_risk_basis_length', 'adaptive_dual_risk_ocr_margin', 'arbiter_enabled',
+                 'arbiter_strategy')
+
+    questions: Tuple[QuestionSpec, ...]
+    cycle_number: int
+    wait_time: float
+    dual_evaluation: bool
+    score_diff_threshold: float
+    paper_batch_mode: bool
+    is_single_question_one_run: bool
+    first_model_id: str
+    second_model_id: str
+    first_provider: str
+    second_provider: str
+    subject: str
+    defer_manual_review: bool
+    ocr_preprocess_enabled: bool
+    ocr_preprocess_to_gray: bool
+    ocr_preprocess_max_width: int
+    ocr_preprocess_jpeg_quality: int
+    ocr_confidence_avg_threshold: float
+    cascade_enabled: bool
+    cascade_boundary_margin: float
+    adaptive_dual_enabled: bool
+    adaptive_dual_sample_rate: float
+    adaptive_dual_risk_boundary_margin: float
+    adaptive_dual_pass_ratio: float
+    adaptive_dual_risk_basis_length: int
+    adaptive_dual_risk_ocr_margin: float
+    arbiter_enabled: bool
+    arbiter_strategy: str
+
+    @classmethod
+    def from_parameters(cls, parameters: Mapping[str, Any], config_manager=None,
+                        default_min_score: float = 0, default_max_score: float = 100) -> "RunSpec":
+        """由 set_parameters 的参数与当前配置编译运行快照"""
+        cm = config_manager
+
+        def setting(name: str, default):
+            value = getattr(cm, name, default) if cm is not None else default
+            return default if value is None else value
+
+        questions = tuple(QuestionSpec.from_config(q, default_min_score, default_max_score)
+                          for q in parameters.get('question_configs') or [])
+        try:
+            cycle_number = int(parameters.get('cycle_number', 1))
+            wait_time = float(parameters.get('wait_time', 1) or 0)
+            score_diff_threshold = float(parameters.get('score_diff_threshold', 10))
+            max_width = int(setting('ocr_preprocess_max_width', 1200))
+            jpeg_quality = int(setting('ocr_preprocess_jpeg_quality', 85))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"运行参数不是数字: {e}")
+        if cycle_number < 0:
+            raise ValueError(f"阅卷份数不能为负数: {cycle_number}")
+        strategy = str(setting('arbiter_strategy', 'closer_pair') or 'closer_pair')
+        subject = setting('subject', '')
+        return cls(
+            questions=questions,
+            cycle_number=cycle_number,
+            wait_time=wait_time,
+            dual_evaluation=bool(parameters.get('dual_evaluation', False)),
+            score_diff_threshold=score_diff_threshold,
+            paper_batch_mode=bool(parameters.get('paper_batch_mode', False)),
+            is_single_question_one_run=bool(parameters.get('is_single_question_one_run', False)),
+            first_model_id=parameters.get('first_model_id', '') or '',
+            second_model_id=parameters.get('second_model_id', '') or '',
+            first_provider=str(setting('first_api_provider', '') or ''),
+            second_provider=str(setting('second_api_provider', '') or ''),
+            subject=subject.strip() if isinstance(subject, str) else '',
+            defer_manual_review=bool(setting('defer_manual_review', False)),
+            ocr_preprocess_enabled=bool(setting('ocr_preprocess_enabled', False)),
+            ocr_preprocess_to_gray=bool(setting('ocr_preprocess_to_gray', True)),
+            ocr_preprocess_max_width=max_width,
+            ocr_preprocess_jpeg_quality=jpeg_quality,
+            ocr_confidence_avg_threshold=float(setting('ocr_confidence_avg_threshold', 0.75)),
+            cascade_enabled=bool(setting('cascade_enabled', False) and setting('cascade_api_key', '')
+                                 and setting('cascade_modelID', '')),
+            cascade_boundary_margin=float(setting('cascade_boundary_margin', 0.1) or 0),
+            adaptive_dual_enabled=bool(setting('adaptive_dual_enabled', False)),
+            adaptive_dual_sample_rate=float(setting('adaptive_dual_sample_rate', 0.0) or 0.0),
+            adaptive_dual_risk_boundary_margin=float(setting('adaptive_dual_risk_boundary_margin', 0.25) or 0),
+            adaptive_dual_pass_ratio=float(setting('adaptive_dual_pass_ratio', 0.6) or 0),
+            adaptive_dual_risk_basis_length=int(setting('adaptive_dual_risk_basis_length', 0) or 0),
+            adaptive_dual_risk_ocr_margin=float(setting('adaptive_dual_risk_ocr_margin', 0.05)),
+            arbiter_enabled=bool(setting('arbiter_enabled', False) and setting('arbiter_api_key', '')
+                                 and setting('arbiter_modelID', '')),
+            arbiter_strategy=strategy if strategy in ARBITER_STRATEGIES else 'closer_pair',
+        )
+
+# --- END OF FILE run_spec.py ---
@@ -0,0 +1,188 @@
+# --- START OF FILE score_sinks.py ---
+"""
+分数输出（score sink）
+
+GradingEngine 的 score_sink 钩子决定评分结果去往何处，调用形式为 sink(q_config, score) -> bool
+（ScoreSink 另收到当前试卷序号、试卷标识与引擎的取消令牌）：
+- gui（默认）：不设置钩子，由引擎模拟键鼠把分数输入阅卷网页（点击、全选、删除、输入、确认）；
+  键鼠输入依赖引擎的窗口隐藏、逐题坐标与三步打分流程，因此不做成 ScoreSink 子类；
+- csv：只追加写入CSV文件，用于试运行与批量模式，不操作网页；
+- http：把分数以JSON POST到阅卷平台的接口（或本地代理），省去每份试卷的键鼠输入时间。
+
+模式与参数保存在配置的 [ScoreSink] 段，create_score_sink() 按配置创建。
+"""
+
+import os
+import sys
+import abc
+import csv
+import time
+import datetime
+import threading
+from typing import Optional
+
+SCORE_SINK_MODES = ("gui", "csv", "http")
+
+CSV_FIELDS = ["time", "seq", "question_index", "score"]
+
+
+def default_score_csv_path() -> str:
+    """默认CSV路径：与阅卷记录同级的 阅卷记录/分数输出.csv"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "阅卷记录", "分数输出.csv")
+
+
+class ScoreSink(abc.ABC):
+    """分数输出基类：可直接赋给 GradingEngine.score_sink"""
+
+    mode = ""
+
+    def __init__(self):
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, q_config: dict, score: float, paper_no: Optional[int] = None, paper_id: str = "",
+                 cancel_token=None) -> bool:
+        """paper_no/paper_id 为引擎当前试卷的序号与标识；cancel_token 取消后不再重试"""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        return self.submit(q_config, score, seq, paper_no, paper_id, cancel_token)
+
+    @abc.abstractmethod
+    def submit(self, q_config: dict, score: float, seq: int, paper_no: Optional[int] = None,
+               paper_id: str = "", cancel_token=None) -> bool:
+        """输出一道题的分数，成功返回True（失败原因写入 last_error）"""
+
+    def describe(self) -> str:
+        return self.mode
+
+    def close(self) -> None:
+        pass
+
+
+class CsvScoreSink(ScoreSink):
+    """只记录不提交：分数追加写入CSV"""
+
+    mode = "csv"
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or default_score_csv_path()
+
+    def submit(self, q_config: dict, score: float, seq: int, paper_no: Optional[int] = None,
+               paper_id: str = "", cancel_token=None) -> bool:
+        row = {
+            "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "seq": seq,
+            "question_index": q_config.get('question_index', ''),
+            "score": score,
+        }
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, "a", encoding="utf-8-sig" if is_new else "utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                if is_new:
+                    writer.writeheader()
+                writer.writerow(row)
+        return True
+
+    def describe(self) -> str:
+        return f"csv（{self.path}）"
+
+
+class HttpScoreSink(ScoreSink):
+    """把分数 POST 到阅卷平台接口
+
+    请求体为 JSON：{"question_index", "score", "seq", "paper_no", "paper_id", "min_score", "max_score"}，
+    平台据 paper_id（未识别时为空）/paper_no 核对分数属于哪份试卷；
+    url 中可使用 {question_index} 占位符。2xx 且响应体不含 "ok": false 视为提交成功。
+    """
+
+    mode = "http"
+
+    def __init__(self, url: str, token: str = "", timeout: float = 10.0, retries: int = 2):
+        super().__init__()
+        if not url:
+            raise ValueError("HTTP分数输出未配置接口地址（[ScoreSink] http_url）")
+        import requests  # 与 api_service 相同的依赖
+        self._requests = requests
+        self.url = url
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.last_error = ""
+        self._session = requests.Session()
+        self._session.headers["Content-Type"] = "application/json"
+        if token:
+            self._session.headers["Authorization"] = f"Bearer {token}"
+
+    def submit(self, q_config: dict, score: float, seq: int, paper_no: Optional[int] = None,
+               paper_id: str = "", cancel_token=None) -> bool:
+        question_index = q_config.get('question_index', '')
+        payload = {
+            "question_index": question_index,
+            "score": score,
+            "seq": seq,
+            "paper_no": paper_no,
+            "paper_id": paper_id or "",
+            "min_score": q_config.get('min_score'),
+            "max_score": q_config.get('max_score'),
+        }
+        url = self.url.replace("{question_index}", str(question_index))
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._session.post(url, json=payload, timeout=self.timeout)
+                if 200 <= response.status_code < 300:
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        body = None
+                    if isinstance(body, dict) and body.get("ok") is False:
+                        self.last_error = f"平台拒绝: {body.get('message') or body}"
+                        return False  # 业务拒绝不重试
+                    return True
+                self.last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code < 500 and response.status_code != 429:
+                    return False
+            except self._requests.RequestException as e:
+                self.last_error = f"请求失败: {e}"
+            if attempt < self.retries:
+                delay = min(2 ** attempt, 5)
+                # 等待可被停止阅卷打断，停止后不再重试
+                if cancel_token is not None:
+                    if cancel_token.wait(delay):
+                        self.last_error = f"{self.last_error}（已停止，未再重试）"
+                        return False
+                else:
+                    time.sleep(delay)
+        return False
+
+    def describe(self) -> str:
+        return f"http（{self.url}）"
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def create_score_sink(config_manager) -> Optional[ScoreSink]:
+    """按配置创建分数输出；gui 模式返回 None（引擎使用键鼠输入）"""
+    mode = (getattr(config_manager, 'score_sink_mode', 'gui') or 'gui').strip().lower()
+    if mode == "csv":
+        return CsvScoreSink(getattr(config_manager, 'score_sink_csv_path', '') or None)
+    if mode == "http":
+        return HttpScoreSink(
+            getattr(config_manager, 'score_sink_http_url', ''),
+            token=getattr(config_manager, 'score_sink_http_token', ''),
+            timeout=float(getattr(config_manager, 'score_sink_http_timeout', 10.0)),
+        )
+    if mode != "gui":
+        raise ValueError(f"未知的分数输出模式: {mode}（可选 {', '.join(SCORE_SINK_MODES)}）")
+    return None
+
+# --- END OF FILE score_sinks.py ---
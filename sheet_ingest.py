@@ -0,0 +1,206 @@
+# --- START OF FILE sheet_ingest.py ---
+"""
+整页扫描导入：按各题答题区域模板，从整页答题卡扫描件中裁出每道题的答案图片
+
+扫描件通常是 300dpi 的多页 TIFF 或 PDF，每一页为一份答题卡。模板沿用各题配置的 answer_area
+（屏幕截图坐标），按 [SheetScan] 中的模板分辨率与原点换算到扫描件自身的DPI后裁切。
+
+300dpi 整页的解码、纠偏、裁切与JPEG编码都是CPU密集操作，单核会成为整批的瓶颈，因此：
+- 每一页作为一个任务提交到进程池，工作进程自行打开文件、解码该页，只回传裁好的小图；
+- 在途页数有上限，裁切结果经 FolderBatchRunner 的有界队列送入评分，内存占用与扫描件总量无关。
+
+PDF 需要可选依赖 PyMuPDF（fitz）；未安装时仅支持 TIFF 与常见图片格式。
+"""
+
+import os
+import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from folder_batch import to_data_uri
+
+SHEET_EXTENSIONS = {".tif", ".tiff", ".pdf", ".png", ".jpg", ".jpeg", ".bmp"}
+
+# 纠偏：在 ±_DESKEW_MAX_ANGLE 度内按 _DESKEW_STEP 搜索，使行投影方差最大的角度
+_DESKEW_MAX_ANGLE = 3.0
+_DESKEW_STEP = 0.25
+_DESKEW_SAMPLE_WIDTH = 800
+_CROP_JPEG_QUALITY = 90
+
+
+def list_sheet_files(source: str) -> List[str]:
+    """列出扫描件：source 可以是单个文件或目录"""
+    if os.path.isfile(source):
+        return [source]
+    if not os.path.isdir(source):
+        raise ValueError(f"扫描件来源不存在: {source}")
+    files = []
+    for root, _dirs, names in os.walk(source):
+        for name in names:
+            if os.path.splitext(name)[1].lower() in SHEET_EXTENSIONS:
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def build_sheet_options(config_manager, question_configs: Dict[int, dict]) -> Dict[str, Any]:
+    """由配置组装裁切参数（只含可跨进程传递的基本类型）"""
+    boxes = {}
+    for q_index, q_config in question_configs.items():
+        area = q_config.get('answer_area')
+        if area:
+            boxes[q_index] = (area['x1'] - config_manager.sheet_origin_x, area['y1'] - config_manager.sheet_origin_y,
+                              area['x2'] - config_manager.sheet_origin_x, area['y2'] - config_manager.sheet_origin_y)
+    return {
+        'boxes': boxes,
+        'template_dpi': float(config_manager.sheet_template_dpi) or 96.0,
+        'default_dpi': float(config_manager.sheet_default_dpi) or 300.0,
+        'deskew': bool(config_manager.sheet_deskew_enabled),
+    }
+
+
+def _open_pdf(path: str):
+    try:
+        import fitz  # PyMuPDF，可选依赖
+    except ImportError:
+        raise ValueError(f"读取PDF需要安装 PyMuPDF（pip install pymupdf）: {path}")
+    return fitz.open(path)
+
+
+def count_pages(path: str) -> int:
+    """页数（只读文件头与页索引，不解码像素）"""
+    if path.lower().endswith(".pdf"):
+        with _open_pdf(path) as doc:
+            return doc.page_count
+    from PIL import Image
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+
+def _load_page(path: str, page_index: int, default_dpi: float):
+    """解码一页，返回 (RGB/灰度图像, (横向DPI, 纵向DPI))"""
+    from PIL import Image
+    if path.lower().endswith(".pdf"):
+        with _open_pdf(path) as doc:
+            pix = doc[page_index].get_pixmap(dpi=int(default_dpi))
+            img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        return img, (default_dpi, default_dpi)
+    with Image.open(path) as img:
+        img.seek(page_index)
+        dpi = img.info.get("dpi") or (default_dpi, default_dpi)
+        page = img.convert("L" if img.mode in ("1", "L", "I;16") else "RGB")
+    dpi = tuple(float(d) if d and float(d) > 1 else default_dpi for d in dpi[:2])
+    return page, dpi
+
+
+def _estimate_skew(page) -> float:
+    """行投影法估计倾斜角度（度）：文字行与表格线水平时，逐行灰度均值的方差最大"""
+    from PIL import Image, ImageOps
+    gray = page.convert("L")
+    scale = min(1.0, _DESKEW_SAMPLE_WIDTH / float(gray.width))
+    sample = ImageOps.invert(gray.resize((max(1, int(gray.width * scale)), max(1, int(gray.height * scale))),
+                                         Image.Resampling.BILINEAR))
+    best_angle, best_score = 0.0, -1.0
+    steps = int(round(_DESKEW_MAX_ANGLE / _DESKEW_STEP))
+    for i in range(-steps, steps + 1):
+        angle = i * _DESKEW_STEP
+        rotated = sample.rotate(angle, resample=Image.Resampling.BILINEAR, fillcolor=0)
+        profile = list(rotated.resize((1, rotated.height), Image.Resampling.BOX).getdata())
+        mean = sum(profile) / len(profile)
+        score = sum((v - mean) ** 2 for v in profile)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def _crop_page(path: str, page_index: int, options: Dict[str, Any]) -> List[Tuple[int, bytes]]:
+    """进程池任务：解码、纠偏并裁切一页，返回 [(题号, JPEG字节)]"""
+    from PIL import Image
+    page, (dpi_x, dpi_y) = _load_page(path, page_index, options['default_dpi'])
+    if options.get('deskew'):
+        angle = _estimate_skew(page)
+        if angle:
+            page = page.rotate(angle, resample=Image.Resampling.BICUBIC, fillcolor="white")
+
+    scale_x, scale_y = dpi_x / options['template_dpi'], dpi_y / options['template_dpi']
+    crops = []
+    for q_index, (x1, y1, x2, y2) in sorted(options['boxes'].items()):
+        box = (max(0, int(x1 * scale_x)), max(0, int(y1 * scale_y)),
+               min(page.width, int(round(x2 * scale_x))), min(page.height, int(round(y2 * scale_y))))
+        if box[2] <= box[0] or box[3] <= box[1]:
+            continue
+        buffer = io.BytesIO()
+        page.crop(box).save(buffer, format="JPEG", quality=_CROP_JPEG_QUALITY)
+        crops.append((q_index, buffer.getvalue()))
+    return crops
+
+
+def iter_page_crops(files: List[str], options: Dict[str, Any], workers: int = 0,
+                    max_pending: Optional[int] = None) -> Iterator[Tuple[str, int, int, Any]]:
+    """在进程池中裁切全部页面，按提交顺序产出 (文件, 页序号, 页数, 裁切列表或异常)
+
+    同时在途的页数不超过 max_pending（默认进程数×2），调用方停止迭代时取消未开始的页面。
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    pending: deque = deque()
+    executor = ProcessPoolExecutor(max_workers=workers)
+
+    def _pages():
+        for path in files:
+            try:
+                total = count_pages(path)
+            except (OSError, ValueError) as e:
+                yield path, 0, 0, e
+                continue
+            for page_index in range(total):
+                yield path, page_index, total, None
+
+    try:
+        for path, page_index, total, error in _pages():
+            if error is not None:
+                pending.append((path, page_index, total, None, error))
+            else:
+                pending.append((path, page_index, total,
+                                executor.submit(_crop_page, path, page_index, options), None))
+            while len(pending) >= max_pending or (pending and pending[0][3] is None):
+                yield _collect(pending.popleft())
+        while pending:
+            yield _collect(pending.popleft())
+    finally:
+        for item in pending:
+            if item[3] is not None:
+                item[3].cancel()
+        executor.shutdown(wait=False)
+
+
+def _collect(item: tuple) -> Tuple[str, int, int, Any]:
+    path, page_index, total, future, error = item
+    if future is not None:
+        try:
+            return path, page_index, total, future.result()
+        except Exception as e:
+            return path, page_index, total, e
+    return path, page_index, total, error
+
+
+def iter_sheet_tasks(files: List[str], question_configs: Dict[int, dict], options: Dict[str, Any],
+                     workers: int = 0) -> Iterator[tuple]:
+    """把整页扫描的裁切结果转为 FolderBatchRunner 的任务 (名称, 试卷号, 题目配置, 图片加载函数)"""
+    for path, page_index, total, result in iter_page_crops(files, options, workers):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        paper_id = f"{stem}_p{page_index + 1}" if total > 1 else stem
+        if isinstance(result, Exception):
+            message = f"扫描件解码失败: {result}"
+
+            def _fail(message=message):
+                raise ValueError(message)
+
+            for q_index in sorted(options['boxes']):
+                yield f"{os.path.basename(path)}#p{page_index + 1}", paper_id, question_configs[q_index], _fail
+            continue
+        for q_index, data in result:
+            name = f"{paper_id}_{q_index}.jpg"
+            yield name, paper_id, question_configs[q_index], lambda name=name, data=data: to_data_uri(name, data)
+
+# --- END OF FILE sheet_ingest.py ---
@@ -52,6 +52,8 @@ class MainWindow(QMainWindow):
         self.max_questions = 7  # 多题模式最多支持7道题（已移除第8题）
         self.shortcut_esc = QShortcut(QKeySequence("Escape"), self)
         self.shortcut_esc.activated.connect(self.stop_auto_thread)
+        self.shortcut_review_queue = QShortcut(QKeySequence("Ctrl+R"), self)
+        self.shortcut_review_queue.activated.connect(self.open_review_queue_dialog)
         self._ui_cache = {}
 
         self.init_ui()
@@ -451,24 +453,13 @@ class MainWindow(QMainWindow):
                 'first_model_id': self.config_manager.first_modelID,
                 'second_model_id': self.config_manager.second_modelID,
                 'is_single_question_one_run': len(enabled_questions_indices) == 1,
+                'paper_batch_mode': self.config_manager.paper_batch_enabled,
+                'run_journal': True,  # 写入运行日志，供崩溃后续跑
                 # OCR模式现在是各小题独立配置，在question_configs中的ocr_mode_index字段
             }
 
             self.worker.set_parameters(**params)
-            
-            # === 重要：在启动阅卷前，隐藏所有答题框窗口和最小化主窗口 ===
-            # 1. 隐藏所有答题框窗口
-            for q_idx, answer_window in list(self.answer_windows.items()):
-                if answer_window and answer_window.isVisible():
-                    answer_window.hide()
-                    self.log_message(f"已隐藏第{q_idx}题答题框窗口")
-            
-            # 2. 最小化主窗口，避免遮挡答题卡
-            self.showMinimized()
-            self.log_message("主窗口已最小化，准备开始截图和阅卷")
-            
-            self.worker.start()
-            self.update_ui_state(is_running=True)
+            self._launch_worker()
             
             questions_str = ', '.join([f"第{i}题" for i in enabled_questions_indices])
             self.log_message(f"自动阅卷已启动: 批改 {questions_str}，循环 {params['cycle_number']} 次")
@@ -477,6 +468,38 @@ class MainWindow(QMainWindow):
             self.log_message(f"启动自动阅卷出错: {e}", is_error=True)
             traceback.print_exc()
 
+    def _launch_worker(self):
+        """隐藏答题框窗口、最小化主窗口后启动阅卷线程"""
+        # === 重要：在启动阅卷前，隐藏所有答题框窗口和最小化主窗口 ===
+        # 1. 隐藏所有答题框窗口
+        for q_idx, answer_window in list(self.answer_windows.items()):
+            if answer_window and answer_window.isVisible():
+                answer_window.hide()
+                self.log_message(f"已隐藏第{q_idx}题答题框窗口")
+        
+        # 2. 最小化主窗口，避免遮挡答题卡
+        self.showMinimized()
+        self.log_message("主窗口已最小化，准备开始截图和阅卷")
+        
+        self.worker.start()
+        self.update_ui_state(is_running=True)
+
+    def resume_interrupted_run(self, state):
+        """按运行日志中的原参数，从中断的试卷继续阅卷"""
+        try:
+            if not self.check_required_settings():
+                return
+            params = dict(state['parameters'])
+            params['resume_state'] = state
+            self.worker.set_parameters(**params)
+            self._launch_worker()
+            self.log_message(
+                f"继续上次中断的阅卷：从第 {state['completed_cycles'] + 1}/{state['cycle_number']} 份试卷开始"
+            )
+        except Exception as e:
+            self.log_message(f"继续上次阅卷出错: {e}", is_error=True)
+            traceback.print_exc()
+
     def check_required_settings(self):
         """检查必要的设置是否已配置"""
         errors = []
@@ -531,15 +554,21 @@ class MainWindow(QMainWindow):
         is_single_q1_run = (len(enabled_questions) == 1 and enabled_questions[0] == 1)
         q1_cfg = self.config_manager.get_question_config(1)
         q1_three_step = bool(q1_cfg.get('enable_three_step_scoring', False))
+        # 分数经CSV/HTTP输出时不模拟键鼠，无需分数输入与确认按钮坐标
+        gui_score_input = (getattr(self.config_manager, 'score_sink_mode', 'gui') or 'gui') == 'gui'
+        # 答案图片直接下载时不截屏，无需答案区域
+        screen_capture = (getattr(self.config_manager, 'image_source_mode', 'screen') or 'screen') == 'screen'
 
         for q_idx in enabled_questions:
             q_cfg = self.config_manager.get_question_config(q_idx)
             if not q_cfg.get('standard_answer', '').strip():
                 errors.append(f"第{q_idx}题已启用但未设置评分细则")
-            if not q_cfg.get('answer_area'):
+            if screen_capture and not q_cfg.get('answer_area'):
                 errors.append(f"第{q_idx}题已启用但未配置答案区域")
 
             # 坐标校验：减少“启动→秒停”
+            if not gui_score_input:
+                continue
             confirm_pos = q_cfg.get('confirm_button_pos')
             if not _is_valid_pos(confirm_pos):
                 errors.append(f"第{q_idx}题已启用但未配置确认按钮坐标")
@@ -916,6 +945,15 @@ class MainWindow(QMainWindow):
             if self.isMinimized(): self.showNormal(); self.activateWindow()
             self._apply_ui_constraints() # 任务结束后恢复UI约束
 
+    def open_review_queue_dialog(self):
+        """查看/导出待复核队列（Ctrl+R）"""
+        try:
+            from ui_components.review_queue_dialog import ReviewQueueDialog
+            dialog = ReviewQueueDialog(self.worker.review_queue, self)
+            dialog.exec_()
+        except Exception as e:
+            self.log_message(f"打开待复核队列失败: {e}", is_error=True)
+
     def stop_auto_thread(self):
         if self.worker.isRunning():
             self.worker.stop()
@@ -0,0 +1,102 @@
+# --- START OF FILE review_queue_dialog.py ---
+
+import os
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
+                             QTableWidgetItem, QFileDialog, QMessageBox, QCheckBox, QHeaderView)
+from PyQt5.QtCore import Qt
+
+from review_queue import ReviewQueue
+
+
+class ReviewQueueDialog(QDialog):
+    """待复核队列查看窗口：浏览、打开截图、标记已处理、导出"""
+
+    COLUMNS = ["加入时间", "状态", "题目", "原因", "OCR识别原文"]
+
+    def __init__(self, review_queue: ReviewQueue, parent=None):
+        super().__init__(parent)
+        self.review_queue = review_queue
+        self._items = []
+
+        self.setWindowTitle("待复核队列")
+        self.resize(900, 500)
+
+        layout = QVBoxLayout(self)
+
+        self.show_resolved_check = QCheckBox("显示已处理")
+        self.show_resolved_check.stateChanged.connect(self.refresh)
+        layout.addWidget(self.show_resolved_check)
+
+        self.table = QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.table.doubleClicked.connect(self.open_selected_image)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        for text, slot in (("刷新", self.refresh), ("打开截图", self.open_selected_image),
+                           ("标记为已处理", self.resolve_selected), ("导出...", self.export_queue),
+                           ("关闭", self.accept)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            button_layout.addWidget(button)
+        layout.addLayout(button_layout)
+
+        self.refresh()
+
+    def refresh(self, *_):
+        self._items = self.review_queue.list_items(include_resolved=self.show_resolved_check.isChecked())
+        self.table.setRowCount(len(self._items))
+        for row, item in enumerate(self._items):
+            values = [
+                item.get("created_at", ""),
+                "已处理" if item.get("status") == ReviewQueue.STATUS_RESOLVED else "待复核",
+                str(item.get("question_index", "")),
+                item.get("reason", ""),
+                (item.get("ocr_text", "") or "")[:100],
+            ]
+            for col, value in enumerate(values):
+                cell = QTableWidgetItem(value)
+                cell.setToolTip(value)
+                self.table.setItem(row, col, cell)
+
+    def _selected_item(self):
+        row = self.table.currentRow()
+        if row < 0 or row >= len(self._items):
+            QMessageBox.information(self, "提示", "请先选择一条记录")
+            return None
+        return self._items[row]
+
+    def open_selected_image(self, *_):
+        item = self._selected_item()
+        if not item:
+            return
+        image_path = item.get("image_path", "")
+        if not image_path or not os.path.exists(image_path):
+            QMessageBox.warning(self, "提示", "该记录没有保存答案截图")
+            return
+        try:
+            os.startfile(image_path)  # type: ignore[attr-defined]
+        except (AttributeError, OSError) as e:
+            QMessageBox.warning(self, "提示", f"无法打开截图: {e}\n路径: {image_path}")
+
+    def resolve_selected(self):
+        item = self._selected_item()
+        if item and self.review_queue.mark_resolved(item.get("id", "")):
+            self.refresh()
+
+    def export_queue(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出待复核队列", "待复核队列.xlsx", "Excel 文件 (*.xlsx);;CSV 文件 (*.csv)"
+        )
+        if not file_path:
+            return
+        try:
+            self.review_queue.export(file_path, include_resolved=self.show_resolved_check.isChecked())
+            QMessageBox.information(self, "导出成功", f"已导出到: {file_path}")
+        except Exception as e:
+            QMessageBox.warning(self, "导出失败", str(e))
+
+# --- END OF FILE review_queue_dialog.py ---
@@ -0,0 +1,233 @@
+# --- START OF FILE usage_accounting.py ---
+"""
+Token 用量与费用统计
+
+每次模型调用都会返回 usage（输入/输出/缓存/图片 tokens），这里负责：
+1. 按模型单价表估算单次调用费用；
+2. 按“单次调用 → 题目 → 试卷（一轮）→ 整个批次”逐级汇总，
+   供阅卷记录与批次汇总（Excel）展示，便于评估图片压缩、提示词精简、缓存等优化是否真正省钱。
+"""
+
+from threading import Lock
+from typing import Dict, Any, List, Optional, Tuple
+
+# ==============================================================================
+#  模型单价表（元 / 百万 tokens）
+#  键为模型ID前缀（不区分大小写，取最长匹配）；值为 (输入单价, 输出单价, 缓存命中输入单价)。
+#  价格会随厂商调整，请以官网为准；可在 config.ini 的 [Pricing] 中覆盖，
+#  格式：模型ID前缀 = 输入单价,输出单价[,缓存单价]
+# ==============================================================================
+MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "doubao-seed-1-6": (0.8, 8.0, 0.16),
+    "doubao-1-5-vision-pro": (3.0, 9.0, 3.0),
+    "moonshot-v1-8k-vision": (2.0, 10.0, 2.0),
+    "moonshot-v1-32k-vision": (5.0, 20.0, 5.0),
+    "kimi-latest": (2.0, 10.0, 1.0),
+    "glm-4v-plus": (4.0, 4.0, 4.0),
+    "glm-4.5v": (2.0, 6.0, 0.4),
+    "qwen-vl-max": (3.0, 9.0, 3.0),
+    "qwen-vl-plus": (1.5, 4.5, 1.5),
+    "hunyuan-vision": (18.0, 18.0, 18.0),
+    "hunyuan-turbos-vision": (3.0, 9.0, 3.0),
+    "gpt-4o-mini": (1.1, 4.4, 0.55),
+    "gpt-4o": (18.0, 72.0, 9.0),
+    "gemini-2.5-flash": (2.2, 18.0, 0.55),
+    "gemini-2.5-pro": (9.0, 72.0, 2.25),
+}
+
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "image_tokens", "total_tokens")
+
+
+def empty_usage() -> Dict[str, Any]:
+    """返回一份全零的用量字典"""
+    usage: Dict[str, Any] = {field: 0 for field in USAGE_FIELDS}
+    usage["calls"] = 0
+    usage["cost"] = 0.0
+    usage["unpriced_calls"] = 0
+    return usage
+
+
+def merge_usage(target: Dict[str, Any], usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """将 usage 累加到 target（就地修改并返回 target）"""
+    if not usage:
+        return target
+    for field in USAGE_FIELDS + ("calls", "unpriced_calls"):
+        target[field] = int(target.get(field, 0) or 0) + int(usage.get(field, 0) or 0)
+    target["cost"] = float(target.get("cost", 0.0) or 0.0) + float(usage.get("cost", 0.0) or 0.0)
+    return target
+
+
+def lookup_price(model_id: str, overrides: Optional[Dict[str, Tuple[float, float, float]]] = None) -> Optional[Tuple[float, float, float]]:
+    """按模型ID前缀查找单价，配置覆盖优先；找不到返回 None"""
+    if not model_id:
+        return None
+    model_lower = str(model_id).strip().lower()
+    for table in (overrides or {}, MODEL_PRICES):
+        matches = [key for key in table if model_lower.startswith(str(key).lower())]
+        if matches:
+            return table[max(matches, key=len)]
+    return None
+
+
+def estimate_cost(model_id: str, usage: Dict[str, Any],
+                  overrides: Optional[Dict[str, Tuple[float, float, float]]] = None) -> Optional[float]:
+    """估算单次调用费用（元）；模型未在单价表中时返回 None"""
+    price = lookup_price(model_id, overrides)
+    if price is None:
+        return None
+    input_price, output_price, cached_price = price
+    prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
+    cached_tokens = min(int(usage.get("cached_tokens", 0) or 0), prompt_tokens)
+    completion_tokens = int(usage.get("completion_tokens", 0) or 0)
+    return ((prompt_tokens - cached_tokens) * input_price
+            + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1_000_000
+
+
+def parse_price_overrides(raw_items: Dict[str, str]) -> Dict[str, Tuple[float, float, float]]:
+    """解析 config.ini [Pricing] 中的单价覆盖项，忽略格式错误的条目"""
+    overrides: Dict[str, Tuple[float, float, float]] = {}
+    for model_prefix, raw_value in (raw_items or {}).items():
+        try:
+            parts = [float(p.strip()) for p in str(raw_value).replace("，", ",").split(",") if p.strip()]
+        except ValueError:
+            continue
+        if len(parts) == 2:
+            overrides[model_prefix] = (parts[0], parts[1], parts[0])
+        elif len(parts) >= 3:
+            overrides[model_prefix] = (parts[0], parts[1], parts[2])
+    return overrides
+
+
+def format_usage(usage: Dict[str, Any]) -> str:
+    """将用量格式化为便于阅读的单行文本"""
+    if not usage or not usage.get("calls"):
+        return "无调用"
+    text = (f"调用{usage.get('calls', 0)}次，输入{usage.get('prompt_tokens', 0)}"
+            f"（缓存{usage.get('cached_tokens', 0)}，图片{usage.get('image_tokens', 0)}）"
+            f"/输出{usage.get('completion_tokens', 0)} tokens")
+    if usage.get("unpriced_calls"):
+        text += f"，费用≈¥{usage.get('cost', 0.0):.4f}（{usage['unpriced_calls']}次调用的模型未配置单价）"
+    else:
+        text += f"，费用≈¥{usage.get('cost', 0.0):.4f}"
+    return text
+
+
+class UsageTracker:
+    """线程安全的用量汇总器：按调用、题目、试卷、批次四级累计"""
+
+    def __init__(self, price_overrides: Optional[Dict[str, Tuple[float, float, float]]] = None):
+        self._lock = Lock()
+        self.price_overrides = price_overrides or {}
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._run = empty_usage()
+            self._by_question: Dict[Any, Dict[str, Any]] = {}
+            self._by_paper: Dict[int, Dict[str, Any]] = {}
+            self._current_paper = 0
+            self._pending_by_question: Dict[Any, Dict[str, Any]] = {}
+            self._pending_calls: Dict[Any, List[Dict[str, Any]]] = {}
+
+    def begin_paper(self, paper_index: int) -> None:
+        """开始统计新的一份试卷（自动阅卷中每一轮对应一份试卷）"""
+        with self._lock:
+            self._current_paper = paper_index
+            self._by_paper.setdefault(paper_index, empty_usage())
+
+    def add_call(self, question_index: Any, model_id: str, usage: Optional[Dict[str, Any]],
+                 failed: bool = False) -> Dict[str, Any]:
+        """登记一次模型调用，返回带费用的单次用量；failed 表示本次调用失败（将被重试或放弃）"""
+        call_usage = empty_usage()
+        merge_usage(call_usage, usage)
+        call_usage["calls"] = 1
+        cost = estimate_cost(model_id, call_usage, self.price_overrides)
+        if cost is None:
+            call_usage["unpriced_calls"] = 1
+        else:
+            call_usage["cost"] = cost
+        with self._lock:
+            merge_usage(self._run, call_usage)
+            merge_usage(self._by_question.setdefault(question_index, empty_usage()), call_usage)
+            merge_usage(self._by_paper.setdefault(self._current_paper, empty_usage()), call_usage)
+            merge_usage(self._pending_by_question.setdefault(question_index, empty_usage()), call_usage)
+            self._pending_calls.setdefault(question_index, []).append({
+                "provider": (usage or {}).get("provider", ""),
+                "model_id": model_id,
+                "latency_seconds": (usage or {}).get("latency_seconds"),
+                "failed": bool(failed),
+            })
+        return call_usage
+
+    def add_shared_call(self, question_indices: List[Any], model_id: str, usage: Optional[Dict[str, Any]],
+                        failed: bool = False) -> Dict[str, Any]:
+        """登记一次由多道题共用的调用（整卷请求），返回带费用的整次用量
+
+        批次与试卷按一次调用累计；tokens 与费用按题平均分摊（余数计入靠前的题目），
+        调用次数计入第一题，使各题记录之和等于整次调用。每道题都登记该调用，
+        paper_share 为该题在共用调用中的序号（0 为计次的一条）。
+        """
+        call_usage = empty_usage()
+        merge_usage(call_usage, usage)
+        call_usage["calls"] = 1
+        cost = estimate_cost(model_id, call_usage, self.price_overrides)
+        if cost is None:
+            call_usage["unpriced_calls"] = 1
+        else:
+            call_usage["cost"] = cost
+        count = max(len(question_indices), 1)
+        with self._lock:
+            merge_usage(self._run, call_usage)
+            merge_usage(self._by_paper.setdefault(self._current_paper, empty_usage()), call_usage)
+            cost_left = call_usage["cost"]
+            for share_no, question_index in enumerate(question_indices):
+                share = empty_usage()
+                for field in USAGE_FIELDS:
+                    quotient, remainder = divmod(call_usage[field], count)
+                    share[field] = quotient + (1 if share_no < remainder else 0)
+                if share_no == 0:
+                    share["calls"] = 1
+                    share["unpriced_calls"] = call_usage["unpriced_calls"]
+                share["cost"] = cost_left if share_no == count - 1 else call_usage["cost"] / count
+                cost_left -= share["cost"]
+                merge_usage(self._by_question.setdefault(question_index, empty_usage()), share)
+                merge_usage(self._pending_by_question.setdefault(question_index, empty_usage()), share)
+                self._pending_calls.setdefault(question_index, []).append({
+                    "provider": (usage or {}).get("provider", ""),
+                    "model_id": model_id,
+                    "latency_seconds": (usage or {}).get("latency_seconds"),
+                    "failed": bool(failed),
+                    "paper_share": share_no,
+                })
+        return call_usage
+
+    def discard_question(self, question_index: Any) -> None:
+        """丢弃该题尚未取出的用量与调用（该题本轮不会写入阅卷记录时使用，批次与试卷汇总不受影响）"""
+        with self._lock:
+            self._pending_by_question.pop(question_index, None)
+            self._pending_calls.pop(question_index, None)
+
+    def pop_question_usage(self, question_index: Any) -> Dict[str, Any]:
+        """取出自上次取出以来该题累计的用量（用于写入单题阅卷记录，含重试）"""
+        with self._lock:
+            return self._pending_by_question.pop(question_index, None) or empty_usage()
+
+    def pop_question_calls(self, question_index: Any) -> List[Dict[str, Any]]:
+        """取出该题自上次取出以来的逐次调用（服务商、模型、耗时、是否失败），用于延迟与重试率统计"""
+        with self._lock:
+            return self._pending_calls.pop(question_index, None) or []
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回批次/题目/试卷三级汇总的副本"""
+        with self._lock:
+            papers = {k: dict(v) for k, v in self._by_paper.items() if v.get("calls")}
+            run_usage = dict(self._run)
+            return {
+                "run": run_usage,
+                "by_question": {k: dict(v) for k, v in self._by_question.items()},
+                "by_paper": papers,
+                "avg_cost_per_paper": (run_usage["cost"] / len(papers)) if papers else 0.0,
+            }
+
+# --- END OF FILE usage_accounting.py ---